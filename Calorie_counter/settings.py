@@ -167,12 +167,176 @@ AUTH_USER_MODEL = 'users.Customer'
 
 NUTRITION_API_KEY = os.getenv('NUTRITION_API_KEY', 'test_api_key')
 
+NUTRITION_API = {
+    "BASE_URL": os.getenv("NUTRITION_API_BASE_URL", "https://api.api-ninjas.com"),
+    "CONNECT_TIMEOUT": float(os.getenv("NUTRITION_API_CONNECT_TIMEOUT", 3.05)),
+    "READ_TIMEOUT": float(os.getenv("NUTRITION_API_READ_TIMEOUT", 10)),
+    "MAX_RETRIES": int(os.getenv("NUTRITION_API_MAX_RETRIES", 2)),
+    "BACKOFF_FACTOR": float(os.getenv("NUTRITION_API_BACKOFF_FACTOR", 0.3)),
+    "BACKOFF_MAX": float(os.getenv("NUTRITION_API_BACKOFF_MAX", 5)),
+    "POOL_MAXSIZE": int(os.getenv("NUTRITION_API_POOL_MAXSIZE", 10)),
+}
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/2")
+
+PRODUCT_CACHE = {
+    "LOCAL_MAXSIZE": int(os.getenv("PRODUCT_CACHE_LOCAL_MAXSIZE", 2048)),
+    "LOCAL_TTL": float(os.getenv("PRODUCT_CACHE_LOCAL_TTL", 300)),
+    "REDIS_TTL": int(os.getenv("PRODUCT_CACHE_REDIS_TTL", 60 * 60 * 24 * 2)),
+    "GENERATION_CHECK_INTERVAL": float(os.getenv("PRODUCT_CACHE_GENERATION_CHECK_INTERVAL", 1)),
+}
+
+NEGATIVE_PRODUCT_CACHE = {
+    "TTL": int(os.getenv("NEGATIVE_PRODUCT_CACHE_TTL", 60 * 60 * 6)),
+    "MAX_SIZE": int(os.getenv("NEGATIVE_PRODUCT_CACHE_MAX_SIZE", 10000)),
+}
+
+PRODUCT_LOOKUP_SINGLE_FLIGHT = {
+    "LOCK_TTL": float(os.getenv("PRODUCT_LOOKUP_LOCK_TTL", 15)),
+    "RESULT_TTL": float(os.getenv("PRODUCT_LOOKUP_RESULT_TTL", 5)),
+    "WAIT_TIMEOUT": float(os.getenv("PRODUCT_LOOKUP_WAIT_TIMEOUT", 15)),
+    "POLL_INTERVAL": float(os.getenv("PRODUCT_LOOKUP_POLL_INTERVAL", 0.02)),
+}
+
+PRODUCT_LOOKUP_BATCHING = {
+    # Seconds a cache-miss lookup waits for others to share one API query; 0 disables batching.
+    "WINDOW": float(os.getenv("PRODUCT_LOOKUP_BATCH_WINDOW", 0.015)),
+    "MAX_BATCH_SIZE": int(os.getenv("PRODUCT_LOOKUP_MAX_BATCH_SIZE", 10)),
+    "STATS_LOG_INTERVAL": float(os.getenv("PRODUCT_LOOKUP_BATCH_STATS_LOG_INTERVAL", 300)),
+}
+
+# Token buckets shared by all processes calling the nutrition API. MAX_WAIT is how long
+# a caller may block for a token before failing; interactive lookups should fail fast.
+NUTRITION_API_RATE_LIMITS = {
+    "interactive": {
+        "RATE": float(os.getenv("NUTRITION_API_INTERACTIVE_RATE", 5)),
+        "CAPACITY": int(os.getenv("NUTRITION_API_INTERACTIVE_CAPACITY", 10)),
+        "MAX_WAIT": float(os.getenv("NUTRITION_API_INTERACTIVE_MAX_WAIT", 0.5)),
+    },
+    "background": {
+        "RATE": float(os.getenv("NUTRITION_API_BACKGROUND_RATE", 1)),
+        "CAPACITY": int(os.getenv("NUTRITION_API_BACKGROUND_CAPACITY", 2)),
+        "MAX_WAIT": float(os.getenv("NUTRITION_API_BACKGROUND_MAX_WAIT", 30)),
+    },
+}
+
+NUTRITION_API_CIRCUIT_BREAKER = {
+    "FAILURE_THRESHOLD": int(os.getenv("NUTRITION_API_CIRCUIT_FAILURE_THRESHOLD", 5)),
+    "FAILURE_WINDOW": int(os.getenv("NUTRITION_API_CIRCUIT_FAILURE_WINDOW", 60)),
+    "RESET_TIMEOUT": int(os.getenv("NUTRITION_API_CIRCUIT_RESET_TIMEOUT", 30)),
+    "PROBE_TIMEOUT": int(os.getenv("NUTRITION_API_CIRCUIT_PROBE_TIMEOUT", 20)),
+}
+
+# Optional api-ninjas compatible source asked when the primary API fails or is slow.
+NUTRITION_SECONDARY_PROVIDERS = [
+    {
+        "NAME": "secondary",
+        "BASE_URL": os.getenv("NUTRITION_SECONDARY_API_BASE_URL"),
+        "API_KEY": os.getenv("NUTRITION_SECONDARY_API_KEY", ""),
+    },
+] if os.getenv("NUTRITION_SECONDARY_API_BASE_URL") else []
+
+NUTRITION_API_HEDGING = {
+    "ENABLED": bool(int(os.getenv("NUTRITION_API_HEDGING", 1))),
+    "PERCENTILE": float(os.getenv("NUTRITION_API_HEDGE_PERCENTILE", 95)),
+    "MIN_DELAY": float(os.getenv("NUTRITION_API_HEDGE_MIN_DELAY", 0.05)),
+    "MAX_DELAY": float(os.getenv("NUTRITION_API_HEDGE_MAX_DELAY", 2)),
+    "MIN_SAMPLES": int(os.getenv("NUTRITION_API_HEDGE_MIN_SAMPLES", 20)),
+    "MAX_WORKERS": int(os.getenv("NUTRITION_API_HEDGE_MAX_WORKERS", 8)),
+}
+
+PRODUCT_INDEX = {
+    # Seconds between pulls of newly added products into the per-process search indexes.
+    "SYNC_INTERVAL": float(os.getenv("PRODUCT_INDEX_SYNC_INTERVAL", 5)),
+    # Seconds after which an index is rebuilt from scratch even if nothing was reported changed.
+    "REBUILD_INTERVAL": float(os.getenv("PRODUCT_INDEX_REBUILD_INTERVAL", 60 * 60 * 6)),
+    "POPULARITY_WINDOW_DAYS": int(os.getenv("PRODUCT_INDEX_POPULARITY_WINDOW_DAYS", 90)),
+    # Build and refresh the indexes in a separate thread, so requests never wait for them.
+    "BUILD_IN_BACKGROUND": bool(int(os.getenv("PRODUCT_INDEX_BUILD_IN_BACKGROUND", 1))),
+}
+
+PRODUCT_FUZZY_MATCH = {
+    # Whether ProductFinder accepts a close spelling of a known product before asking the API.
+    "ENABLED": bool(int(os.getenv("PRODUCT_FUZZY_MATCH_ENABLED", 1))),
+    "MIN_LENGTH": int(os.getenv("PRODUCT_FUZZY_MATCH_MIN_LENGTH", 5)),
+    "MAX_DISTANCE": int(os.getenv("PRODUCT_FUZZY_MATCH_MAX_DISTANCE", 1)),
+}
+
+PRODUCT_UPDATER = {
+    # Products read from the database per page.
+    "BATCH_SIZE": int(os.getenv("PRODUCT_UPDATER_BATCH_SIZE", 500)),
+    # Longest query string the nutrition API accepts; names are packed into queries up to it.
+    "MAX_QUERY_LENGTH": int(os.getenv("PRODUCT_UPDATER_MAX_QUERY_LENGTH", 1500)),
+    # Products the API keeps failing on are retried after these many days, doubled per failure.
+    "QUARANTINE_BASE_DAYS": int(os.getenv("PRODUCT_UPDATER_QUARANTINE_BASE_DAYS", 1)),
+    "QUARANTINE_MAX_DAYS": int(os.getenv("PRODUCT_UPDATER_QUARANTINE_MAX_DAYS", 30)),
+    # The nightly run is split into shards of this many products, refreshed by at most
+    # MAX_PARALLEL_SHARDS workers at a time. Shard progress is kept for CHECKPOINT_TTL seconds.
+    "SHARD_SIZE": int(os.getenv("PRODUCT_UPDATER_SHARD_SIZE", 5000)),
+    "MAX_PARALLEL_SHARDS": int(os.getenv("PRODUCT_UPDATER_MAX_PARALLEL_SHARDS", 4)),
+    "CHECKPOINT_TTL": int(os.getenv("PRODUCT_UPDATER_CHECKPOINT_TTL", 60 * 60 * 48)),
+}
+
+PRODUCT_REFRESH = {
+    # Every SLICE_INTERVAL_MINUTES up to SLICE_SIZE stale products are refreshed, most popular first.
+    "SLICE_SIZE": int(os.getenv("PRODUCT_REFRESH_SLICE_SIZE", 200)),
+    "SLICE_INTERVAL_MINUTES": int(os.getenv("PRODUCT_REFRESH_SLICE_INTERVAL_MINUTES", 15)),
+    # Products with at least HOT_POPULARITY recent meals are stale after HOT_MAX_AGE_DAYS,
+    # other eaten ones after WARM_MAX_AGE_DAYS, never eaten ones after COLD_MAX_AGE_DAYS.
+    "HOT_POPULARITY": int(os.getenv("PRODUCT_REFRESH_HOT_POPULARITY", 10)),
+    "HOT_MAX_AGE_DAYS": float(os.getenv("PRODUCT_REFRESH_HOT_MAX_AGE_DAYS", 1)),
+    "WARM_MAX_AGE_DAYS": float(os.getenv("PRODUCT_REFRESH_WARM_MAX_AGE_DAYS", 7)),
+    "COLD_MAX_AGE_DAYS": float(os.getenv("PRODUCT_REFRESH_COLD_MAX_AGE_DAYS", 30)),
+}
+
+PRODUCT_NAME_FILTER = {
+    # Skip the database query for names a per-process Bloom filter has never seen.
+    "ENABLED": bool(int(os.getenv("PRODUCT_NAME_FILTER_ENABLED", 1))),
+    "ERROR_RATE": float(os.getenv("PRODUCT_NAME_FILTER_ERROR_RATE", 0.01)),
+    "MIN_CAPACITY": int(os.getenv("PRODUCT_NAME_FILTER_MIN_CAPACITY", 100000)),
+    "STATS_LOG_INTERVAL": float(os.getenv("PRODUCT_NAME_FILTER_STATS_LOG_INTERVAL", 300)),
+}
+
+PRODUCT_SNAPSHOT = {
+    # Shared by every worker on the host; web and celery containers mount the same project directory.
+    "PATH": os.getenv("PRODUCT_SNAPSHOT_PATH", str(BASE_DIR / "product_snapshot.bin")),
+    "CHECK_INTERVAL": float(os.getenv("PRODUCT_SNAPSHOT_CHECK_INTERVAL", 10)),
+    "BUILD_INTERVAL_MINUTES": int(os.getenv("PRODUCT_SNAPSHOT_BUILD_INTERVAL_MINUTES", 15)),
+}
+
+MEAL_CALORIE_RESOLUTION = {
+    # Meals added with "Prefer: respond-async" whose product isn't known yet are resolved
+    # BATCH_WINDOW seconds later, together with the others added meanwhile, BATCH_SIZE at a time.
+    "BATCH_WINDOW": float(os.getenv("MEAL_CALORIE_RESOLUTION_BATCH_WINDOW", 2)),
+    "BATCH_SIZE": int(os.getenv("MEAL_CALORIE_RESOLUTION_BATCH_SIZE", 100)),
+    # Meals left pending, e.g. while the nutrition API was unavailable, are retried this often.
+    "SWEEP_INTERVAL_MINUTES": int(os.getenv("MEAL_CALORIE_RESOLUTION_SWEEP_INTERVAL_MINUTES", 1)),
+    # A meal whose lookup failed waits RETRY_BASE_SECONDS, doubled per failure, at most RETRY_MAX_SECONDS.
+    "RETRY_BASE_SECONDS": int(os.getenv("MEAL_CALORIE_RESOLUTION_RETRY_BASE_SECONDS", 60)),
+    "RETRY_MAX_SECONDS": int(os.getenv("MEAL_CALORIE_RESOLUTION_RETRY_MAX_SECONDS", 3600)),
+}
+
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER", "redis://redis:6379/0")
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://redis:6379/1")
 
 CELERY_BEAT_SCHEDULE = {
-    "product_updater_scheduled_task": {
-        "task": "product.tasks.product_updater_scheduled_task",
-        "schedule": crontab(minute=0, hour=0),
-    }
+    "product_refresh_slice_task": {
+        "task": "product.tasks.product_refresh_slice_task",
+        "schedule": crontab(minute=f"*/{PRODUCT_REFRESH['SLICE_INTERVAL_MINUTES']}"),
+    },
+    "product_popularity_task": {
+        "task": "product.tasks.product_popularity_task",
+        "schedule": crontab(minute=30, hour=3),
+    },
+    "product_snapshot_scheduled_task": {
+        "task": "product.tasks.product_snapshot_scheduled_task",
+        # Offset by half an interval, so it doesn't run alongside the refresh slices.
+        "schedule": crontab(
+            minute=f"{PRODUCT_SNAPSHOT['BUILD_INTERVAL_MINUTES'] // 2}-59/{PRODUCT_SNAPSHOT['BUILD_INTERVAL_MINUTES']}",
+        ),
+    },
+    "resolve_pending_meals_task": {
+        "task": "meal.tasks.resolve_pending_meals_task",
+        "schedule": crontab(minute=f"*/{MEAL_CALORIE_RESOLUTION['SWEEP_INTERVAL_MINUTES']}"),
+    },
 }
@@ -25,4 +25,5 @@ urlpatterns = [
     path('api/', include('activity.urls')),
     path('api/', include('meal.urls')),
     path('api/', include('customer_profile.urls')),
+    path('api/', include('product.urls')),
 ]
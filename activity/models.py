@@ -11,6 +11,9 @@ class CustomerActivity(models.Model):
     class Meta:
         verbose_name = 'CustomerActivity'
         verbose_name_plural = 'CustomerActivities'
+        indexes = [
+            models.Index(fields=['customer', 'date_add'], name='activity_customer_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.customer} - {self.date_add} - {self.spent_calories}kcal"
@@ -11,7 +11,8 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from users.models import Customer
-from django.db import models
+from services.daily_summary import get_daily_summary
+from services.dates import get_day_range
 from datetime import datetime
 
 
@@ -52,8 +53,13 @@ class CustomerActivitySummarizeData(APIView):
         else:
             date = datetime.now()
 
-        activities = CustomerActivity.objects.filter(customer=customer, date_add__date=date.date())
-        total_calories = activities.aggregate(total_calories=models.Sum('spent_calories'))['total_calories'] or 0
+        day_start, day_end = get_day_range(date)
+        activities = CustomerActivity.objects.filter(
+            customer=customer,
+            date_add__gte=day_start,
+            date_add__lt=day_end,
+        ).order_by('id')
+        total_calories = get_daily_summary(customer.pk, date).activity_calories
         serialized_activities = CustomerActivitySerializer(activities, many=True)
 
         response_data = {
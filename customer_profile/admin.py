@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomerProfile
+from .models import CustomerProfile, DailySummary
 
 
 class CustomerProfileAdmin(admin.ModelAdmin):
@@ -9,3 +9,14 @@ class CustomerProfileAdmin(admin.ModelAdmin):
 
 
 admin.site.register(CustomerProfile, CustomerProfileAdmin)
+
+
+class DailySummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'customer', 'date', 'breakfast_calories', 'lunch_calories', 'dinner_calories',
+        'meal_count', 'activity_calories', 'activity_count',
+    )
+    list_filter = ('date',)
+
+
+admin.site.register(DailySummary, DailySummaryAdmin)
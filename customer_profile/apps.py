@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CustomerProfileConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customer_profile'
+
+    def ready(self):
+        from . import signals  # noqa: F401
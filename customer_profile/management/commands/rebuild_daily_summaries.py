@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from services.daily_summary import rebuild_daily_summaries
+from users.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the customers' daily summaries from their meals and activities. Run it once "
+        "to backfill the table, and again to repair summaries that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customer", type=int, nargs="+", help="Only rebuild these customers' summaries.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Customers rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        customer_ids = options["customer"]
+        if customer_ids is None:
+            customer_ids = Customer.objects.order_by("id").values_list("id", flat=True)
+
+        customer_ids = list(customer_ids)
+        summaries = 0
+        for start in range(0, len(customer_ids), options["chunk_size"]):
+            summaries += rebuild_daily_summaries(customer_ids[start:start + options["chunk_size"]])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {summaries} daily summaries for {len(customer_ids)} customers."
+        ))
@@ -9,3 +9,31 @@ class CustomerProfile(models.Model):
 
     def __str__(self):
         return f"{self.customer} has a target of {self.target}kcal for a day"
+
+
+class DailySummary(models.Model):
+    """
+    A customer's meal and activity totals for one local day, kept up to date as meals
+    and activities are saved and deleted.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+    breakfast_calories = models.FloatField(default=0)
+    lunch_calories = models.FloatField(default=0)
+    dinner_calories = models.FloatField(default=0)
+    meal_count = models.IntegerField(default=0)
+    activity_calories = models.IntegerField(default=0)
+    activity_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'DailySummaries'
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'date'], name='daily_summary_customer_date_uniq'),
+        ]
+
+    @property
+    def total_calories(self):
+        return self.breakfast_calories + self.lunch_calories + self.dinner_calories
+
+    def __str__(self):
+        return f"{self.customer} on {self.date}: {self.total_calories}kcal eaten, {self.activity_calories}kcal spent"
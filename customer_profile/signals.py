@@ -0,0 +1,68 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from activity.models import CustomerActivity
+from meal.models import Meal
+from services.daily_summary import apply_changes, get_activity_changes, get_meal_changes, merge_changes
+
+MEAL_SUMMARY_FIELDS = ('user_id', 'date_add', 'meal_type', 'portion_calories')
+ACTIVITY_SUMMARY_FIELDS = ('customer_id', 'date_add', 'spent_calories')
+
+
+def remember_stored_values(sender, instance, fields):
+    # The values to take back out of the summary if an existing row changes.
+    instance._summary_stored_values = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._summary_stored_values = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(pre_save, sender=Meal)
+def remember_stored_meal(sender, instance, raw, **kwargs):
+    if not raw:
+        remember_stored_values(sender, instance, MEAL_SUMMARY_FIELDS)
+
+
+@receiver(post_save, sender=Meal)
+def count_saved_meal(sender, instance, raw, **kwargs):
+    if raw:
+        return
+
+    changes = [get_meal_changes(instance.user_id, instance.date_add, instance.meal_type, instance.portion_calories)]
+    stored_values = getattr(instance, '_summary_stored_values', None)
+    if stored_values is not None:
+        changes.append(get_meal_changes(*stored_values, sign=-1))
+    apply_changes(merge_changes(*changes))
+
+
+@receiver(post_delete, sender=Meal)
+def uncount_deleted_meal(sender, instance, **kwargs):
+    apply_changes(
+        get_meal_changes(instance.user_id, instance.date_add, instance.meal_type, instance.portion_calories, sign=-1),
+        create_missing=False,
+    )
+
+
+@receiver(pre_save, sender=CustomerActivity)
+def remember_stored_activity(sender, instance, raw, **kwargs):
+    if not raw:
+        remember_stored_values(sender, instance, ACTIVITY_SUMMARY_FIELDS)
+
+
+@receiver(post_save, sender=CustomerActivity)
+def count_saved_activity(sender, instance, raw, **kwargs):
+    if raw:
+        return
+
+    changes = [get_activity_changes(instance.customer_id, instance.date_add, instance.spent_calories)]
+    stored_values = getattr(instance, '_summary_stored_values', None)
+    if stored_values is not None:
+        changes.append(get_activity_changes(*stored_values, sign=-1))
+    apply_changes(merge_changes(*changes))
+
+
+@receiver(post_delete, sender=CustomerActivity)
+def uncount_deleted_activity(sender, instance, **kwargs):
+    apply_changes(
+        get_activity_changes(instance.customer_id, instance.date_add, instance.spent_calories, sign=-1),
+        create_missing=False,
+    )
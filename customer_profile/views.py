@@ -1,5 +1,4 @@
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
 
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
@@ -12,8 +11,7 @@ from .serializers import (
     CustomerProfileUpdateSerializer,
 )
 from users.models import Customer
-from meal.models import Meal
-from activity.models import CustomerActivity
+from services.daily_summary import get_daily_summary
 
 from datetime import date, datetime
 
@@ -120,8 +118,9 @@ class DailyStatisticsView(APIView):
         customer_id = request.user.id
 
         target = self.get_target(customer_id)
-        total_calories = self.get_total_calories(customer_id)
-        total_activity = self.get_total_activity(customer_id)
+        daily_summary = get_daily_summary(customer_id, self.get_date_from_request())
+        total_calories = self.get_total_calories(daily_summary)
+        total_activity = self.get_total_activity(daily_summary)
         calories_including_activity = self.get_calories_including_activity(
             total_calories,
             total_activity
@@ -148,37 +147,11 @@ class DailyStatisticsView(APIView):
         except (ValueError, Exception):
             return "target wasn't set"
 
-    def get_total_calories(self, customer_id):
-        given_date = self.get_date_from_request()
+    def get_total_calories(self, daily_summary):
+        return int(daily_summary.total_calories)
 
-        total_calories = Meal.objects.filter(
-            user=customer_id,
-            date_add__year=given_date.year,
-            date_add__month=given_date.month,
-            date_add__day=given_date.day,
-        ).aggregate(
-            Sum('portion_calories'),
-        )['portion_calories__sum']
-
-        if total_calories:
-            return int(total_calories)
-        else:
-            return 0
-
-    def get_total_activity(self, customer_id):
-        given_date = self.get_date_from_request()
-
-        total_activity = CustomerActivity.objects.filter(
-            customer=customer_id,
-            date_add__date=given_date,
-        ).aggregate(
-            Sum('spent_calories'),
-        )['spent_calories__sum']
-
-        if total_activity:
-            return int(total_activity)
-        else:
-            return 0
+    def get_total_activity(self, daily_summary):
+        return int(daily_summary.activity_calories)
 
     def get_date_from_request(self):
         input_date_add = self.request.query_params.get('date_add', None)
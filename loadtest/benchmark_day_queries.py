@@ -0,0 +1,124 @@
+"""
+Measures the latency of a user's one-day meal and activity queries as their history grows.
+Meals and activities are written for a throwaway customer into the configured database, which
+is left as it was afterwards:
+
+    python -m loadtest.benchmark_day_queries --days 30 365 1825 --meals-per-day 6 --queries 500
+
+The day-range filter the views use is compared with the date_add__day/__date filters they used
+before, which wrap the column in functions and so can't use the (user, date_add) index.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Calorie_counter.settings")
+django.setup()
+
+from django.db.models import Sum  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from activity.models import CustomerActivity  # noqa: E402
+from loadtest.benchmark_nutrition_client import get_percentile  # noqa: E402
+from meal.models import Meal  # noqa: E402
+from services.dates import get_day_range  # noqa: E402
+from users.models import Customer  # noqa: E402
+
+BATCH_SIZE = 5000
+
+
+def add_history(customer, first_day, days, meals_per_day, rng):
+    meals = []
+    activities = []
+
+    for day in range(days):
+        day_start, _ = get_day_range(first_day + timedelta(days=day))
+        for _ in range(meals_per_day):
+            meals.append(Meal(
+                user=customer,
+                date_add=day_start + timedelta(seconds=rng.randrange(86400)),
+                meal_type=rng.choice(("BR", "LU", "DI")),
+                product_name="apple",
+                portion_size=100,
+                portion_calories=52,
+            ))
+        activities.append(CustomerActivity(
+            customer=customer,
+            date_add=day_start + timedelta(seconds=rng.randrange(86400)),
+            spent_calories=rng.randint(100, 600),
+        ))
+
+    Meal.objects.bulk_create(meals, batch_size=BATCH_SIZE)
+    CustomerActivity.objects.bulk_create(activities, batch_size=BATCH_SIZE)
+
+
+def query_with_date_functions(customer, day):
+    meals = Meal.objects.filter(
+        user=customer, date_add__year=day.year, date_add__month=day.month, date_add__day=day.day,
+    ).aggregate(Sum('portion_calories'))
+    activities = CustomerActivity.objects.filter(
+        customer=customer, date_add__date=day,
+    ).aggregate(Sum('spent_calories'))
+    return meals, activities
+
+
+def query_with_day_range(customer, day):
+    day_start, day_end = get_day_range(day)
+    meals = Meal.objects.filter(
+        user=customer, date_add__gte=day_start, date_add__lt=day_end,
+    ).aggregate(Sum('portion_calories'))
+    activities = CustomerActivity.objects.filter(
+        customer=customer, date_add__gte=day_start, date_add__lt=day_end,
+    ).aggregate(Sum('spent_calories'))
+    return meals, activities
+
+
+def measure(query, customer, days):
+    latencies = []
+    for day in days:
+        started_at = time.perf_counter()
+        query(customer, day)
+        latencies.append(time.perf_counter() - started_at)
+    latencies.sort()
+    return "  ".join(f"p{percentile}: {get_percentile(latencies, percentile) * 1000:6.2f} ms" for percentile in (50, 99))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 1825])
+    parser.add_argument("--meals-per-day", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    customer = Customer.objects.create_user(
+        first_name="Benchmark",
+        last_name="Customer",
+        email=f"benchmark-{time.time_ns()}@example.com",
+        password=None,
+    )
+    last_day = timezone.localdate()
+
+    try:
+        history = 0
+        for days in sorted(args.days):
+            add_history(customer, last_day - timedelta(days=days - 1), days - history, args.meals_per_day, rng)
+            history = days
+
+            query_days = [last_day - timedelta(days=rng.randrange(days)) for _ in range(args.queries)]
+            print(
+                f"history: {days:>5} days  "
+                f"date functions: {measure(query_with_date_functions, customer, query_days)}  "
+                f"day range: {measure(query_with_day_range, customer, query_days)}"
+            )
+    finally:
+        customer.delete()
+
+
+if __name__ == "__main__":
+    main()
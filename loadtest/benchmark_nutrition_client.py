@@ -0,0 +1,81 @@
+"""
+Measures throughput and tail latency of NutritionAPIClient over real HTTP, usually against
+loadtest.fake_nutrition_api. Raise NUTRITION_API_INTERACTIVE_RATE first, otherwise the
+shared rate limiter is what gets measured:
+
+    NUTRITION_API_BASE_URL=http://localhost:8001 NUTRITION_API_INTERACTIVE_RATE=100000 \\
+        python -m loadtest.benchmark_nutrition_client --requests 2000 --concurrency 16
+"""
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Calorie_counter.settings")
+django.setup()
+
+import requests  # noqa: E402
+
+from loadtest.fake_nutrition_api import DEFAULT_CATALOG  # noqa: E402
+from services.nutrition import NutritionAPIClient  # noqa: E402
+
+
+def get_percentile(sorted_values, percentile):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))
+    return sorted_values[index]
+
+
+def run(total_requests, concurrency, product_names, batch_size, fresh_connections):
+    def call(_):
+        client = NutritionAPIClient(session=requests.Session()) if fresh_connections else NutritionAPIClient()
+        names = random.sample(product_names, min(batch_size, len(product_names)))
+
+        started_at = time.perf_counter()
+        try:
+            if batch_size == 1:
+                client.get_single_product_calories(names[0])
+            else:
+                client.get_multiple_products_calories(names)
+            error = None
+        except Exception as e:
+            error = type(e).__name__
+        return time.perf_counter() - started_at, error
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(total_requests)))
+    elapsed = time.perf_counter() - started_at
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = Counter(error for _, error in results if error)
+
+    print(f"requests: {total_requests}, concurrency: {concurrency}, products per request: {batch_size}")
+    print(f"throughput: {total_requests / elapsed:.1f} req/s ({elapsed:.2f} s)")
+    for percentile in (50, 90, 99, 99.9):
+        print(f"p{percentile}: {get_percentile(latencies, percentile) * 1000:.1f} ms")
+    print(f"max: {latencies[-1] * 1000:.1f} ms")
+    print(f"errors: {dict(errors) or 0}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1, help="Products per API query.")
+    parser.add_argument("--products", nargs="*", default=list(DEFAULT_CATALOG))
+    parser.add_argument(
+        "--fresh-connections",
+        action="store_true",
+        help="Open a new connection per request instead of the shared keep-alive pool.",
+    )
+    args = parser.parse_args(argv)
+
+    run(args.requests, args.concurrency, args.products, args.batch_size, args.fresh_connections)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measures fuzzy product search latency as the catalog grows. Catalogs of synthetic names are
+indexed in memory, so no database is needed:
+
+    python -m loadtest.benchmark_product_search --sizes 10000 100000 500000 --queries 2000
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Calorie_counter.settings")
+django.setup()
+
+from loadtest.benchmark_nutrition_client import get_percentile  # noqa: E402
+from services.product_index import IndexedProduct  # noqa: E402
+from services.product_search import FuzzyProductIndex  # noqa: E402
+
+SYLLABLES = [
+    onset + vowel + coda
+    for onset in ("b", "bl", "br", "c", "ch", "cr", "d", "f", "fl", "g", "gr", "h", "k", "l", "m",
+                  "n", "p", "pl", "pr", "r", "s", "sh", "sp", "st", "t", "tr", "v", "w", "z")
+    for vowel in ("a", "e", "i", "o", "u", "ai", "ea", "oo", "ou")
+    for coda in ("", "n", "r", "s", "t", "l", "m", "ck", "ng")
+]
+
+
+def generate_names(size, rng):
+    names = set()
+    while len(names) < size:
+        words = [
+            "".join(rng.choices(SYLLABLES, k=rng.randint(1, 3)))
+            for _ in range(rng.choice((1, 1, 2)))
+        ]
+        names.add(" ".join(words))
+    return sorted(names)
+
+
+def misspell(name, rng):
+    position = rng.randrange(len(name))
+    edit = rng.choice(("delete", "insert", "replace", "transpose"))
+
+    if edit == "delete":
+        return name[:position] + name[position + 1:]
+    if edit == "insert":
+        return name[:position] + rng.choice(string.ascii_lowercase) + name[position:]
+    if edit == "replace":
+        return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+    position = min(position, len(name) - 2)
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def build_index(names, rng):
+    index = FuzzyProductIndex()
+    products = [
+        IndexedProduct(id, name, name, 100.0, rng.randint(0, 50))
+        for id, name in enumerate(names, 1)
+    ]
+    index._state = index._build(products)
+    index._synced_at = float("inf")
+    return index
+
+
+def run(size, total_queries, rng):
+    names = generate_names(size, rng)
+
+    started_at = time.perf_counter()
+    index = build_index(names, rng)
+    build_time = time.perf_counter() - started_at
+
+    targets = rng.sample(names, min(total_queries, len(names)))
+    queries = [misspell(name, rng) for name in targets]
+
+    latencies = []
+    found = 0
+    for target, query in zip(targets, queries):
+        started_at = time.perf_counter()
+        results = index.search(query, limit=10)
+        latencies.append(time.perf_counter() - started_at)
+        found += any(product.name == target for product, _ in results)
+    latencies.sort()
+
+    print(
+        f"catalog: {size:>8}  build: {build_time:6.1f} s  "
+        + "  ".join(f"p{percentile}: {get_percentile(latencies, percentile) * 1000:6.2f} ms" for percentile in (50, 90, 99))
+        + f"  found: {found / len(queries):.0%}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000, 500000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        run(size, args.queries, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Local stand-in for the api-ninjas /v1/nutrition endpoint, for load tests and offline benchmarks.
+
+Run it and point the client at it:
+
+    python -m loadtest.fake_nutrition_api --port 8001 --latency-ms 80 --error-rate 0.01
+    NUTRITION_API_BASE_URL=http://localhost:8001 python3 manage.py runserver
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_CATALOG = {
+    "fried potato": 307.3,
+    "onion": 44.7,
+    "apple": 53.0,
+    "banana": 89.4,
+    "broccoli": 34.0,
+    "watermelon": 30.4,
+    "tomato": 18.2,
+    "coffee": 2.4,
+    "rice": 127.4,
+    "chicken breast": 166.2,
+    "egg": 147.0,
+    "yogurt": 60.8,
+}
+
+QUERY_SEPARATOR = re.compile(r"\s+and\s+", re.IGNORECASE)
+
+
+class FakeNutritionAPIConfig:
+
+    def __init__(
+            self,
+            catalog=None,
+            accept_any=False,
+            latency_dist="constant",
+            latency_ms=0.0,
+            latency_spread_ms=0.0,
+            error_rate=0.0,
+            throttle_rate=0.0,
+            retry_after=1,
+            rate_limit=0.0,
+            seed=None,
+    ):
+        self.catalog = {name.lower(): calories for name, calories in (catalog or DEFAULT_CATALOG).items()}
+        self.accept_any = accept_any
+        self.latency_dist = latency_dist
+        self.latency_ms = latency_ms
+        self.latency_spread_ms = latency_spread_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+
+
+class FakeNutritionAPIState:
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.counters = dict(requests=0, products=0, ok=0, not_found=0, errors=0, throttled=0)
+        self.tokens = config.rate_limit
+        self.tokens_updated_at = time.monotonic()
+
+    def count(self, counter, value=1):
+        with self.lock:
+            self.counters[counter] += value
+
+    def take_token(self):
+        if not self.config.rate_limit:
+            return True, None
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.config.rate_limit,
+                self.tokens + (now - self.tokens_updated_at) * self.config.rate_limit,
+            )
+            self.tokens_updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True, int(self.tokens)
+            return False, 0
+
+    def get_latency(self):
+        config = self.config
+        with self.lock:
+            if config.latency_dist == "uniform":
+                latency = config.random.uniform(
+                    config.latency_ms - config.latency_spread_ms,
+                    config.latency_ms + config.latency_spread_ms,
+                )
+            elif config.latency_dist == "exponential":
+                latency = config.random.expovariate(1 / config.latency_ms) if config.latency_ms else 0
+            elif config.latency_dist == "lognormal":
+                # latency_ms is the median, latency_spread_ms the sigma in milliseconds around it.
+                sigma = config.latency_spread_ms / config.latency_ms if config.latency_ms else 0
+                latency = config.latency_ms * config.random.lognormvariate(0, sigma)
+            else:
+                latency = config.latency_ms
+            roll = config.random.random()
+
+        return max(latency, 0) / 1000, roll
+
+    def find_product(self, product_name):
+        name = " ".join(product_name.lower().split())
+        if name in self.config.catalog:
+            return name, self.config.catalog[name]
+        if self.config.accept_any and name:
+            digest = hashlib.blake2b(name.encode(), digest_size=4).digest()
+            return name, round(int.from_bytes(digest, "big") % 9000 / 10, 1)
+        return None
+
+
+def make_item(name, calories):
+    return {
+        "name": name,
+        "calories": calories,
+        "serving_size_g": 100,
+        "fat_total_g": 0,
+        "fat_saturated_g": 0,
+        "protein_g": 0,
+        "sodium_mg": 0,
+        "potassium_mg": 0,
+        "cholesterol_mg": 0,
+        "carbohydrates_total_g": 0,
+        "fiber_g": 0,
+        "sugar_g": 0,
+    }
+
+
+class FakeNutritionAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeNutritionAPI/1.0"
+
+    def do_GET(self):
+        state = self.server.state
+        url = urlparse(self.path)
+
+        if url.path == "/stats":
+            with state.lock:
+                return self._send_json(200, dict(state.counters))
+        if url.path != "/v1/nutrition":
+            return self._send_json(404, {"error": "Not found."})
+
+        state.count("requests")
+        latency, roll = state.get_latency()
+        time.sleep(latency)
+
+        if not self.headers.get("X-Api-Key"):
+            state.count("errors")
+            return self._send_json(400, {"error": "Missing API Key."})
+
+        allowed, remaining = state.take_token()
+        if not allowed or roll < state.config.throttle_rate:
+            state.count("throttled")
+            return self._send_json(
+                429,
+                {"error": "Too many requests."},
+                headers={"Retry-After": str(state.config.retry_after), "X-RateLimit-Remaining": "0"},
+            )
+        if roll < state.config.throttle_rate + state.config.error_rate:
+            state.count("errors")
+            return self._send_json(500, {"error": "Internal server error."})
+
+        query = parse_qs(url.query).get("query", [""])[0]
+        product_names = [name for name in QUERY_SEPARATOR.split(query) if name.strip()]
+        state.count("products", len(product_names))
+
+        items = []
+        for product_name in product_names:
+            product = state.find_product(product_name)
+            if product is not None:
+                items.append(make_item(*product))
+
+        state.count("ok" if items else "not_found")
+        headers = {"X-RateLimit-Remaining": str(remaining)} if remaining is not None else {}
+        return self._send_json(200, items, headers=headers)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status_code, data, headers=None):
+        body = json.dumps(data).encode()
+
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def build_server(host="127.0.0.1", port=8001, config=None, quiet=True):
+    server = ThreadingHTTPServer((host, port), FakeNutritionAPIHandler)
+    server.daemon_threads = True
+    server.state = FakeNutritionAPIState(config or FakeNutritionAPIConfig())
+    server.quiet = quiet
+    return server
+
+
+def load_catalog(path):
+    """
+    Accepts {"name": calories} or a list of api-ninjas items.
+    """
+    with open(path) as catalog_file:
+        data = json.load(catalog_file)
+
+    if isinstance(data, dict):
+        return data
+    return {item["name"]: item["calories"] for item in data}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--catalog", help="JSON file with products, defaults to a small built-in catalog.")
+    parser.add_argument("--accept-any", action="store_true", help="Answer every name with stable fake calories.")
+    parser.add_argument(
+        "--latency-dist",
+        choices=["constant", "uniform", "exponential", "lognormal"],
+        default="constant",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean (median for lognormal) latency.")
+    parser.add_argument("--latency-spread-ms", type=float, default=0.0, help="Uniform half-width or lognormal sigma.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429.")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429.")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before 429, 0 is unlimited.")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args(argv)
+
+    config = FakeNutritionAPIConfig(
+        catalog=load_catalog(args.catalog) if args.catalog else None,
+        accept_any=args.accept_any,
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_spread_ms=args.latency_spread_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    server = build_server(args.host, args.port, config, quiet=not args.verbose)
+
+    print(f"Fake nutrition API listening on http://{args.host}:{server.server_address[1]}/v1/nutrition")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
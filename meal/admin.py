@@ -10,8 +10,10 @@ class MealAdmin(admin.ModelAdmin):
         'meal_type',
         'product_name',
         'portion_size',
-        'portion_calories'
+        'portion_calories',
+        'calorie_status',
     )
+    list_filter = ('calorie_status',)
 
 
 admin.site.register(Meal, MealAdmin)
@@ -12,6 +12,14 @@ class Meal(models.Model):
         (LUNCH, "lunch"),
         (DINNER, "dinner")
     ]
+    CALORIES_RESOLVED = "resolved"
+    CALORIES_PENDING = "pending"
+    CALORIES_FAILED = "failed"
+    CALORIE_STATUS_CHOICES = [
+        (CALORIES_RESOLVED, "resolved"),
+        (CALORIES_PENDING, "pending"),
+        (CALORIES_FAILED, "failed"),
+    ]
 
     user = models.ForeignKey(Customer, on_delete=models.CASCADE)
     date_add = models.DateTimeField()
@@ -21,7 +29,22 @@ class Meal(models.Model):
     )
     product_name = models.CharField(max_length=50)
     portion_size = models.PositiveIntegerField(validators=[MinValueValidator(1)])
-    portion_calories = models.FloatField()
+    # Null until the product's calories are known, see calorie_status.
+    portion_calories = models.FloatField(null=True, blank=True)
+    calorie_status = models.CharField(
+        max_length=8,
+        choices=CALORIE_STATUS_CHOICES,
+        default=CALORIES_RESOLVED,
+    )
+    # Failed lookups of a pending meal's product, and when to look it up again.
+    calorie_attempts = models.PositiveIntegerField(default=0, editable=False)
+    calorie_retry_after = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date_add'], name='meal_user_date_idx'),
+            models.Index(fields=['calorie_status', 'id'], name='meal_calorie_status_idx'),
+        ]
 
     def __str__(self):
         return (f"{self.user} ate {self.portion_size}g/ml of {self.product_name} for {self.meal_type} "
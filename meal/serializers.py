@@ -1,7 +1,9 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Meal
 
-from meal.utils import get_product_calories
+from meal.tasks import schedule_pending_meals_resolution
+from meal.utils import get_known_product_calories, get_portion_calories, get_product_calories
 
 
 class MealSerializer(serializers.ModelSerializer):
@@ -15,17 +17,24 @@ class MealSerializer(serializers.ModelSerializer):
             'product_name',
             'portion_size',
             'portion_calories',
+            'calorie_status',
         ]
         read_only_fields = [
             'id',
             'portion_calories',
+            'calorie_status',
         ]
 
     def create(self, validated_data):
         user = self.context['user']    # Get the current authenticated user
         given_product = validated_data["product_name"]
 
-        product_calories = get_product_calories(given_product)
+        # In the background mode a product the nutrition API has to be asked about
+        # leaves the meal pending instead of holding up the request.
+        if self.context.get('respond_async'):
+            product_calories = get_known_product_calories(given_product)
+        else:
+            product_calories = get_product_calories(given_product)
 
         meal = Meal(
             user=user,
@@ -33,9 +42,15 @@ class MealSerializer(serializers.ModelSerializer):
             meal_type=validated_data['meal_type'],
             product_name=validated_data['product_name'],
             portion_size=validated_data['portion_size'],
-            portion_calories=int(round(validated_data['portion_size'] / 100 * product_calories)),
         )
+        if product_calories is None:
+            meal.calorie_status = Meal.CALORIES_PENDING
+        else:
+            meal.portion_calories = get_portion_calories(validated_data['portion_size'], product_calories)
         meal.save()
+
+        if meal.calorie_status == Meal.CALORIES_PENDING:
+            transaction.on_commit(schedule_pending_meals_resolution)
         return meal
 
 
@@ -47,6 +62,7 @@ class MealUpdateSerializer(MealSerializer):
             'date_add',
             'product_name',
             'portion_calories',
+            'calorie_status',
         ]
 
     def update(self, instance, validated_data):
@@ -54,7 +70,8 @@ class MealUpdateSerializer(MealSerializer):
 
         if 'portion_size' in validated_data:
             product_calories = get_product_calories(given_product)
-            validated_data['portion_calories'] = int(
-                round(validated_data['portion_size'] / 100 * product_calories),
+            validated_data['portion_calories'] = get_portion_calories(
+                validated_data['portion_size'], product_calories,
             )
+            validated_data['calorie_status'] = Meal.CALORIES_RESOLVED
         return super().update(instance, validated_data)
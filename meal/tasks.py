@@ -0,0 +1,49 @@
+import redis
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from Calorie_counter.settings import MEAL_CALORIE_RESOLUTION
+from meal.utils import resolve_pending_meals
+from services.redis_client import get_redis
+
+logger = get_task_logger("celery_logger")
+
+RESOLUTION_SCHEDULED_KEY = "meal:calorie_resolution_scheduled"
+
+
+def schedule_pending_meals_resolution():
+    """
+    Resolves pending meals BATCH_WINDOW seconds from now, unless a resolution is already due,
+    so the meals added meanwhile are resolved in the same batch.
+    """
+    window = MEAL_CALORIE_RESOLUTION["BATCH_WINDOW"]
+
+    try:
+        scheduled = get_redis().set(RESOLUTION_SCHEDULED_KEY, 1, nx=True, px=max(1, int(window * 1000)))
+    except redis.RedisError as e:
+        logger.warning("Meal resolution schedule unavailable: %s", e)
+        scheduled = True
+
+    if not scheduled:
+        return
+
+    try:
+        resolve_pending_meals_task.apply_async(countdown=window)
+    except Exception as e:
+        # The periodic sweep picks the meals up.
+        logger.warning("Meal resolution not scheduled: %s", e)
+
+
+@shared_task()
+def resolve_pending_meals_task():
+    """
+    Resolves a batch of pending meals. Runs shortly after meals are added in the background
+    and periodically for the meals left pending.
+    """
+    batch_size = MEAL_CALORIE_RESOLUTION["BATCH_SIZE"]
+    meals, resolved, failed = resolve_pending_meals(batch_size)
+
+    if meals:
+        logger.info("Pending meals: %s taken, %s resolved, %s failed", meals, resolved, failed)
+    if meals == batch_size and resolved + failed:
+        resolve_pending_meals_task.delay()
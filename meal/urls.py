@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     MealView,
+    MealBulkView,
     MealRetrieveDestroyView,
     MealUpdateView,
     MealListView,
@@ -10,6 +11,7 @@ from .views import (
 urlpatterns = [
     path('meal/listview/<pk>/', MealListView.as_view(), name='customer-listview'),
     path('meal/add/', MealView.as_view(), name='customer-meal-add'),
-    path('meal/<pk>/', MealRetrieveDestroyView.as_view({'get': 'retrieve', 'delete': 'destroy'}), name='customer-meal'),
+    path('meal/add/bulk/', MealBulkView.as_view(), name='customer-meal-add-bulk'),
+    path('meal/<pk>/', MealRetrieveDestroyView.as_view({'get': 'retrieve', 'delete': 'destroy'}), name='customer-meal-detail'),
     path('meal/update/<pk>/', MealUpdateView.as_view(), name='customer-meal'),
 ]
@@ -1,7 +1,24 @@
-from rest_framework import serializers
+from collections import defaultdict
+from datetime import timedelta
 
-from services.nutrition import ProductNotFoundException
-from services.product_finder import ProductFinder
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from Calorie_counter.settings import MEAL_CALORIE_RESOLUTION
+from meal.models import Meal
+from services.daily_summary import add_meals, apply_changes, get_meal_changes, merge_changes
+from services.negative_cache import negative_product_cache
+from services.nutrition import ProductNotFoundException, NutritionAPIException, PRODUCT_NOT_FOUND_MESSAGE
+from services.product_finder import InvalidProductException, ProductFinder
+
+
+class NutritionServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Nutrition service is temporarily unavailable, try again later."
+    default_code = "nutrition_service_unavailable"
 
 
 def get_product_calories(given_product):
@@ -11,3 +28,141 @@ def get_product_calories(given_product):
         return calories
     except ProductNotFoundException as e:
         raise serializers.ValidationError({"error": str(e)})
+    except NutritionAPIException as e:
+        raise NutritionServiceUnavailable({"error": str(e)})
+
+
+def get_products_calories(given_products):
+    """
+    Returns the calories of every found product and an error for every other one,
+    both by given name.
+    """
+    product_finder = ProductFinder()
+    calories, exceptions = product_finder.find_many(given_products)
+    errors = {given_product: {"error": str(e)} for given_product, e in exceptions.items()}
+    return calories, errors
+
+
+def get_portion_calories(portion_size, product_calories):
+    return int(round(portion_size / 100 * product_calories))
+
+
+def create_meals(customer, meals):
+    """
+    Inserts a customer's meals with one statement in a transaction and counts them in the
+    daily summaries. Where the database can't return the new rows' ids (MySQL), they are
+    read back and matched to the meals by their values.
+    """
+    with transaction.atomic():
+        last_id = None
+        if not connection.features.can_return_rows_from_bulk_insert:
+            last_id = Meal.objects.filter(user=customer).aggregate(last_id=Max('id'))['last_id'] or 0
+
+        meals = Meal.objects.bulk_create(meals)
+        if last_id is not None:
+            set_created_meal_ids(customer, meals, last_id)
+        add_meals(meals)
+    return meals
+
+
+def set_created_meal_ids(customer, meals, last_id):
+    fields = ['date_add', 'meal_type', 'product_name', 'portion_size', 'portion_calories']
+
+    ids_by_values = defaultdict(list)
+    for id, *values in Meal.objects.filter(user=customer, id__gt=last_id).order_by('id').values_list('id', *fields):
+        ids_by_values[tuple(values)].append(id)
+
+    # Meals with equal values are interchangeable, whichever row each gets.
+    for meal in meals:
+        meal.pk = ids_by_values[tuple(getattr(meal, field) for field in fields)].pop(0)
+
+
+def get_known_product_calories(given_product):
+    """
+    Returns the calories of a product known without asking the nutrition API, or None.
+    """
+    product_finder = ProductFinder()
+
+    calories = product_finder.search_in_database(given_product)
+    if calories is None:
+        calories = product_finder.search_similar_in_database(given_product)
+    if calories is None and negative_product_cache.contains(given_product):
+        raise serializers.ValidationError({"error": PRODUCT_NOT_FOUND_MESSAGE})
+    return calories
+
+
+def resolve_pending_meals(limit):
+    """
+    Works out the calories of up to `limit` pending meals due for a lookup, resolving their
+    distinct products together. Meals of unknown or invalid products fail; the ones whose
+    products couldn't be looked up stay pending and wait longer with every failed lookup.
+    Returns the number of meals taken, resolved and failed.
+    """
+    now = timezone.now()
+    meals = list(
+        Meal.objects.filter(calorie_status=Meal.CALORIES_PENDING)
+        .filter(Q(calorie_retry_after__isnull=True) | Q(calorie_retry_after__lte=now))
+        .order_by('id')[:limit]
+    )
+    if not meals:
+        return 0, 0, 0
+
+    calories, exceptions = ProductFinder().find_many({meal.product_name for meal in meals})
+
+    resolved = failed = 0
+    changes = []
+    retried = defaultdict(list)
+    for meal in meals:
+        if meal.product_name in calories:
+            portion_calories = get_portion_calories(meal.portion_size, calories[meal.product_name])
+            calorie_status = Meal.CALORIES_RESOLVED
+        elif isinstance(exceptions[meal.product_name], (ProductNotFoundException, InvalidProductException)):
+            portion_calories = None
+            calorie_status = Meal.CALORIES_FAILED
+        else:
+            retried[meal.calorie_attempts + 1].append(meal.pk)
+            continue
+
+        # Skips meals the customer changed or deleted meanwhile; changed ones are taken
+        # again by the next run.
+        updated = Meal.objects.filter(
+            pk=meal.pk,
+            calorie_status=Meal.CALORIES_PENDING,
+            date_add=meal.date_add,
+            meal_type=meal.meal_type,
+            product_name=meal.product_name,
+            portion_size=meal.portion_size,
+        ).update(
+            portion_calories=portion_calories,
+            calorie_status=calorie_status,
+        )
+        if not updated:
+            continue
+
+        if calorie_status == Meal.CALORIES_RESOLVED:
+            resolved += 1
+            changes.append(get_meal_changes(meal.user_id, meal.date_add, meal.meal_type, portion_calories))
+            changes.append(get_meal_changes(meal.user_id, meal.date_add, meal.meal_type, None, sign=-1))
+        else:
+            failed += 1
+
+    # QuerySet.update() doesn't send the signals that keep the daily summaries.
+    apply_changes(merge_changes(*changes))
+    postpone_pending_meals(retried, now)
+    return len(meals), resolved, failed
+
+
+def postpone_pending_meals(meal_ids_by_attempts, now):
+    """
+    Puts meals whose lookup failed aside for RETRY_BASE_SECONDS doubled with every further
+    failure, at most RETRY_MAX_SECONDS.
+    """
+    for attempts, meal_ids in meal_ids_by_attempts.items():
+        seconds = min(
+            MEAL_CALORIE_RESOLUTION["RETRY_BASE_SECONDS"] * 2 ** (attempts - 1),
+            MEAL_CALORIE_RESOLUTION["RETRY_MAX_SECONDS"],
+        )
+        Meal.objects.filter(pk__in=meal_ids, calorie_status=Meal.CALORIES_PENDING).update(
+            calorie_attempts=attempts,
+            calorie_retry_after=now + timedelta(seconds=seconds),
+        )
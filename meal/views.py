@@ -1,4 +1,7 @@
+import re
+
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.permissions import IsAuthenticated
@@ -13,6 +16,9 @@ from .serializers import (
 from .permissions import IsOwner
 from users.models import Customer
 from meal.models import Meal
+from meal.utils import create_meals, get_portion_calories, get_products_calories
+from services.daily_summary import MEAL_CALORIES_FIELDS, get_daily_summary
+from services.dates import get_day_range
 from services.nutrition import ProductNotFoundException    # needed for tests
 
 from datetime import date, datetime
@@ -44,16 +50,101 @@ class MealView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        respond_async = self.prefers_respond_async(request)
         serializer = MealSerializer(
             data=request.data,
-            context={"user": customer}
+            context={"user": customer, "respond_async": respond_async}
         )
 
         if serializer.is_valid(raise_exception=True):
             serializer.save()
 
+        if serializer.instance.calorie_status == Meal.CALORIES_PENDING:
+            # The meal's calories are filled in shortly; poll the meal until they are.
+            return Response(
+                serializer.data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={
+                    "Preference-Applied": "respond-async",
+                    "Location": reverse("customer-meal-detail", args=[serializer.instance.pk]),
+                },
+            )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @staticmethod
+    def prefers_respond_async(request):
+        preferences = re.split(r"[,;]", request.headers.get("Prefer", ""))
+        return "respond-async" in (preference.strip().lower() for preference in preferences)
+
+
+class MealBulkView(APIView):
+    """
+    Adds several meals at once. Their products are resolved together and the meals are
+    saved in one transaction; the meals that can't be added are reported by their index
+    in the request without failing the others.
+    """
+    permission_classes = [IsAuthenticated]
+
+    MAX_MEALS = 50
+
+    def post(self, request):
+        customer = get_object_or_404(
+            Customer,
+            pk=request.data.get("customer")
+        )
+
+        if request.user != customer:
+            return Response(
+                {"error": "Action not allowed."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        meals_data = request.data.get("meals")
+        if not isinstance(meals_data, list) or not 0 < len(meals_data) <= self.MAX_MEALS:
+            return Response(
+                {"error": f"'meals' must be a list of 1 to {self.MAX_MEALS} meals."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        errors = []
+        valid_meals = []
+        for index, meal_data in enumerate(meals_data):
+            serializer = MealSerializer(data=meal_data)
+            if serializer.is_valid():
+                valid_meals.append((index, serializer.validated_data))
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+
+        products_calories, product_errors = get_products_calories(
+            [validated_data["product_name"] for _, validated_data in valid_meals]
+        )
+
+        meals = []
+        for index, validated_data in valid_meals:
+            given_product = validated_data["product_name"]
+            if given_product in product_errors:
+                errors.append({"index": index, "errors": product_errors[given_product]})
+                continue
+
+            meals.append(Meal(
+                user=customer,
+                portion_calories=get_portion_calories(
+                    validated_data["portion_size"], products_calories[given_product],
+                ),
+                **validated_data,
+            ))
+
+        meals = create_meals(customer, meals)
+
+        errors.sort(key=lambda error: error["index"])
+        response_data = {
+            "created": MealSerializer(meals, many=True).data,
+            "errors": errors,
+        }
+        response_status = status.HTTP_201_CREATED if meals else status.HTTP_400_BAD_REQUEST
+
+        return Response(response_data, status=response_status)
+
 
 class MealRetrieveDestroyView(
     mixins.RetrieveModelMixin,
@@ -95,6 +186,13 @@ class MealListView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    MEAL_TYPE_KEYS = {
+        Meal.BREAKFAST: "breakfast",
+        Meal.LUNCH: "lunch",
+        Meal.DINNER: "dinner",
+    }
+    RECORD_FIELDS = ('id', 'date_add', 'product_name', 'portion_size', 'portion_calories')
+
     def get(self, request, pk):
         customer = get_object_or_404(Customer, pk=pk)
 
@@ -105,73 +203,52 @@ class MealListView(APIView):
             )
 
         try:
-            customer_meals = self.get_meals(pk)
+            given_date = self.get_date_from_request()
+            customer_meals = self.get_meals(pk, given_date)
         except (ValueError, Exception):
             return Response(
                 {"error": "Wrong date format! YYYY-MM-DD is needed."},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        response_data = self.create_response(customer_meals)
+        daily_summary = get_daily_summary(pk, given_date)
+        response_data = self.create_response(customer_meals, daily_summary)
 
         return Response(response_data, status=status.HTTP_200_OK)
 
-    def get_meals(self, customer_id):
+    def get_date_from_request(self):
         input_date_add = self.request.query_params.get('date_add', None)
 
         if input_date_add:
-            given_date = datetime.strptime(input_date_add, '%Y-%m-%d')
-        else:
-            given_date = date.today()
+            return datetime.strptime(input_date_add, '%Y-%m-%d').date()
+        return date.today()
 
+    def get_meals(self, customer_id, given_date):
+        day_start, day_end = get_day_range(given_date)
         customer_meals = Meal.objects.filter(
             user=customer_id,
-            date_add__year=given_date.year,
-            date_add__month=given_date.month,
-            date_add__day=given_date.day,
-        )
+            date_add__gte=day_start,
+            date_add__lt=day_end,
+        ).order_by('id')
 
         return customer_meals
 
-    def create_response(self, customer_meals):
-
-        breakfast_list = []
-        lunch_list = []
-        dinner_list = []
-
+    def create_response(self, customer_meals, daily_summary):
+        """
+        Groups the meals by type. The totals come from the day's summary, and only the
+        returned columns of the meals are read.
+        """
         response_data = {
-            "breakfast": {
-                "total": 0,
-                "records": breakfast_list
-            },
-            "lunch": {
-                "total": 0,
-                "records": lunch_list
-            },
-            "dinner": {
-                "total": 0,
-                "records": dinner_list
-            },
-        }
-
-        for meal in customer_meals:
-            meal_object = {
-                    "id": meal.id,
-                    "date_add": meal.date_add,
-                    "product_name": meal.product_name,
-                    "portion_size": meal.portion_size,
-                    "portion_calories": meal.portion_calories
+            meal_type_key: {
+                "total": int(getattr(daily_summary, MEAL_CALORIES_FIELDS[meal_type])),
+                "records": [],
             }
-            if meal.meal_type == "BR":
-                breakfast_list.append(meal_object)
-                response_data["breakfast"]["total"] += int(meal.portion_calories)
-
-            elif meal.meal_type == "LU":
-                lunch_list.append(meal_object)
-                response_data["lunch"]["total"] += int(meal.portion_calories)
+            for meal_type, meal_type_key in self.MEAL_TYPE_KEYS.items()
+        }
 
-            elif meal.meal_type == "DI":
-                dinner_list.append(meal_object)
-                response_data["dinner"]["total"] += int(meal.portion_calories)
+        for meal_type, *record in customer_meals.values_list('meal_type', *self.RECORD_FIELDS):
+            meal_type_key = self.MEAL_TYPE_KEYS.get(meal_type)
+            if meal_type_key is not None:
+                response_data[meal_type_key]["records"].append(dict(zip(self.RECORD_FIELDS, record)))
 
         return response_data
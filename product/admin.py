@@ -1,9 +1,48 @@
 from django.contrib import admin
-from .models import Product
+from .models import Product, ProductAlias
+from services.negative_cache import negative_product_cache
+from services.product_cache import product_cache
+
+
+class ProductAliasInline(admin.TabularInline):
+    model = ProductAlias
+    extra = 0
 
 
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'calories')
+    list_display = (
+        'id', 'name', 'normalized_name', 'calories', 'popularity', 'last_refreshed_at',
+        'refresh_failures', 'refresh_after',
+    )
+    search_fields = ('name', 'normalized_name', 'aliases__alias')
+    inlines = [ProductAliasInline]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        product_cache.invalidate([obj.normalized_name])
+        negative_product_cache.purge([obj.name])
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        aliases = list(form.instance.aliases.values_list('alias', flat=True))
+        product_cache.invalidate(aliases)
+        negative_product_cache.purge(aliases)
+
+    def delete_model(self, request, obj):
+        names = self._get_cached_names([obj])
+        super().delete_model(request, obj)
+        product_cache.invalidate(names)
+
+    def delete_queryset(self, request, queryset):
+        names = self._get_cached_names(queryset)
+        super().delete_queryset(request, queryset)
+        product_cache.invalidate(names)
+
+    @staticmethod
+    def _get_cached_names(products):
+        names = [product.normalized_name for product in products]
+        names += ProductAlias.objects.filter(product__in=products).values_list('alias', flat=True)
+        return names
 
 
 admin.site.register(Product, ProductAdmin)
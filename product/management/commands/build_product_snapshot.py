@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from Calorie_counter.settings import PRODUCT_SNAPSHOT
+from services.product_snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Writes the memory-mapped product catalog snapshot read by all workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=PRODUCT_SNAPSHOT["PATH"], help="Snapshot file to write.")
+
+    def handle(self, *args, **options):
+        names = build_snapshot(options["path"])
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {names} product names to {options['path']}."))
@@ -0,0 +1,157 @@
+import csv
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from product.models import Product
+from services.negative_cache import negative_product_cache
+from services.product_cache import product_cache
+from services.product_names import normalize_product_name
+
+NAME_MAX_LENGTH = Product._meta.get_field("name").max_length
+
+
+def open_dataset(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def iter_json_array(dataset_file, chunk_size=1 << 16):
+    """
+    Yields the items of a top-level JSON array without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+
+    for chunk in iter(lambda: dataset_file.read(chunk_size), ""):
+        buffer += chunk
+        position = 0
+
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started:
+                if position == len(buffer):
+                    break
+                if buffer[position] != "[":
+                    raise CommandError("A .json dataset must be an array of objects.")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item
+
+        buffer = buffer[position:]
+
+    if not started:
+        raise ValueError("the file holds no JSON array")
+    if buffer.strip():
+        raise ValueError("the JSON array is truncated or malformed")
+
+
+def iter_records(path, name_column, calories_column):
+    with open_dataset(path) as dataset_file:
+        stripped_path = path[:-3] if path.endswith(".gz") else path
+
+        if stripped_path.endswith(".csv"):
+            records = csv.DictReader(dataset_file)
+        elif stripped_path.endswith((".jsonl", ".ndjson")):
+            records = (json.loads(line) for line in dataset_file if line.strip())
+        elif stripped_path.endswith(".json"):
+            records = iter_json_array(dataset_file)
+        else:
+            raise CommandError("Supported datasets: .csv, .json, .jsonl, .ndjson (optionally gzipped).")
+
+        for record in records:
+            yield record.get(name_column), record.get(calories_column)
+
+
+class Command(BaseCommand):
+    help = "Streams a nutrition dataset (CSV or JSON) into the Product table with batched upserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Dataset file: .csv, .json, .jsonl or .ndjson, optionally .gz.")
+        parser.add_argument("--name-column", default="name")
+        parser.add_argument("--calories-column", default="calories", help="Calories per 100 g/ml.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--keep-existing",
+            action="store_true",
+            help="Don't overwrite calories of products that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+        total = imported = skipped = 0
+        batch = {}
+
+        try:
+            records = iter_records(options["path"], options["name_column"], options["calories_column"])
+            for name, calories in records:
+                total += 1
+                product = self._clean(name, calories)
+                if product is None:
+                    skipped += 1
+                    continue
+
+                batch[product.normalized_name] = product
+                if len(batch) >= options["batch_size"]:
+                    imported += self._write_batch(batch, options["keep_existing"])
+                    batch = {}
+                    self._report_progress(total, imported, skipped, started_at)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Failed to read {options['path']}: {e}")
+
+        if batch:
+            imported += self._write_batch(batch, options["keep_existing"])
+
+        product_cache.invalidate([])
+        self._report_progress(total, imported, skipped, started_at)
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} products, skipped {skipped} rows."))
+
+    @staticmethod
+    def _clean(name, calories):
+        if not name:
+            return None
+
+        name = " ".join(str(name).split())
+        normalized_name = normalize_product_name(name)
+        try:
+            calories = float(calories)
+        except (TypeError, ValueError):
+            return None
+
+        if not normalized_name or len(name) > NAME_MAX_LENGTH or calories < 0:
+            return None
+        return Product(
+            name=name, normalized_name=normalized_name, calories=calories, last_refreshed_at=timezone.now(),
+        )
+
+    @staticmethod
+    def _write_batch(batch, keep_existing):
+        products = list(batch.values())
+
+        if keep_existing:
+            Product.objects.bulk_create(products, ignore_conflicts=True)
+        else:
+            Product.objects.upsert(products)
+            product_cache.set_many({product.normalized_name: product.calories for product in products})
+        negative_product_cache.purge(batch.keys())
+        return len(products)
+
+    def _report_progress(self, total, imported, skipped, started_at):
+        elapsed = max(time.monotonic() - started_at, 1e-9)
+        self.stdout.write(
+            f"{total} rows read, {imported} upserted, {skipped} skipped, "
+            f"{total / elapsed:.0f} rows/s"
+        )
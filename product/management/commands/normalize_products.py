@@ -0,0 +1,47 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from product.models import Product, ProductAlias
+from services.product_cache import product_cache
+from services.product_names import normalize_product_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes normalized product names. Products whose names normalize to the same value "
+        "are merged into the oldest one, which takes over their aliases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change.")
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for product in Product.objects.order_by("id").iterator(chunk_size=5000):
+            groups[normalize_product_name(product.name)].append(product)
+
+        renamed = merged = 0
+        with transaction.atomic():
+            for normalized_name, products in groups.items():
+                canonical, duplicates = products[0], products[1:]
+
+                for duplicate in duplicates:
+                    self.stdout.write(f"Merging '{duplicate.name}' into '{canonical.name}'")
+                    if not options["dry_run"]:
+                        ProductAlias.objects.filter(product=duplicate).update(product=canonical)
+                        duplicate.delete()
+                    merged += 1
+
+                if canonical.normalized_name != normalized_name:
+                    renamed += 1
+                    if not options["dry_run"]:
+                        Product.objects.filter(pk=canonical.pk).update(normalized_name=normalized_name)
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+
+        if not options["dry_run"]:
+            product_cache.invalidate([])
+        self.stdout.write(self.style.SUCCESS(f"{renamed} normalized names updated, {merged} duplicates merged."))
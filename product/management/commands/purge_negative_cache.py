@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.negative_cache import negative_product_cache
+
+
+class Command(BaseCommand):
+    help = "Lists or purges product names remembered as unknown by the nutrition API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("product_names", nargs="*", help="Names to forget.")
+        parser.add_argument("--all", action="store_true", help="Forget every remembered name.")
+        parser.add_argument("--list", action="store_true", help="Only list remembered names.")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for product_name, expires_at in negative_product_cache.entries():
+                expires_at = datetime.fromtimestamp(expires_at, tz=timezone.utc)
+                self.stdout.write(f"{product_name}\t(expires {expires_at:%Y-%m-%d %H:%M:%S} UTC)")
+            return
+
+        if options["all"]:
+            removed = negative_product_cache.purge()
+        elif options["product_names"]:
+            removed = negative_product_cache.purge(options["product_names"])
+        else:
+            raise CommandError("Pass product names to purge, --all or --list.")
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {removed} negative cache entries."))
@@ -1,9 +1,113 @@
-from django.db import models
+from django.db import connection, models
+from django.utils import timezone
+
+from services.product_names import normalize_product_name
+
+
+class ProductManager(models.Manager):
+
+    def upsert(self, products):
+        """
+        Inserts the products in one statement. A product whose normalized name is already stored
+        updates that row's calories instead, so concurrent writers never fail. Products are
+        stamped as refreshed now unless they say otherwise. Returns the products as written,
+        one per normalized name; their ids are not set.
+        """
+        now = timezone.now()
+        products_by_name = {}
+        for product in products:
+            product.normalized_name = normalize_product_name(product.name)
+            if product.last_refreshed_at is None:
+                product.last_refreshed_at = now
+            products_by_name[product.normalized_name] = product
+        products = list(products_by_name.values())
+
+        options = dict(update_conflicts=True, update_fields=['calories', 'last_refreshed_at'])
+        if connection.features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['normalized_name']
+
+        self.bulk_create(products, **options)
+        return products
+
+    def get_calories_by_names(self, normalized_names):
+        """
+        Looks the normalized names up among products and their aliases in one query.
+        Returns calories by the names that were found.
+        """
+        normalized_names = set(normalized_names)
+        rows = self.filter(
+            models.Q(normalized_name__in=normalized_names) | models.Q(aliases__alias__in=normalized_names),
+        ).values_list('normalized_name', 'aliases__alias', 'calories')
+
+        calories_by_name = {}
+        for normalized_name, alias, calories in rows:
+            for name in (normalized_name, alias):
+                if name in normalized_names:
+                    calories_by_name[name] = calories
+        return calories_by_name
+
+    def get_by_name(self, name):
+        """
+        Finds the canonical product for any spelling of its name, or returns None.
+        """
+        normalized_name = normalize_product_name(name)
+
+        product = self.filter(normalized_name=normalized_name).first()
+        if product is not None:
+            return product
+
+        alias = ProductAlias.objects.select_related('product').filter(alias=normalized_name).first()
+        if alias is not None:
+            return alias.product
+        return None
 
 
 class Product(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    normalized_name = models.CharField(max_length=50, unique=True, editable=False)
     calories = models.FloatField()
+    # Consecutive nightly refreshes the nutrition API failed on, and the first day to try again.
+    refresh_failures = models.PositiveIntegerField(default=0, editable=False)
+    refresh_after = models.DateField(null=True, blank=True, editable=False)
+    last_refreshed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Recent meals with this product, recomputed daily; decides how often it is refreshed.
+    popularity = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProductManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-popularity', 'last_refreshed_at'], name='product_refresh_priority_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_product_name(self.name)
+        super().save(*args, **kwargs)
+
+    def add_alias(self, name):
+        alias = normalize_product_name(name)
+
+        if alias and alias != self.normalized_name:
+            ProductAlias.objects.get_or_create(alias=alias, defaults={'product': self})
 
     def __str__(self):
         return f"100 g/ml of {self.name} = {self.calories}kcal"
+
+
+class ProductAlias(models.Model):
+    """
+    Another spelling of a product's name, e.g. the name the nutrition API answers with.
+    """
+    alias = models.CharField(max_length=50, unique=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='aliases')
+
+    class Meta:
+        verbose_name = 'ProductAlias'
+        verbose_name_plural = 'ProductAliases'
+
+    def save(self, *args, **kwargs):
+        self.alias = normalize_product_name(self.alias)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.product.name}"
@@ -1,14 +1,88 @@
-from celery import shared_task
+import time
+from uuid import uuid4
+
+from celery import chain, chord, shared_task
 from celery.utils.log import get_task_logger
 
-from services.product_updater import ProductUpdater
+from Calorie_counter.settings import PRODUCT_REFRESH, PRODUCT_SNAPSHOT, PRODUCT_UPDATER
+from services.product_snapshot import build_snapshot
+from services.product_updater import (
+    ProductUpdater,
+    ShardCheckpoint,
+    get_id_ranges,
+    log_update_summary,
+    merge_update_stats,
+    update_product_popularity,
+)
 
 logger = get_task_logger("celery_logger")
 
 
+@shared_task()
+def product_refresh_slice_task():
+    """
+    Refreshes the stalest, most popular products. Runs every few minutes, so the catalog is
+    refreshed in small slices through the day. The snapshot is rebuilt when calories changed.
+    """
+    stats = ProductUpdater().update_stale(PRODUCT_REFRESH["SLICE_SIZE"])
+
+    if stats and stats["changed"]:
+        product_snapshot_scheduled_task.delay()
+
+
+@shared_task()
+def product_popularity_task():
+    changed = update_product_popularity()
+
+    logger.info("Product popularity updated for %s products", changed)
+
+
 @shared_task()
 def product_updater_scheduled_task():
-    updater = ProductUpdater(batch_size=2)
-    updater.update()
+    """
+    Refreshes the whole catalog at once, e.g. after switching nutrition APIs. The catalog is
+    split into id ranges of SHARD_SIZE products, refreshed in MAX_PARALLEL_SHARDS chains
+    running side by side. A chord callback sums up the run.
+    """
+    run_id = uuid4().hex
+    id_ranges = get_id_ranges(PRODUCT_UPDATER["SHARD_SIZE"])
+    lanes = [id_ranges[i::PRODUCT_UPDATER["MAX_PARALLEL_SHARDS"]] for i in range(PRODUCT_UPDATER["MAX_PARALLEL_SHARDS"])]
+
+    shard_chains = [
+        chain(
+            product_updater_shard_task.s({}, run_id, *lane[0]),
+            *[product_updater_shard_task.s(run_id, *id_range) for id_range in lane[1:]],
+        )
+        for lane in lanes if lane
+    ]
+    chord(shard_chains)(product_updater_summary_task.s(run_id, time.time()))
+
+    logger.info("ProductUpdater run %s dispatched in %s shards", run_id, len(id_ranges))
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def product_updater_shard_task(stats, run_id, min_id, max_id):
+    """
+    Refreshes products with min_id < id <= max_id and adds its statistics to those of the
+    shards before it in the chain. Safe to run again: it resumes from its checkpoint.
+    """
+    checkpoint = ShardCheckpoint(run_id, min_id, max_id)
+    shard_stats = ProductUpdater().update(min_id, max_id, checkpoint)
+
+    return merge_update_stats(stats, shard_stats)
+
+
+@shared_task()
+def product_updater_summary_task(results, run_id, started_at):
+    stats = merge_update_stats(*results)
+    log_update_summary(stats, time.time() - started_at, label=f"ProductUpdater run {run_id}")
+
+    product_snapshot_scheduled_task.delay()
+    return stats
+
+
+@shared_task()
+def product_snapshot_scheduled_task():
+    names = build_snapshot(PRODUCT_SNAPSHOT["PATH"])
 
-    logger.info("ProductUpdater executed")
+    logger.info("Product snapshot built with %s names", names)
@@ -0,0 +1,8 @@
+from django.urls import re_path
+from .views import ProductSearchView, ProductSuggestView
+
+
+urlpatterns = [
+    re_path(r'^products/suggest/?$', ProductSuggestView.as_view(), name='product-suggest'),
+    re_path(r'^products/search/?$', ProductSearchView.as_view(), name='product-search'),
+]
@@ -0,0 +1,71 @@
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+
+from services.product_search import fuzzy_product_index
+from services.product_suggest import product_suggest_index
+
+
+class InvalidQueryParams(Exception):
+    pass
+
+
+class ProductLookupView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+    def get(self, request):
+        try:
+            query, limit = self.get_query_params()
+        except InvalidQueryParams as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response_data = {"results": self.get_results(query, limit)}
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    def get_query_params(self):
+        query = self.request.query_params.get('q', '').strip()
+
+        if not query:
+            raise InvalidQueryParams("'q' query parameter is required.")
+
+        try:
+            limit = int(self.request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            raise InvalidQueryParams("'limit' must be a number.")
+
+        return query, max(1, min(limit, self.MAX_LIMIT))
+
+    def get_results(self, query, limit):
+        raise NotImplementedError
+
+
+class ProductSuggestView(ProductLookupView):
+    """
+    Products whose name starts with the query, most popular first.
+    """
+
+    def get_results(self, query, limit):
+        return [
+            {"name": product.name, "calories": product.calories}
+            for product in product_suggest_index.suggest(query, limit)
+        ]
+
+
+class ProductSearchView(ProductLookupView):
+    """
+    Products whose name is the query with a few typos, closest first.
+    """
+
+    def get_results(self, query, limit):
+        return [
+            {"name": product.name, "calories": product.calories, "distance": distance}
+            for product, distance in fuzzy_product_index.search(query, limit)
+        ]
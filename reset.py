@@ -1,4 +1,5 @@
 from product.models import Product
+from services.product_cache import product_cache
 
 
 def reset():
@@ -8,3 +9,4 @@ def reset():
         product.calories = 10
 
     Product.objects.bulk_update(products, ['calories'])
+    product_cache.invalidate([product.normalized_name for product in products])
@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Dict
+
+from django.db import connection
+
+from Calorie_counter.settings import PRODUCT_INDEX, PRODUCT_NAME_FILTER
+from product.models import Product, ProductAlias
+
+from .product_cache import product_cache
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives and a bounded false-positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str):
+        for position in self._get_positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._get_positions(item))
+
+    @property
+    def memory(self) -> int:
+        return len(self._bits)
+
+    def get_false_positive_rate(self) -> float:
+        """
+        Expected rate for the number of items added so far.
+        """
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+    def _get_positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+
+class ProductNameFilter:
+    """
+    Per-process Bloom filter of every normalized product name and alias, so lookups of names
+    that were never stored skip the database query.
+
+    It is built on first use and then, at most every PRODUCT_INDEX_SYNC_INTERVAL seconds,
+    products and aliases with ids above the highest seen are added. Names that stop existing
+    just stay in the filter. It is rebuilt when the product cache generation changes (names
+    may have been renamed), when it is older than PRODUCT_INDEX_REBUILD_INTERVAL, or when it
+    outgrows its capacity. With PRODUCT_INDEX_BUILD_IN_BACKGROUND the new filter is built in a
+    separate thread and swapped in when done; until then the old one answers, and every name
+    might be stored while there is none yet. Its size and false-positive rates are logged
+    after every rebuild and otherwise at most every PRODUCT_NAME_FILTER_STATS_LOG_INTERVAL
+    seconds.
+
+    Names stored by another process in the last sync interval are reported absent, so callers
+    must check the database again before treating a name as unknown.
+    """
+
+    def __init__(
+        self,
+        error_rate: float,
+        min_capacity: int,
+        sync_interval: float,
+        rebuild_interval: float,
+        stats_log_interval: float = None,
+    ):
+        self._error_rate = error_rate
+        self._min_capacity = min_capacity
+        self._sync_interval = sync_interval
+        self._rebuild_interval = rebuild_interval
+        self._filter = None
+        self._max_product_id = 0
+        self._max_alias_id = 0
+        self._generation = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._stats_log_interval = (
+            PRODUCT_NAME_FILTER["STATS_LOG_INTERVAL"] if stats_log_interval is None else stats_log_interval
+        )
+        self._stats_logged_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._counters = dict(checks=0, absent=0, false_positives=0)
+
+    def might_contain(self, normalized_name: str) -> bool:
+        self.ensure_fresh()
+
+        bloom_filter = self._filter
+        self._counters["checks"] += 1
+        if bloom_filter is None or normalized_name in bloom_filter:
+            return True
+
+        self._counters["absent"] += 1
+        return False
+
+    def add(self, normalized_name: str):
+        if self._filter is not None:
+            self._filter.add(normalized_name)
+
+    def record_false_positive(self):
+        self._counters["false_positives"] += 1
+
+    def ensure_fresh(self):
+        if self._filter is not None and time.monotonic() - self._synced_at < self._sync_interval:
+            return
+
+        in_background = PRODUCT_INDEX["BUILD_IN_BACKGROUND"]
+        if not self._lock.acquire(blocking=not in_background):
+            return
+
+        if in_background:
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_in_background, name="ProductNameFilter-refresh", daemon=True,
+            )
+            self._refresh_thread.start()
+        else:
+            self._refresh()
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("ProductNameFilter refresh failed")
+        finally:
+            connection.close()
+
+    def _refresh(self):
+        """
+        Syncs or rebuilds the filter. Called with self._lock held, which it releases.
+        """
+        try:
+            now = time.monotonic()
+            if self._filter is not None and now - self._synced_at < self._sync_interval:
+                return
+
+            generation = product_cache.get_generation()
+            rebuild = (
+                self._filter is None
+                or generation != self._generation
+                or now - self._built_at >= self._rebuild_interval
+                or self._filter.count > self._filter.capacity
+            )
+            if rebuild:
+                self.rebuild(generation)
+            else:
+                self._sync()
+            self._synced_at = time.monotonic()
+
+            if rebuild or self._synced_at - self._stats_logged_at >= self._stats_log_interval:
+                self.log_stats()
+        finally:
+            self._lock.release()
+
+    def rebuild(self, generation=None):
+        capacity = max(self._min_capacity, 2 * (Product.objects.count() + ProductAlias.objects.count()))
+        bloom_filter = BloomFilter(capacity, self._error_rate)
+
+        max_product_id = self._add_names(bloom_filter, Product.objects.all(), 'normalized_name')
+        max_alias_id = self._add_names(bloom_filter, ProductAlias.objects.all(), 'alias')
+
+        self._filter = bloom_filter
+        self._max_product_id, self._max_alias_id = max_product_id, max_alias_id
+        self._built_at = self._synced_at = time.monotonic()
+        self._generation = generation
+
+    def log_stats(self):
+        self._stats_logged_at = time.monotonic()
+        stats = self.stats()
+        logger.info(
+            "Product name filter: %s names, capacity %s, %s hashes, %s bytes, "
+            "false-positive rate %.4f expected, %.4f observed over %s checks (%s absent)",
+            stats["items"],
+            stats["capacity"],
+            stats["hash_count"],
+            stats["memory_bytes"],
+            stats["expected_false_positive_rate"],
+            stats["observed_false_positive_rate"],
+            stats["checks"],
+            stats["absent"],
+        )
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+            self._max_product_id = self._max_alias_id = 0
+            self._generation = None
+
+    def stats(self) -> Dict[str, float]:
+        bloom_filter = self._filter
+        # Each absent answer is a true negative, as the filter has no false negatives.
+        negatives = self._counters["false_positives"] + self._counters["absent"]
+
+        return dict(
+            self._counters,
+            items=bloom_filter.count if bloom_filter is not None else 0,
+            capacity=bloom_filter.capacity if bloom_filter is not None else 0,
+            hash_count=bloom_filter.hash_count if bloom_filter is not None else 0,
+            memory_bytes=bloom_filter.memory if bloom_filter is not None else 0,
+            expected_false_positive_rate=(
+                round(bloom_filter.get_false_positive_rate(), 6) if bloom_filter is not None else 0.0
+            ),
+            observed_false_positive_rate=(
+                round(self._counters["false_positives"] / negatives, 6) if negatives else 0.0
+            ),
+        )
+
+    def _sync(self):
+        self._max_product_id = self._add_names(
+            self._filter, Product.objects.filter(id__gt=self._max_product_id), 'normalized_name',
+        ) or self._max_product_id
+        self._max_alias_id = self._add_names(
+            self._filter, ProductAlias.objects.filter(id__gt=self._max_alias_id), 'alias',
+        ) or self._max_alias_id
+
+    @staticmethod
+    def _add_names(bloom_filter: BloomFilter, queryset, name_field: str) -> int:
+        max_id = 0
+        for id, name in queryset.order_by('id').values_list('id', name_field).iterator(chunk_size=5000):
+            bloom_filter.add(name)
+            max_id = id
+        return max_id
+
+
+product_name_filter = ProductNameFilter(
+    error_rate=PRODUCT_NAME_FILTER["ERROR_RATE"],
+    min_capacity=PRODUCT_NAME_FILTER["MIN_CAPACITY"],
+    sync_interval=PRODUCT_INDEX["SYNC_INTERVAL"],
+    rebuild_interval=PRODUCT_INDEX["REBUILD_INTERVAL"],
+)
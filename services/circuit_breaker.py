@@ -0,0 +1,116 @@
+import logging
+
+import redis
+from Calorie_counter.settings import NUTRITION_API_CIRCUIT_BREAKER
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenException(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker whose state lives in Redis, so all workers share it.
+
+    FAILURE_THRESHOLD failures within FAILURE_WINDOW seconds open the circuit for RESET_TIMEOUT
+    seconds. After that a single caller is let through as a probe: its success closes the
+    circuit, its failure opens it again. Everybody else fails fast in the meantime. A probe
+    that ends without reaching the API releases its slot for the next caller.
+    """
+
+    def __init__(self, name, failure_threshold, failure_window, reset_timeout, probe_timeout):
+        self._failure_threshold = failure_threshold
+        self._failure_window = failure_window
+        self._reset_timeout = reset_timeout
+        self._probe_timeout = probe_timeout
+        self._failures_key = f"circuit:{name}:failures"
+        self._open_key = f"circuit:{name}:open"
+        self._half_open_key = f"circuit:{name}:half_open"
+        self._probe_key = f"circuit:{name}:probe"
+
+    def before_call(self) -> bool:
+        """
+        Raises CircuitOpenException if the call must not be made. Returns True when the
+        caller is the half-open probe.
+        """
+        try:
+            client = get_redis()
+            is_open, is_half_open = client.mget(self._open_key, self._half_open_key)
+            if is_open is not None:
+                raise CircuitOpenException("Circuit is open.")
+            if is_half_open is None:
+                return False
+            if not client.set(self._probe_key, 1, nx=True, ex=self._probe_timeout):
+                raise CircuitOpenException("Circuit is half-open, waiting for the probe.")
+            return True
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker state unavailable: %s", e)
+            return False
+
+    def release_probe(self):
+        try:
+            get_redis().delete(self._probe_key)
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker state unavailable: %s", e)
+
+    def record_success(self):
+        try:
+            get_redis().delete(self._failures_key, self._half_open_key, self._probe_key)
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker state unavailable: %s", e)
+
+    def record_failure(self):
+        try:
+            client = get_redis()
+            pipe = client.pipeline(transaction=True)
+            pipe.incr(self._failures_key)
+            pipe.expire(self._failures_key, self._failure_window, nx=True)
+            pipe.exists(self._half_open_key)
+            failures, _, is_half_open = pipe.execute()
+
+            if is_half_open or failures >= self._failure_threshold:
+                self._open(client)
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker state unavailable: %s", e)
+
+    def get_state(self) -> str:
+        try:
+            is_open, is_half_open = get_redis().mget(self._open_key, self._half_open_key)
+        except redis.RedisError as e:
+            logger.warning("Circuit breaker state unavailable: %s", e)
+            return CLOSED
+
+        if is_open is not None:
+            return OPEN
+        if is_half_open is not None:
+            return HALF_OPEN
+        return CLOSED
+
+    def is_open(self) -> bool:
+        return self.get_state() == OPEN
+
+    def _open(self, client):
+        logger.warning("Opening circuit %s for %s seconds", self._open_key, self._reset_timeout)
+
+        pipe = client.pipeline(transaction=True)
+        pipe.set(self._open_key, 1, ex=self._reset_timeout)
+        pipe.set(self._half_open_key, 1)
+        pipe.delete(self._failures_key, self._probe_key)
+        pipe.execute()
+
+
+nutrition_circuit_breaker = CircuitBreaker(
+    "nutrition_api",
+    failure_threshold=NUTRITION_API_CIRCUIT_BREAKER["FAILURE_THRESHOLD"],
+    failure_window=NUTRITION_API_CIRCUIT_BREAKER["FAILURE_WINDOW"],
+    reset_timeout=NUTRITION_API_CIRCUIT_BREAKER["RESET_TIMEOUT"],
+    probe_timeout=NUTRITION_API_CIRCUIT_BREAKER["PROBE_TIMEOUT"],
+)
@@ -0,0 +1,163 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from activity.models import CustomerActivity
+from customer_profile.models import DailySummary
+from meal.models import Meal
+
+from .dates import get_day_range
+
+MEAL_CALORIES_FIELDS = {
+    Meal.BREAKFAST: 'breakfast_calories',
+    Meal.LUNCH: 'lunch_calories',
+    Meal.DINNER: 'dinner_calories',
+}
+
+# (customer id, local date) -> increments of DailySummary fields
+SummaryChanges = Dict[Tuple[int, date], Counter]
+
+
+def get_local_date(value) -> date:
+    # Meals created from strings keep them until reloaded.
+    value = Meal._meta.get_field('date_add').to_python(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return timezone.localdate(value)
+
+
+def get_meal_changes(customer_id, date_add, meal_type, portion_calories, sign=1) -> SummaryChanges:
+    changes = Counter(meal_count=sign)
+    if meal_type in MEAL_CALORIES_FIELDS and portion_calories is not None:
+        changes[MEAL_CALORIES_FIELDS[meal_type]] = sign * portion_calories
+    return {(customer_id, get_local_date(date_add)): changes}
+
+
+def get_activity_changes(customer_id, date_add, spent_calories, sign=1) -> SummaryChanges:
+    changes = Counter(activity_count=sign, activity_calories=sign * spent_calories)
+    return {(customer_id, get_local_date(date_add)): changes}
+
+
+def merge_changes(*changes: SummaryChanges) -> SummaryChanges:
+    merged = defaultdict(Counter)
+    for summary_changes in changes:
+        for key, increments in summary_changes.items():
+            merged[key].update(increments)
+    return merged
+
+
+def apply_changes(changes: SummaryChanges, create_missing: bool = True):
+    """
+    Increments the summaries in place, so concurrent writers never lose each other's changes.
+    A missing summary is computed from the day's rows, which already include the change;
+    deletions never create one, since the customer may be being deleted too.
+    """
+    for (customer_id, day), increments in changes.items():
+        increments = {field: value for field, value in increments.items() if value}
+        if not increments:
+            continue
+
+        updated = DailySummary.objects.filter(customer_id=customer_id, date=day).update(
+            **{field: F(field) + value for field, value in increments.items()}
+        )
+        if not updated and create_missing:
+            rebuild_daily_summary(customer_id, day)
+
+
+def add_meals(meals: Iterable[Meal]):
+    """
+    Counts meals saved without signals, e.g. by bulk_create().
+    """
+    apply_changes(merge_changes(*(
+        get_meal_changes(meal.user_id, meal.date_add, meal.meal_type, meal.portion_calories)
+        for meal in meals
+    )))
+
+
+def get_daily_summary(customer_id, day: date) -> DailySummary:
+    """
+    Reads the day's summary, computing it if it wasn't stored yet. Days without meals and
+    activities get an unsaved empty summary.
+    """
+    if isinstance(day, datetime):
+        day = day.date()
+
+    summary = DailySummary.objects.filter(customer_id=customer_id, date=day).first()
+    if summary is not None:
+        return summary
+    return rebuild_daily_summary(customer_id, day)
+
+
+def rebuild_daily_summary(customer_id, day: date) -> DailySummary:
+    day_start, day_end = get_day_range(day)
+
+    totals = Meal.objects.filter(
+        user_id=customer_id,
+        date_add__gte=day_start,
+        date_add__lt=day_end,
+    ).aggregate(**get_meal_aggregates())
+    totals.update(CustomerActivity.objects.filter(
+        customer_id=customer_id,
+        date_add__gte=day_start,
+        date_add__lt=day_end,
+    ).aggregate(**get_activity_aggregates()))
+
+    if not totals['meal_count'] and not totals['activity_count']:
+        DailySummary.objects.filter(customer_id=customer_id, date=day).delete()
+        return DailySummary(customer_id=customer_id, date=day)
+
+    summary, _ = DailySummary.objects.update_or_create(customer_id=customer_id, date=day, defaults=totals)
+    return summary
+
+
+def rebuild_daily_summaries(customer_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recomputes the summaries of the given customers, or of everyone, from their meals and
+    activities, with one grouped query per table. Returns the number of summaries written.
+    """
+    meals = Meal.objects.all()
+    activities = CustomerActivity.objects.all()
+    summaries = DailySummary.objects.all()
+    if customer_ids is not None:
+        customer_ids = list(customer_ids)
+        meals = meals.filter(user_id__in=customer_ids)
+        activities = activities.filter(customer_id__in=customer_ids)
+        summaries = summaries.filter(customer_id__in=customer_ids)
+
+    totals = defaultdict(dict)
+    for row in meals.values(customer=F('user_id'), day=TruncDate('date_add')).annotate(**get_meal_aggregates()):
+        totals[row.pop('customer'), row.pop('day')].update(row)
+    for row in activities.values('customer_id', day=TruncDate('date_add')).annotate(**get_activity_aggregates()):
+        totals[row.pop('customer_id'), row.pop('day')].update(row)
+
+    with transaction.atomic():
+        summaries.delete()
+        DailySummary.objects.bulk_create(
+            [
+                DailySummary(customer_id=customer_id, date=day, **day_totals)
+                for (customer_id, day), day_totals in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def get_meal_aggregates():
+    aggregates = {
+        field: Sum('portion_calories', filter=Q(meal_type=meal_type), default=0)
+        for meal_type, field in MEAL_CALORIES_FIELDS.items()
+    }
+    aggregates['meal_count'] = Count('id')
+    return aggregates
+
+
+def get_activity_aggregates():
+    return dict(
+        activity_calories=Sum('spent_calories', default=0),
+        activity_count=Count('id'),
+    )
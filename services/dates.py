@@ -0,0 +1,18 @@
+from datetime import date, datetime, time, timedelta
+from typing import Tuple
+
+from django.utils import timezone
+
+
+def get_day_range(day: date) -> Tuple[datetime, datetime]:
+    """
+    Returns the [start, end) datetimes of the day in the current time zone. Filtering by
+    date_add__gte=start, date_add__lt=end selects the same rows as date_add__date=day, but
+    compares the bare column, so the database can use an index on it.
+    """
+    if isinstance(day, datetime):
+        day = day.date()
+
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from typing import Dict, List
+
+from Calorie_counter.settings import PRODUCT_LOOKUP_BATCHING
+
+from .product_names import normalize_product_name
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25)
+
+
+class _PendingLookup:
+
+    def __init__(self, product_name):
+        self.product_name = product_name
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.needs_single_lookup = False
+
+
+class ProductLookupBatcher:
+    """
+    Merges distinct product lookups that arrive within a short window into one
+    multi-product API query. The first caller of a window flushes it, every caller
+    waits for its own result. Names the multi-product response can't be matched
+    to are looked up one by one by their callers.
+
+    Batch sizes and window waits are logged, and the counters reset, at most every
+    PRODUCT_LOOKUP_BATCH_STATS_LOG_INTERVAL seconds.
+    """
+
+    def __init__(self, window: float, max_batch_size: int, stats_log_interval: float = None):
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._stats_log_interval = (
+            PRODUCT_LOOKUP_BATCHING["STATS_LOG_INTERVAL"] if stats_log_interval is None else stats_log_interval
+        )
+        self._stats_logged_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingLookup] = {}
+        self._batch_full = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def lookup(self, product_name: str, client) -> float:
+        if self._window <= 0:
+            return client.get_single_product_calories(product_name)
+
+        key = normalize_product_name(product_name)
+        with self._lock:
+            is_flusher = not self._pending
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingLookup(product_name)
+            if len(self._pending) >= self._max_batch_size:
+                self._batch_full.set()
+
+        if is_flusher:
+            self._batch_full.wait(self._window)
+            self._flush(client)
+
+        pending.done.wait()
+
+        if pending.needs_single_lookup:
+            with self._stats_lock:
+                self._stats["single_lookup_fallbacks"] += 1
+            return client.get_single_product_calories(product_name)
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = self._copy_stats()
+        return self._summarize(stats)
+
+    def _copy_stats(self) -> Dict[str, float]:
+        stats = dict(self._stats)
+        stats["batch_size_histogram"] = dict(self._stats["batch_size_histogram"])
+        return stats
+
+    @staticmethod
+    def _summarize(stats: Dict[str, float]) -> Dict[str, float]:
+        stats["mean_batch_size"] = round(stats["lookups"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["mean_window_wait_ms"] = (
+            round(stats["window_wait_total"] * 1000 / stats["lookups"], 3) if stats["lookups"] else 0.0
+        )
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_stats()
+
+    def _flush(self, client):
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending = {}
+            self._batch_full.clear()
+
+        self._record_batch(batch)
+
+        try:
+            if len(batch) == 1:
+                batch[0].result = client.get_single_product_calories(batch[0].product_name)
+            else:
+                self._resolve_batch(batch, client)
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    @staticmethod
+    def _resolve_batch(batch: List[_PendingLookup], client):
+        products_calories = client.get_multiple_products_calories(
+            [pending.product_name for pending in batch]
+        )
+        products_calories = {
+            normalize_product_name(product_name): calories
+            for product_name, calories in products_calories.items()
+        }
+
+        for pending in batch:
+            key = normalize_product_name(pending.product_name)
+            if key in products_calories:
+                pending.result = products_calories[key]
+            else:
+                pending.needs_single_lookup = True
+
+    def _record_batch(self, batch: List[_PendingLookup]):
+        flushed_at = time.monotonic()
+        bucket = next((size for size in reversed(BATCH_SIZE_BUCKETS) if len(batch) >= size), 1)
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["lookups"] += len(batch)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+            self._stats["batch_size_histogram"][bucket] += 1
+            self._stats["window_wait_total"] += sum(flushed_at - pending.enqueued_at for pending in batch)
+
+            logged_stats = None
+            if flushed_at - self._stats_logged_at >= self._stats_log_interval:
+                logged_stats = self._summarize(self._copy_stats())
+                self._reset_stats()
+                self._stats_logged_at = flushed_at
+
+        logger.debug(
+            "Flushing %d product lookups, window wait %.1f ms",
+            len(batch),
+            (flushed_at - batch[0].enqueued_at) * 1000,
+        )
+        if logged_stats is not None:
+            logger.info(
+                "Product lookup batching: %s lookups in %s batches, mean batch size %.2f, max %s, "
+                "mean window wait %.3f ms, %s single lookup fallbacks, batch sizes %s",
+                logged_stats["lookups"],
+                logged_stats["batches"],
+                logged_stats["mean_batch_size"],
+                logged_stats["max_batch_size"],
+                logged_stats["mean_window_wait_ms"],
+                logged_stats["single_lookup_fallbacks"],
+                logged_stats["batch_size_histogram"],
+            )
+
+    def _reset_stats(self):
+        self._stats = dict(
+            batches=0,
+            lookups=0,
+            max_batch_size=0,
+            single_lookup_fallbacks=0,
+            window_wait_total=0.0,
+            batch_size_histogram={size: 0 for size in BATCH_SIZE_BUCKETS},
+        )
+
+
+product_lookup_batcher = ProductLookupBatcher(
+    window=PRODUCT_LOOKUP_BATCHING["WINDOW"],
+    max_batch_size=PRODUCT_LOOKUP_BATCHING["MAX_BATCH_SIZE"],
+)
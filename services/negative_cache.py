@@ -0,0 +1,80 @@
+import logging
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import redis
+from Calorie_counter.settings import NEGATIVE_PRODUCT_CACHE
+
+from .product_names import normalize_product_name
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeProductCache:
+    """
+    Shared memory of product names the nutrition API reported as unknown.
+
+    Entries live in one Redis sorted set scored by their expiry time, which keeps expiry,
+    the size cap (soonest-expiring entries are evicted first) and purging to single commands.
+    """
+
+    KEY = "product:negative"
+
+    def __init__(self, ttl: int, max_size: int):
+        self._ttl = ttl
+        self._max_size = max_size
+
+    def contains(self, product_name: str) -> bool:
+        try:
+            expires_at = get_redis().zscore(self.KEY, normalize_product_name(product_name))
+        except redis.RedisError as e:
+            logger.warning("Negative product cache unavailable: %s", e)
+            return False
+
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, product_name: str):
+        now = time.time()
+
+        try:
+            pipe = get_redis().pipeline(transaction=True)
+            pipe.zadd(self.KEY, {normalize_product_name(product_name): now + self._ttl})
+            pipe.zremrangebyscore(self.KEY, "-inf", now)
+            pipe.zremrangebyrank(self.KEY, 0, -(self._max_size + 1))
+            pipe.expire(self.KEY, self._ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Negative product cache unavailable: %s", e)
+
+    def purge(self, product_names: Optional[Iterable[str]] = None) -> int:
+        """
+        Removes the given names, or every entry when no names are passed.
+        Returns the number of removed entries.
+        """
+        client = get_redis()
+
+        if product_names is None:
+            removed = client.zcard(self.KEY)
+            client.delete(self.KEY)
+            return removed
+
+        product_names = {normalize_product_name(product_name) for product_name in product_names}
+        if not product_names:
+            return 0
+        return client.zrem(self.KEY, *product_names)
+
+    def entries(self) -> List[Tuple[str, float]]:
+        client = get_redis()
+        client.zremrangebyscore(self.KEY, "-inf", time.time())
+
+        return [
+            (product_name.decode(), expires_at)
+            for product_name, expires_at in client.zrange(self.KEY, 0, -1, withscores=True)
+        ]
+
+
+negative_product_cache = NegativeProductCache(
+    ttl=NEGATIVE_PRODUCT_CACHE["TTL"],
+    max_size=NEGATIVE_PRODUCT_CACHE["MAX_SIZE"],
+)
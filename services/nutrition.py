@@ -1,7 +1,14 @@
-from typing import List, Dict, Any
+import os
+import random
+import time
+from typing import List, Dict, Any, Optional
 
 import requests
-from Calorie_counter.settings import NUTRITION_API_KEY
+from requests.adapters import HTTPAdapter
+from Calorie_counter.settings import NUTRITION_API_KEY, NUTRITION_API
+
+from .circuit_breaker import nutrition_circuit_breaker, CircuitOpenException
+from .rate_limiter import nutrition_rate_limiter, RateLimitExceeded, INTERACTIVE
 
 
 class NutritionAPIException(Exception):
@@ -12,9 +19,61 @@ class ProductNotFoundException(Exception):
     pass
 
 
+class NutritionAPIRateLimitException(NutritionAPIException):
+    pass
+
+
+class NutritionAPIUnavailableException(NutritionAPIException):
+    pass
+
+
+PRODUCT_NOT_FOUND_MESSAGE = "No such product in the database or invalid product's name."
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the per-process keep-alive session used for all nutrition API calls.
+    The session is recreated after a fork, so pre-forked workers never share sockets.
+    """
+    global _session, _session_pid
+
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=NUTRITION_API["POOL_MAXSIZE"],
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        _session = session
+        _session_pid = os.getpid()
+
+    return _session
+
+
 class NutritionAPIClient:
 
-    API_URL = "https://api.api-ninjas.com/v1/nutrition"
+    API_URL = f"{NUTRITION_API['BASE_URL']}/v1/nutrition"
+
+    def __init__(
+            self,
+            session: Optional[requests.Session] = None,
+            priority: str = INTERACTIVE,
+            api_url: Optional[str] = None,
+            api_key: Optional[str] = None,
+    ):
+        self._session = session or get_session()
+        self._priority = priority
+        self._api_url = api_url or self.API_URL
+        self._api_key = api_key or NUTRITION_API_KEY
+        self._timeout = (NUTRITION_API["CONNECT_TIMEOUT"], NUTRITION_API["READ_TIMEOUT"])
+        self._max_retries = NUTRITION_API["MAX_RETRIES"]
 
     def get_single_product_calories(self, product_name: str) -> float:
         data = self._get_calories(product_name)
@@ -32,14 +91,90 @@ class NutritionAPIClient:
         return products_calories
 
     def _get_calories(self, query: str) -> List[Dict[str, Any]]:
-        response = requests.get(
-            f"{self.API_URL}?query={query}",
-            headers={'X-Api-Key': NUTRITION_API_KEY},
-        )
+        circuit_breaker = self._get_circuit_breaker()
+
+        try:
+            is_probe = circuit_breaker.before_call()
+        except CircuitOpenException:
+            raise NutritionAPIUnavailableException("Nutrition API is temporarily unavailable.")
+
+        try:
+            response = self._request(query)
+        except NutritionAPIRateLimitException:
+            # Running out of rate limit tokens says nothing about the API's health.
+            if is_probe:
+                circuit_breaker.release_probe()
+            raise
+        except NutritionAPIException:
+            circuit_breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+
         if response.status_code == requests.codes.ok:
             data = response.json()
             if not data:
-                raise ProductNotFoundException("No such product in the database or invalid product's name.")
+                raise ProductNotFoundException(PRODUCT_NOT_FOUND_MESSAGE)
             return data
         else:
             raise NutritionAPIException("There's a problem with connection to API.")
+
+    def _request(self, query: str) -> requests.Response:
+        attempt = 0
+        while True:
+            try:
+                self._acquire_rate_limit()
+            except RateLimitExceeded as e:
+                raise NutritionAPIRateLimitException(str(e))
+
+            try:
+                response = self._session.get(
+                    self._api_url,
+                    params={"query": query},
+                    headers={'X-Api-Key': self._api_key},
+                    timeout=self._timeout,
+                )
+            except requests.RequestException:
+                if attempt >= self._max_retries:
+                    raise NutritionAPIException("There's a problem with connection to API.")
+                retry_after = None
+            else:
+                self._observe_response(response)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self._max_retries:
+                    return response
+                retry_after = self._get_retry_after(response)
+
+            time.sleep(self._get_backoff(attempt, retry_after))
+            attempt += 1
+
+    def _get_circuit_breaker(self):
+        return nutrition_circuit_breaker
+
+    def _acquire_rate_limit(self):
+        nutrition_rate_limiter.acquire(self._priority)
+
+    def _observe_response(self, response: requests.Response):
+        nutrition_rate_limiter.observe_response(response)
+
+    @staticmethod
+    def _get_backoff(attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Full-jitter exponential backoff, capped at BACKOFF_MAX.
+        A Retry-After sent by the API is honored as the lower bound.
+        """
+        ceiling = min(NUTRITION_API["BACKOFF_MAX"], NUTRITION_API["BACKOFF_FACTOR"] * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, NUTRITION_API["BACKOFF_MAX"]))
+        return delay
+
+    @staticmethod
+    def _get_retry_after(response: requests.Response) -> Optional[float]:
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
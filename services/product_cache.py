@@ -0,0 +1,291 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+import redis
+from Calorie_counter.settings import PRODUCT_CACHE
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_UNKNOWN = object()
+
+# Logs changed names under one new change sequence number and forgets those logged
+# MAX_CHANGE_SEQUENCES numbers ago. Returns the new number.
+RECORD_CHANGES_SCRIPT = """
+local sequence = redis.call("INCR", KEYS[1])
+for i = 2, #ARGV do
+    redis.call("ZADD", KEYS[2], sequence, ARGV[i])
+end
+redis.call("ZREMRANGEBYSCORE", KEYS[2], "-inf", sequence - tonumber(ARGV[1]))
+return sequence
+"""
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe in-process LRU with a per-entry TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self._ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ProductCache:
+    """
+    Read-through calorie cache for products: a per-process LRU in front of a shared Redis tier.
+
+    Writers keep both tiers current. Whenever cached values are removed the Redis generation
+    counter is bumped, and every process drops its local tier once it notices (at most
+    GENERATION_CHECK_INTERVAL seconds later). Changed values are logged by name in Redis
+    instead, under an increasing change sequence number, and every process drops just those
+    names from its local tier. Readers of older copies, such as the snapshot, ask
+    is_changed_since() whether a name changed after their copy was made.
+    """
+
+    KEY_PREFIX = "product:calories:"
+    GENERATION_KEY = "product:calories:generation"
+    CHANGES_KEY = "product:calories:changes"
+    CHANGE_SEQUENCE_KEY = "product:calories:change_sequence"
+    # Change sequence numbers the log covers; copies older than that count as changed throughout.
+    MAX_CHANGE_SEQUENCES = 10000
+
+    def __init__(self, local_maxsize, local_ttl, redis_ttl, generation_check_interval):
+        self._local = LRUCache(local_maxsize, local_ttl)
+        self._redis_ttl = redis_ttl
+        self._generation_check_interval = generation_check_interval
+        self._generation = _UNKNOWN
+        self._generation_checked_at = 0.0
+        # Change sequence number of every name changed after self._changes_known_after.
+        self._changes = {}
+        self._change_sequence = None
+        self._changes_known_after = None
+        self._record_changes_script = None
+        self._counters = dict(local_hits=0, redis_hits=0, misses=0, errors=0)
+
+    def get(self, product_name: str) -> Optional[float]:
+        self._sync_generation()
+
+        calories = self._local.get(product_name)
+        if calories is not None:
+            self._counters["local_hits"] += 1
+            return calories
+
+        try:
+            cached = get_redis().get(self._get_key(product_name))
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            cached = None
+
+        if cached is None:
+            self._counters["misses"] += 1
+            return None
+
+        calories = float(cached)
+        self._counters["redis_hits"] += 1
+        self._local.set(product_name, calories)
+        return calories
+
+    def set(self, product_name: str, calories: float):
+        self.set_many({product_name: calories})
+
+    def set_many(self, products_calories: Dict[str, float], changed: bool = False):
+        """
+        Writes through both tiers. Pass changed=True when existing values were modified,
+        so the other processes drop their (now stale) local copies of these names.
+        """
+        if not products_calories:
+            return
+
+        try:
+            client = get_redis()
+            pipe = client.pipeline(transaction=False)
+            for product_name, calories in products_calories.items():
+                pipe.set(self._get_key(product_name), calories, ex=self._redis_ttl)
+            pipe.execute()
+
+            if changed:
+                self._record_changes(client, products_calories)
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+
+        for product_name, calories in products_calories.items():
+            self._local.set(product_name, calories)
+
+    def invalidate(self, product_names: Iterable[str]):
+        product_names = list(product_names)
+
+        for product_name in product_names:
+            self._local.delete(product_name)
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            if product_names:
+                pipe.delete(*[self._get_key(product_name) for product_name in product_names])
+            pipe.incr(self.GENERATION_KEY)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+
+    def get_generation(self):
+        """
+        Changes whenever cached product values were changed or removed anywhere.
+        """
+        try:
+            return get_redis().get(self.GENERATION_KEY)
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            return None
+
+    def get_change_sequence(self) -> int:
+        """
+        Number of the latest logged change, to tell later changes with is_changed_since().
+        """
+        try:
+            return int(get_redis().get(self.CHANGE_SEQUENCE_KEY) or 0)
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            return 0
+
+    def is_changed_since(self, product_name: str, change_sequence: int) -> bool:
+        """
+        Whether the name's value may have changed after the given change sequence number, as
+        far as this process knows; True when the change log can't tell.
+        """
+        self._sync_generation()
+
+        if self._changes_known_after is None or change_sequence < self._changes_known_after:
+            return True
+        return self._changes.get(product_name, 0) > change_sequence
+
+    def get_known_generation(self):
+        """
+        The generation as last seen by this process, re-read at most every
+        GENERATION_CHECK_INTERVAL seconds. None until it could be read.
+        """
+        self._sync_generation()
+        return None if self._generation is _UNKNOWN else self._generation
+
+    def clear_local(self):
+        self._local.clear()
+        self._generation = _UNKNOWN
+        self._generation_checked_at = 0.0
+        self._changes = {}
+        self._change_sequence = None
+        self._changes_known_after = None
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self._counters["local_hits"] + self._counters["redis_hits"] + self._counters["misses"]
+        hits = self._counters["local_hits"] + self._counters["redis_hits"]
+
+        return dict(
+            self._counters,
+            local_size=len(self._local),
+            hit_rate=round(hits / lookups, 4) if lookups else 0.0,
+        )
+
+    def _sync_generation(self):
+        now = time.monotonic()
+        if now - self._generation_checked_at < self._generation_check_interval:
+            return
+        self._generation_checked_at = now
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.get(self.GENERATION_KEY)
+            pipe.get(self.CHANGE_SEQUENCE_KEY)
+            pipe.zrangebyscore(
+                self.CHANGES_KEY,
+                "-inf" if self._change_sequence is None else f"({self._change_sequence}",
+                "+inf",
+                withscores=True,
+            )
+            generation, change_sequence, changes = pipe.execute()
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            return
+
+        if generation != self._generation:
+            if self._generation is not _UNKNOWN:
+                self._local.clear()
+            self._generation = generation
+
+        self._apply_changes(int(change_sequence or 0), changes)
+
+    def _apply_changes(self, change_sequence, changes):
+        known_after = max(0, change_sequence - self.MAX_CHANGE_SEQUENCES)
+        if self._change_sequence is not None and self._change_sequence < known_after:
+            # Missed changes were already dropped from the log.
+            self._local.clear()
+
+        for product_name, sequence in changes:
+            product_name = product_name.decode()
+            self._changes[product_name] = int(sequence)
+            self._local.delete(product_name)
+
+        if known_after != self._changes_known_after:
+            self._changes = {name: sequence for name, sequence in self._changes.items() if sequence > known_after}
+            self._changes_known_after = known_after
+        self._change_sequence = change_sequence
+
+    def _record_changes(self, client, products_calories):
+        if self._record_changes_script is None or self._record_changes_script.registered_client is not client:
+            self._record_changes_script = client.register_script(RECORD_CHANGES_SCRIPT)
+
+        self._record_changes_script(
+            keys=[self.CHANGE_SEQUENCE_KEY, self.CHANGES_KEY],
+            args=[self.MAX_CHANGE_SEQUENCES, *products_calories],
+        )
+
+    def _on_redis_error(self, error):
+        self._counters["errors"] += 1
+        logger.warning("Product cache Redis tier unavailable: %s", error)
+
+    def _get_key(self, product_name: str) -> str:
+        return f"{self.KEY_PREFIX}{product_name}"
+
+
+product_cache = ProductCache(
+    local_maxsize=PRODUCT_CACHE["LOCAL_MAXSIZE"],
+    local_ttl=PRODUCT_CACHE["LOCAL_TTL"],
+    redis_ttl=PRODUCT_CACHE["REDIS_TTL"],
+    generation_check_interval=PRODUCT_CACHE["GENERATION_CHECK_INTERVAL"],
+)
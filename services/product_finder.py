@@ -1,8 +1,24 @@
+from Calorie_counter.settings import NUTRITION_API_HEDGING, PRODUCT_FUZZY_MATCH, PRODUCT_NAME_FILTER
 from product.models import Product
-from product.serializers import ProductSerializer
 
-from .nutrition import NutritionAPIClient
-from django.core.exceptions import ObjectDoesNotExist
+from .bloom_filter import product_name_filter
+from .lookup_batcher import product_lookup_batcher
+from .negative_cache import negative_product_cache
+from .nutrition import (
+    NutritionAPIClient,
+    NutritionAPIException,
+    NutritionAPIUnavailableException,
+    ProductNotFoundException,
+    PRODUCT_NOT_FOUND_MESSAGE,
+)
+from .product_cache import product_cache
+from .product_names import normalize_product_name
+from .product_search import fuzzy_product_index
+from .product_snapshot import product_snapshot
+from .product_suggest import product_suggest_index
+from .providers import NutritionProviderChain, get_secondary_providers
+from .single_flight import product_lookup_single_flight
+from django.core.exceptions import ValidationError
 
 
 class InvalidProductException(Exception):
@@ -11,41 +27,267 @@ class InvalidProductException(Exception):
 
 class ProductFinder:
 
+    def __init__(self, providers=None):
+        if providers is None:
+            providers = [NutritionAPIClient()] + get_secondary_providers()
+
+        if len(providers) == 1:
+            self._nutrition_api_client = providers[0]
+        else:
+            self._nutrition_api_client = NutritionProviderChain(providers, hedging=NUTRITION_API_HEDGING)
+
     def find(self, given_product):
 
         database_result = self.search_in_database(given_product)
 
-        if database_result:
+        if database_result is not None:
             return database_result
 
         else:
+            fuzzy_result = self.search_similar_in_database(given_product)
+            if fuzzy_result is not None:
+                return fuzzy_result
+
+            if negative_product_cache.contains(given_product):
+                raise ProductNotFoundException(PRODUCT_NOT_FOUND_MESSAGE)
+
+            return self.resolve_once_in_nutrition_api(given_product)
+
+    def find_many(self, given_products):
+        """
+        Finds several products at once: one database query for the names the caches don't hold
+        and one nutrition API call for the names the database doesn't know.
+        Returns two dicts by given name, calories and the exceptions of the products not found.
+        """
+        names = {}
+        for given_product in given_products:
+            names.setdefault(normalize_product_name(given_product), []).append(given_product)
+
+        found = {}
+        errors = {}
+
+        missing = []
+        for normalized_name in names:
+            calories = product_snapshot.get(normalized_name)
+            if calories is None:
+                calories = product_cache.get(normalized_name)
+            if calories is not None:
+                found[normalized_name] = calories
+            else:
+                missing.append(normalized_name)
+
+        candidates = missing
+        if PRODUCT_NAME_FILTER["ENABLED"]:
+            candidates = [name for name in missing if product_name_filter.might_contain(name)]
+        if candidates:
+            database_result = Product.objects.get_calories_by_names(candidates)
+            if PRODUCT_NAME_FILTER["ENABLED"]:
+                for _ in range(len(candidates) - len(database_result)):
+                    product_name_filter.record_false_positive()
+            product_cache.set_many(database_result)
+            found.update(database_result)
+
+        unknown = []
+        for normalized_name in missing:
+            if normalized_name in found:
+                continue
+            calories = self.search_similar_in_database(names[normalized_name][0])
+            if calories is not None:
+                found[normalized_name] = calories
+            elif negative_product_cache.contains(normalized_name):
+                errors[normalized_name] = ProductNotFoundException(PRODUCT_NOT_FOUND_MESSAGE)
+            else:
+                unknown.append(names[normalized_name][0])
+
+        if len(unknown) == 1:
+            self._resolve_many_one_by_one(unknown, found, errors)
+        elif unknown:
+            self._resolve_many_in_nutrition_api(unknown, found, errors)
+
+        calories = {}
+        exceptions = {}
+        for normalized_name, given_names in names.items():
+            for given_product in given_names:
+                if normalized_name in found:
+                    calories[given_product] = found[normalized_name]
+                else:
+                    exceptions[given_product] = errors[normalized_name]
+        return calories, exceptions
+
+    def resolve_once_in_nutrition_api(self, given_product):
+        """
+        Resolves the product in the nutrition API, sharing the call with concurrent lookups of it.
+        """
+        return product_lookup_single_flight.do(
+            normalize_product_name(given_product),
+            lambda: self.resolve_in_nutrition_api(given_product),
+            shared_exceptions=(ProductNotFoundException, NutritionAPIUnavailableException),
+        )
+
+    def resolve_in_nutrition_api(self, given_product):
+        try:
             nutrition_api_result = self.search_in_nutrition_api(given_product)
-            self.write_to_product_database(given_product, nutrition_api_result)
-            return nutrition_api_result
+        except ProductNotFoundException:
+            # The name filter may not know a product another process has just stored.
+            existing_product = Product.objects.get_by_name(given_product)
+            if existing_product is not None:
+                product_cache.set(existing_product.normalized_name, existing_product.calories)
+                return existing_product.calories
 
-    def search_in_database(self, given_product):
+            negative_product_cache.add(given_product)
+            raise
+
+        return self.write_to_product_database(given_product, nutrition_api_result)
+
+    def _resolve_many_in_nutrition_api(self, given_products, found, errors):
+        try:
+            products_calories = self._nutrition_api_client.get_multiple_products_calories(given_products)
+        except ProductNotFoundException as e:
+            # The name filter may not know products another process has just stored.
+            normalized_names = [normalize_product_name(given_product) for given_product in given_products]
+            existing = Product.objects.get_calories_by_names(normalized_names)
+            product_cache.set_many(existing)
+            found.update(existing)
+            for normalized_name in normalized_names:
+                if normalized_name not in existing:
+                    negative_product_cache.add(normalized_name)
+                    errors[normalized_name] = e
+            return
+        except NutritionAPIException as e:
+            for given_product in given_products:
+                errors[normalize_product_name(given_product)] = e
+            return
 
+        products_calories = {
+            normalize_product_name(product_name): calories
+            for product_name, calories in products_calories.items()
+        }
+        answered = {
+            given_product: products_calories[normalize_product_name(given_product)]
+            for given_product in given_products
+            if normalize_product_name(given_product) in products_calories
+        }
+        if answered:
+            self._write_many_answered(answered, found, errors)
+
+        # The API may answer under other names, e.g. "oats" for "oatmeal"; ask about the rest alone.
+        unanswered = [given_product for given_product in given_products if given_product not in answered]
+        self._resolve_many_one_by_one(unanswered, found, errors)
+
+    def _write_many_answered(self, answered, found, errors):
         try:
-            product = Product.objects.get(name=given_product)
-            calories = product.calories
+            written = self.write_many_to_product_database(answered)
+        except InvalidProductException:
+            # Some name makes no valid product; write them one by one to tell which.
+            written = {}
+            for given_product, calories in answered.items():
+                try:
+                    written[given_product] = self.write_to_product_database(given_product, calories)
+                except InvalidProductException as e:
+                    errors[normalize_product_name(given_product)] = e
+
+        for given_product, calories in written.items():
+            found[normalize_product_name(given_product)] = calories
+
+    def _resolve_many_one_by_one(self, given_products, found, errors):
+        for given_product in given_products:
+            try:
+                found[normalize_product_name(given_product)] = self.resolve_once_in_nutrition_api(given_product)
+            except (ProductNotFoundException, NutritionAPIException, InvalidProductException) as e:
+                errors[normalize_product_name(given_product)] = e
+
+    def search_in_database(self, given_product):
+
+        normalized_name = normalize_product_name(given_product)
+
+        calories = product_snapshot.get(normalized_name)
+        if calories is not None:
+            return calories
+
+        calories = product_cache.get(normalized_name)
+        if calories is not None:
             return calories
 
-        except ObjectDoesNotExist:
+        if PRODUCT_NAME_FILTER["ENABLED"] and not product_name_filter.might_contain(normalized_name):
+            return
+
+        product = Product.objects.get_by_name(given_product)
+        if product is None:
+            if PRODUCT_NAME_FILTER["ENABLED"]:
+                product_name_filter.record_false_positive()
+            return
+
+        product_cache.set(normalized_name, product.calories)
+        return product.calories
+
+    def search_similar_in_database(self, given_product):
+        """
+        Accepts a known product spelled slightly differently, e.g. "brocoli" for "broccoli".
+        The spelling isn't stored as an alias or cached: a close match may still be another
+        food, so it is matched again on every lookup.
+        """
+        if not PRODUCT_FUZZY_MATCH["ENABLED"]:
             return
 
+        product = fuzzy_product_index.match(given_product)
+        if product is None:
+            return
+        return product.calories
+
     def search_in_nutrition_api(self, given_product):
 
-        nutrition_api_client = NutritionAPIClient()
-        result = nutrition_api_client.get_single_product_calories(given_product)
+        result = product_lookup_batcher.lookup(given_product, self._nutrition_api_client)
 
         return result
 
     def write_to_product_database(self, given_product, calories):
-        product = dict(name=given_product, calories=calories)
+        """
+        Saves the product and returns its calories.
+        """
+        return self.write_many_to_product_database({given_product: calories})[given_product]
 
-        serializer = ProductSerializer(data=product)
+    def write_many_to_product_database(self, products_calories):
+        """
+        Upserts products in one statement and returns their calories by given name. Concurrent
+        writers of the same product don't fail; the last written calories are kept. Names that
+        don't make a valid product are looked up instead.
+        """
+        products = []
+        result = {}
 
-        if serializer.is_valid():
-            serializer.save()
-        else:
+        for given_product, calories in products_calories.items():
+            product = Product(
+                name=given_product,
+                normalized_name=normalize_product_name(given_product),
+                calories=calories,
+            )
+            try:
+                product.clean_fields()
+            except ValidationError:
+                result[given_product] = self._get_existing_calories(given_product)
+                continue
+            products.append(product)
+
+        if not products:
+            return result
+
+        written = {product.normalized_name: product for product in Product.objects.upsert(products)}
+
+        product_cache.set_many({normalized_name: product.calories for normalized_name, product in written.items()})
+        product_suggest_index.add_products(written.values())
+        fuzzy_product_index.add_products(written.values())
+        for normalized_name in written:
+            product_name_filter.add(normalized_name)
+
+        for product in products:
+            result[product.name] = written[product.normalized_name].calories
+        return result
+
+    def _get_existing_calories(self, given_product):
+        existing_product = Product.objects.get_by_name(given_product)
+
+        if existing_product is None:
             raise InvalidProductException("Invalid given product.")
+
+        product_cache.set(existing_product.normalized_name, existing_product.calories)
+        return existing_product.calories
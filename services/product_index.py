@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from datetime import timedelta
+from typing import Iterable, List, Tuple
+
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from Calorie_counter.settings import PRODUCT_INDEX
+from meal.models import Meal
+from product.models import Product
+
+from .product_cache import product_cache
+from .product_names import normalize_product_name
+
+logger = logging.getLogger(__name__)
+
+
+class IndexedProduct:
+    __slots__ = ("id", "name", "normalized_name", "calories", "popularity")
+
+    def __init__(self, id, name, normalized_name, calories, popularity=0):
+        self.id = id
+        self.name = name
+        self.normalized_name = normalized_name
+        self.calories = calories
+        self.popularity = popularity
+
+
+class InMemoryProductIndex:
+    """
+    Base for per-process indexes over the Product table.
+
+    The index is built on first use. Afterwards, at most every SYNC_INTERVAL seconds,
+    products with ids above the highest indexed one are pulled in, and the whole index is
+    rebuilt when product values were changed (the product cache generation moved) or when it
+    is older than REBUILD_INTERVAL. Readers keep using the current index while one thread
+    refreshes it; with BUILD_IN_BACKGROUND that thread is a separate one, so requests never
+    wait for a build and find nothing until the first one is done. Writers in this process
+    can add products right away.
+
+    Subclasses build their search structures in _build, extend them in _add and read them
+    while holding self._lock. self._state is None until the index is built.
+    """
+
+    def __init__(self, sync_interval: float = None, rebuild_interval: float = None):
+        self._sync_interval = PRODUCT_INDEX["SYNC_INTERVAL"] if sync_interval is None else sync_interval
+        self._rebuild_interval = PRODUCT_INDEX["REBUILD_INTERVAL"] if rebuild_interval is None else rebuild_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._state = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._max_id = 0
+        self._generation = None
+        self._refresh_thread = None
+
+    def ensure_fresh(self):
+        if self._state is not None and time.monotonic() - self._synced_at < self._sync_interval:
+            return
+
+        in_background = PRODUCT_INDEX["BUILD_IN_BACKGROUND"]
+        if not self._refresh_lock.acquire(blocking=self._state is None and not in_background):
+            return
+
+        if in_background:
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_in_background, name=f"{type(self).__name__}-refresh", daemon=True,
+            )
+            self._refresh_thread.start()
+        else:
+            self._refresh()
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("%s refresh failed", type(self).__name__)
+        finally:
+            connection.close()
+
+    def _refresh(self):
+        """
+        Syncs or rebuilds the index. Called with self._refresh_lock held, which it releases.
+        """
+        try:
+            now = time.monotonic()
+            if self._state is not None and now - self._synced_at < self._sync_interval:
+                return
+
+            generation = product_cache.get_generation()
+            if (
+                self._state is None
+                or generation != self._generation
+                or now - self._built_at >= self._rebuild_interval
+            ):
+                self.rebuild(generation)
+            else:
+                self._sync()
+            self._synced_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._state is not None
+
+    def rebuild(self, generation=None):
+        products = self._load_products(Product.objects.all())
+        state = self._build(products)
+
+        with self._lock:
+            self._state = state
+            self._max_id = max((product.id for product in products), default=0)
+            self._built_at = self._synced_at = time.monotonic()
+            self._generation = generation
+
+    def clear(self):
+        with self._lock:
+            self._state = None
+            self._max_id = 0
+            self._generation = None
+
+    def add_products(self, products: Iterable[Product]):
+        """
+        Makes products written by this process searchable without waiting for the next sync.
+        Products upserted in bulk may have no id yet; it is filled in by the next sync.
+        """
+        if self._state is None:
+            return
+
+        products = [
+            IndexedProduct(product.id, product.name, product.normalized_name, product.calories)
+            for product in products
+        ]
+        with self._lock:
+            self._add(products)
+
+    def _sync(self):
+        products = self._load_products(Product.objects.filter(id__gt=self._max_id))
+        if not products:
+            return
+
+        with self._lock:
+            self._add(products)
+            self._max_id = max(self._max_id, max(product.id for product in products))
+
+    def _load_products(self, queryset) -> List[IndexedProduct]:
+        # Popularity is the one stored by the nightly product_popularity_task.
+        return [
+            IndexedProduct(*row)
+            for row in queryset.order_by('id').values_list(
+                'id', 'name', 'normalized_name', 'calories', 'popularity',
+            ).iterator(chunk_size=5000)
+        ]
+
+    def _build(self, products: List[IndexedProduct]):
+        """
+        Returns the new index state for the given products.
+        """
+        raise NotImplementedError
+
+    def _add(self, products: List[IndexedProduct]):
+        """
+        Adds products to self._state, called with self._lock held.
+        """
+        raise NotImplementedError
+
+
+def get_product_popularity() -> dict:
+    """
+    Number of recent meals per normalized product name.
+    """
+    since = timezone.now() - timedelta(days=PRODUCT_INDEX["POPULARITY_WINDOW_DAYS"])
+    meal_counts = Meal.objects.filter(date_add__gte=since).values_list('product_name').annotate(Count('id'))
+
+    popularity = {}
+    for product_name, meals in meal_counts:
+        normalized_name = normalize_product_name(product_name)
+        popularity[normalized_name] = popularity.get(normalized_name, 0) + meals
+    return popularity
+
+
+def get_prefix_range(sorted_keys: List[str], prefix: str) -> Tuple[int, int]:
+    return bisect_left(sorted_keys, prefix), bisect_left(sorted_keys, prefix + "\uffff")
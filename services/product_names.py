@@ -0,0 +1,49 @@
+import re
+
+NON_WORD_CHARACTERS = re.compile(r"[^\w']+|_")
+
+# Plural forms the suffix rules below would get wrong, and words that only look plural.
+IRREGULAR_SINGULARS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "geese": "goose",
+    "mice": "mouse",
+    "teeth": "tooth",
+}
+# Singulars ending in -ie or -che, whose plurals the -ies and -ches rules would cut too short.
+SINGULARS_ENDING_IN_E = {
+    "cookie", "pie", "brownie", "smoothie", "veggie", "hoagie", "pastie", "calorie", "potpie",
+    "quiche", "brioche", "ganache", "panache", "tranche",
+}
+UNCOUNTABLE_WORDS = {
+    "asparagus", "couscous", "hummus", "molasses", "swiss", "citrus",
+    "octopus", "bass", "grass", "glass", "series", "species",
+}
+
+
+def singularize(word: str) -> str:
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if word in UNCOUNTABLE_WORDS or len(word) <= 3:
+        return word
+
+    if word[:-1] in SINGULARS_ENDING_IN_E:
+        return word[:-1]
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes") or word.endswith(("sses", "shes", "ches", "xes", "zzes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_product_name(product_name: str) -> str:
+    """
+    Canonical form of a product name: lower-case words without punctuation,
+    with plurals reduced to singular, so "Apples ", "apple" and "APPLE!" share one key.
+    """
+    words = NON_WORD_CHARACTERS.sub(" ", product_name.lower()).replace("'", "").split()
+    return " ".join(singularize(word) for word in words)
@@ -0,0 +1,207 @@
+import heapq
+from collections import Counter
+from array import array
+from typing import List, Optional, Tuple
+
+from Calorie_counter.settings import PRODUCT_FUZZY_MATCH
+
+from .product_index import InMemoryProductIndex, IndexedProduct
+from .product_names import normalize_product_name
+
+
+def get_trigrams(normalized_name: str) -> set:
+    padded = f"  {normalized_name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def get_max_distance(normalized_name: str) -> int:
+    """
+    Edits tolerated for a name of this length. Short names get none: "pea" is one edit away
+    from "pear" and "tea".
+    """
+    if len(normalized_name) < 4:
+        return 0
+    if len(normalized_name) < 12:
+        return 1
+    return 2
+
+
+def is_substitution(a: str, b: str) -> bool:
+    """
+    Whether names one edit apart differ by a replaced letter rather than a transposition,
+    a missing or an extra letter.
+    """
+    return len(a) == len(b) and sorted(a) != sorted(b)
+
+
+def get_edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Levenshtein distance that also counts a transposition of neighbours as one edit.
+    Returns None as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+
+    for i, a_char in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, b_char in enumerate(b, 1):
+            cost = a_char != b_char
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (
+                previous_previous is not None and j > 1
+                and a_char == b[j - 2] and a[i - 2] == b_char
+            ):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+
+        if min(current) > max_distance:
+            return None
+        previous_previous, previous = previous, current
+
+    distance = previous[-1]
+    return distance if distance <= max_distance else None
+
+
+class FuzzySearchState:
+
+    def __init__(self):
+        self.products: List[IndexedProduct] = []
+        self.positions = {}
+        # (trigram, name length) -> positions in products
+        self.postings = {}
+
+
+class FuzzyProductIndex(InMemoryProductIndex):
+    """
+    Character-trigram inverted index over normalized product names.
+
+    An edit touches at most 3 trigrams (a transposition 4), so a name within k edits of the
+    query misses at most 4k of the query's trigrams. Taking the 4k + 1 + EXTRA_POSTING_LISTS
+    shortest posting lists, a match must appear in all but 4k of them. Only names that do are
+    compared with the query, which keeps the work proportional to the rare trigrams of the
+    query rather than to the catalog size. Posting lists are kept per name length, and only
+    lengths within k of the query's are read.
+
+    Rare trigrams still get more common as the catalog grows, so the work is capped: lists
+    are read until MAX_SCANNED_POSTINGS positions, and only the MAX_CANDIDATES names with the
+    most hits are compared. Queries made only of very common trigrams may then miss a match.
+    """
+
+    EXTRA_POSTING_LISTS = 2
+    MAX_SCANNED_POSTINGS = 4000
+    MAX_CANDIDATES = 50
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[IndexedProduct, int]]:
+        """
+        Returns (product, edit distance) pairs, closest and then most popular first.
+        """
+        self.ensure_fresh()
+
+        normalized_name = normalize_product_name(query)
+        if not normalized_name:
+            return []
+
+        max_distance = get_max_distance(normalized_name)
+        trigrams = get_trigrams(normalized_name)
+
+        matches = []
+        with self._lock:
+            state = self._state
+            if state is None:
+                return []
+            lengths = range(len(normalized_name) - max_distance, len(normalized_name) + max_distance + 1)
+            posting_lists = sorted(
+                (
+                    [state.postings[trigram, length] for length in lengths if (trigram, length) in state.postings]
+                    for trigram in trigrams
+                ),
+                key=lambda parts: sum(map(len, parts)),
+            )[:4 * max_distance + 1 + self.EXTRA_POSTING_LISTS]
+
+            # The most common trigrams are left out once MAX_SCANNED_POSTINGS is reached.
+            scanned = 0
+            for count, parts in enumerate(posting_lists):
+                scanned += sum(map(len, parts))
+                if scanned > self.MAX_SCANNED_POSTINGS:
+                    posting_lists = posting_lists[:count]
+                    break
+
+            hits = Counter()
+            for parts in posting_lists:
+                for postings in parts:
+                    hits.update(postings)
+
+            min_hits = max(1, len(posting_lists) - 4 * max_distance)
+            candidates = [
+                position for position, count in hits.most_common(self.MAX_CANDIDATES) if count >= min_hits
+            ]
+
+            min_shared = len(trigrams) - 4 * max_distance
+            for position in candidates:
+                product = state.products[position]
+                if len(trigrams & get_trigrams(product.normalized_name)) < min_shared:
+                    continue
+                distance = get_edit_distance(normalized_name, product.normalized_name, max_distance)
+                if distance is not None:
+                    matches.append((product, distance))
+
+        return heapq.nsmallest(limit, matches, key=lambda match: (match[1], -match[0].popularity))
+
+    def match(self, query: str) -> Optional[IndexedProduct]:
+        """
+        The only closest product, if the query is long enough to be matched with confidence.
+        A letter typed in place of another isn't accepted, as it turns words into other words,
+        e.g. "batter" into "butter"; missing, extra and swapped letters are. Nothing is matched
+        while the index is still being built.
+        """
+        normalized_name = normalize_product_name(query)
+        if len(normalized_name) < PRODUCT_FUZZY_MATCH["MIN_LENGTH"]:
+            return None
+
+        self.ensure_fresh()
+        if not self.is_ready:
+            return None
+
+        matches = self.search(query, limit=2)
+        if not matches or matches[0][1] > PRODUCT_FUZZY_MATCH["MAX_DISTANCE"]:
+            return None
+        if len(matches) > 1 and matches[1][1] == matches[0][1]:
+            return None
+
+        product, distance = matches[0]
+        if distance and is_substitution(normalized_name, product.normalized_name):
+            return None
+        return product
+
+    def _build(self, products):
+        state = FuzzySearchState()
+        self._add_to_state(state, products)
+        return state
+
+    def _add(self, products):
+        self._add_to_state(self._state, products)
+
+    def _add_to_state(self, state, products):
+        for product in products:
+            position = state.positions.get(product.normalized_name)
+            if position is not None:
+                existing = state.products[position]
+                existing.calories = product.calories
+                existing.id = existing.id or product.id
+                continue
+
+            position = len(state.products)
+            state.products.append(product)
+            state.positions[product.normalized_name] = position
+
+            length = len(product.normalized_name)
+            for trigram in get_trigrams(product.normalized_name):
+                postings = state.postings.get((trigram, length))
+                if postings is None:
+                    postings = state.postings[trigram, length] = array("I")
+                postings.append(position)
+
+
+fuzzy_product_index = FuzzyProductIndex()
@@ -0,0 +1,199 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from typing import Dict, Optional
+
+from Calorie_counter.settings import PRODUCT_SNAPSHOT
+from product.models import Product, ProductAlias
+
+from .product_cache import product_cache
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PCAL"
+FORMAT_VERSION = 2
+
+# magic, format version, name count, product cache generation, change sequence number, built at;
+# padded to keep the arrays aligned
+HEADER = struct.Struct("=4sHIqqd6x")
+
+
+def get_generation_stamp(generation) -> int:
+    return int(generation or 0)
+
+
+def build_snapshot(path: str) -> int:
+    """
+    Writes every product name and alias with its calories to a new snapshot file at path
+    and returns the number of names. The file is replaced atomically, so readers never see
+    a partial snapshot.
+
+    Layout: header, count + 1 uint32 offsets into the names block, count float32 calories,
+    then the normalized names in UTF-8, sorted by their bytes.
+    """
+    generation = product_cache.get_generation()
+    change_sequence = product_cache.get_change_sequence()
+
+    calories_by_name = dict(Product.objects.values_list('normalized_name', 'calories').iterator(chunk_size=5000))
+    for alias, calories in ProductAlias.objects.values_list('alias', 'product__calories').iterator(chunk_size=5000):
+        calories_by_name.setdefault(alias, calories)
+
+    names = sorted(name.encode() for name in calories_by_name)
+
+    offsets = array("I", [0])
+    calories = array("f")
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+        calories.append(calories_by_name[name.decode()])
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".product_snapshot.")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(HEADER.pack(
+                MAGIC, FORMAT_VERSION, len(names), get_generation_stamp(generation), change_sequence, time.time(),
+            ))
+            offsets.tofile(file)
+            calories.tofile(file)
+            for name in names:
+                file.write(name)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return len(names)
+
+
+class SnapshotView:
+    """
+    One mapped snapshot file. Kept alive by whoever is still reading it, so a replaced
+    file is unmapped only after its last lookup.
+    """
+
+    def __init__(self, file):
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic, format_version, self.count, self.generation, self.change_sequence, self.built_at,
+        ) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("Not a product snapshot of a supported format.")
+
+        offsets_start = HEADER.size
+        calories_start = offsets_start + 4 * (self.count + 1)
+        self._names_start = calories_start + 4 * self.count
+
+        buffer = memoryview(self._mmap)
+        self._offsets = buffer[offsets_start:calories_start].cast("I")
+        self._calories = buffer[calories_start:self._names_start].cast("f")
+
+    def get(self, normalized_name: str) -> Optional[float]:
+        key = normalized_name.encode()
+        low, high = 0, self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_name(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.count and self._get_name(low) == key:
+            # float32 keeps about 7 significant digits.
+            return round(self._calories[low], 2)
+        return None
+
+    def _get_name(self, index: int) -> bytes:
+        return self._mmap[self._names_start + self._offsets[index]:self._names_start + self._offsets[index + 1]]
+
+
+class ProductSnapshot:
+    """
+    Read-only, memory-mapped copy of the product catalog, rebuilt periodically by a Celery task.
+
+    All workers on a host map the same file, so its pages are shared through the page cache
+    instead of each worker holding its own copy. The file is re-checked every CHECK_INTERVAL
+    seconds and remapped when it was replaced.
+
+    The snapshot carries the product cache generation and change sequence number it was built
+    at. Once values have been removed since then, it is not used until rebuilt; names whose
+    values changed since then are read from the cache instead. Products added after the build
+    are simply not found here and fall through to the database.
+    """
+
+    def __init__(self, path: str, check_interval: float):
+        self._path = path
+        self._check_interval = check_interval
+        self._view = None
+        self._file_id = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._counters = dict(hits=0, misses=0, stale=0)
+
+    def get(self, normalized_name: str) -> Optional[float]:
+        view = self._get_view()
+        if view is None:
+            return None
+
+        if (
+            view.generation != get_generation_stamp(product_cache.get_known_generation())
+            or product_cache.is_changed_since(normalized_name, view.change_sequence)
+        ):
+            self._counters["stale"] += 1
+            return None
+
+        calories = view.get(normalized_name)
+        self._counters["hits" if calories is not None else "misses"] += 1
+        return calories
+
+    def reload(self):
+        """
+        Maps the current file, or drops the mapping if the file is gone or unreadable.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+
+            try:
+                stat = os.stat(self._path)
+            except FileNotFoundError:
+                self._view, self._file_id = None, None
+                return
+
+            file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if file_id == self._file_id:
+                return
+
+            try:
+                with open(self._path, "rb") as file:
+                    self._view = SnapshotView(file)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning("Product snapshot %s can't be used: %s", self._path, e)
+                self._view = None
+            self._file_id = file_id
+
+    def stats(self) -> Dict[str, int]:
+        view = self._view
+        return dict(
+            self._counters,
+            size=view.count if view is not None else 0,
+            generation=view.generation if view is not None else None,
+        )
+
+    def _get_view(self) -> Optional[SnapshotView]:
+        if time.monotonic() - self._checked_at >= self._check_interval:
+            self.reload()
+        return self._view
+
+
+product_snapshot = ProductSnapshot(
+    path=PRODUCT_SNAPSHOT["PATH"],
+    check_interval=PRODUCT_SNAPSHOT["CHECK_INTERVAL"],
+)
@@ -0,0 +1,103 @@
+import heapq
+import re
+from bisect import insort
+from typing import List
+
+from .product_index import InMemoryProductIndex, IndexedProduct, get_prefix_range
+from .product_names import normalize_product_name
+
+NON_WORD_CHARACTERS = re.compile(r"[^\w]+|_")
+
+
+def normalize_prefix(prefix: str) -> str:
+    """
+    Like normalize_product_name, but without singularizing a word that may still be typed.
+    """
+    return " ".join(NON_WORD_CHARACTERS.sub(" ", prefix.lower().replace("'", "")).split())
+
+
+def _rank(product: IndexedProduct):
+    return product.popularity, -len(product.normalized_name)
+
+
+class SuggestState:
+
+    def __init__(self, keys, products, top_by_prefix):
+        self.keys = keys
+        self.products = products
+        self.top_by_prefix = top_by_prefix
+
+
+class ProductSuggestIndex(InMemoryProductIndex):
+    """
+    Prefix index over normalized product names: a sorted array searched with bisect,
+    ranked by popularity. Top suggestions for the shortest prefixes, whose ranges are
+    the widest, are precomputed.
+    """
+
+    PRECOMPUTED_PREFIX_LENGTH = 3
+    PRECOMPUTED_TOP = 20
+
+    def suggest(self, query: str, limit: int = 10) -> List[IndexedProduct]:
+        self.ensure_fresh()
+
+        prefixes = {normalize_prefix(query), normalize_product_name(query)}
+        prefixes.discard("")
+
+        candidates = {}
+        with self._lock:
+            if self._state is None:
+                return []
+            for prefix in prefixes:
+                for product in self._get_candidates(self._state, prefix, limit):
+                    candidates[product.normalized_name] = product
+
+        return heapq.nlargest(limit, candidates.values(), key=_rank)
+
+    def _get_candidates(self, state, prefix, limit):
+        if len(prefix) <= self.PRECOMPUTED_PREFIX_LENGTH and limit <= self.PRECOMPUTED_TOP:
+            return state.top_by_prefix.get(prefix, [])[:limit]
+
+        start, end = get_prefix_range(state.keys, prefix)
+        return heapq.nlargest(
+            limit,
+            (state.products[state.keys[index]] for index in range(start, end)),
+            key=_rank,
+        )
+
+    def _build(self, products):
+        by_name = {product.normalized_name: product for product in products}
+        top_by_prefix = {}
+
+        for product in by_name.values():
+            for prefix in self._get_short_prefixes(product.normalized_name):
+                top_by_prefix.setdefault(prefix, []).append(product)
+        for prefix, prefix_products in top_by_prefix.items():
+            top_by_prefix[prefix] = heapq.nlargest(self.PRECOMPUTED_TOP, prefix_products, key=_rank)
+
+        return SuggestState(sorted(by_name), by_name, top_by_prefix)
+
+    def _add(self, products):
+        state = self._state
+
+        for product in products:
+            existing = state.products.get(product.normalized_name)
+            if existing is not None:
+                existing.calories = product.calories
+                existing.id = existing.id or product.id
+                continue
+
+            state.products[product.normalized_name] = product
+            insort(state.keys, product.normalized_name)
+
+            for prefix in self._get_short_prefixes(product.normalized_name):
+                top = state.top_by_prefix.setdefault(prefix, [])
+                top.append(product)
+                top.sort(key=_rank, reverse=True)
+                del top[self.PRECOMPUTED_TOP:]
+
+    def _get_short_prefixes(self, normalized_name):
+        return {normalized_name[:length] for length in range(1, self.PRECOMPUTED_PREFIX_LENGTH + 1)}
+
+
+product_suggest_index = ProductSuggestIndex()
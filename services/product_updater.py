@@ -1,47 +1,427 @@
-from django.core.paginator import Paginator
+import json
+import time
+from datetime import timedelta
 
-from .nutrition import NutritionAPIClient, ProductNotFoundException, NutritionAPIException
-from product.models import Product
+import redis
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from Calorie_counter.settings import PRODUCT_REFRESH, PRODUCT_UPDATER
+
+from .circuit_breaker import nutrition_circuit_breaker
+from .nutrition import (
+    NutritionAPIClient,
+    NutritionAPIException,
+    NutritionAPIRateLimitException,
+    NutritionAPIUnavailableException,
+    ProductNotFoundException,
+)
+from .product_cache import product_cache
+from .product_index import get_product_popularity
+from .product_names import normalize_product_name
+from .product_search import fuzzy_product_index
+from .product_suggest import product_suggest_index
+from .rate_limiter import BACKGROUND
+from .redis_client import get_redis
+from product.models import Product, ProductAlias
 from celery.utils.log import get_task_logger
 
 logger = get_task_logger("celery_logger")
 
 
 class ProductUpdater:
+    """
+    Refreshes the calories of every product from the nutrition API.
+
+    The table is walked in id order with keyset pagination, BATCH_SIZE rows at a time, and
+    each page is sent in as few API queries as MAX_QUERY_LENGTH allows.
+    """
 
-    def __init__(self, batch_size):
+    QUERY_SEPARATOR = " and "
+
+    def __init__(self, batch_size=None, max_query_length=None):
         self._model = Product
-        self._batch_size = batch_size
+        self._batch_size = batch_size or PRODUCT_UPDATER["BATCH_SIZE"]
+        self._max_query_length = max_query_length or PRODUCT_UPDATER["MAX_QUERY_LENGTH"]
+        self._nutrition_api_client = NutritionAPIClient(priority=BACKGROUND)
+
+    def update(self, min_id=0, max_id=None, checkpoint=None):
+        """
+        Refreshes products with min_id < id <= max_id (all by default) and returns the run's
+        statistics. With a checkpoint, a repeated call resumes after the last finished page.
+        """
+        if nutrition_circuit_breaker.is_open():
+            logger.warning("Nutrition API is unavailable, ProductUpdater run skipped")
+            return
+
+        self._now = timezone.now()
+        self._today = timezone.localdate()
+        self._id_range = Q(id__gt=min_id)
+        if max_id is not None:
+            self._id_range &= Q(id__lte=max_id)
+        self._checkpoint = checkpoint
+
+        last_id, self._stats = checkpoint.get() if checkpoint is not None else (None, None)
+        if self._stats is None:
+            self._stats = dict(
+                products=0,
+                api_calls=0,
+                refreshed=0,
+                changed=0,
+                skipped=self._model.objects.filter(self._id_range, refresh_after__gt=self._today).count(),
+                quarantined=0,
+            )
+        started_at = time.monotonic()
 
-    def update(self):
-        products_queryset = self._model.objects.all().order_by('id')
-        paginator = Paginator(products_queryset, self._batch_size)
+        try:
+            self._update_all(last_id or min_id)
+        except NutritionAPIUnavailableException:
+            logger.warning("Nutrition API became unavailable, ProductUpdater run stopped")
+        finally:
+            log_update_summary(self._stats, time.monotonic() - started_at)
 
-        for page_number in paginator.page_range:
-            page = paginator.page(page_number)
+        return self._stats
 
-            product_names = [product.name for product in page.object_list]
+    def update_stale(self, limit):
+        """
+        Refreshes up to limit products whose calories are older than their popularity tier
+        allows, most popular and then longest unrefreshed first. Returns the slice's statistics.
+        """
+        if nutrition_circuit_breaker.is_open():
+            logger.warning("Nutrition API is unavailable, ProductUpdater slice skipped")
+            return
 
-            try:
-                updated_products = self._get_actual_calories(product_names)
-            except (ProductNotFoundException, NutritionAPIException):
-                logger.info("products not found")
-                continue
+        self._now = timezone.now()
+        self._today = timezone.localdate()
+        self._stats = dict(products=0, api_calls=0, refreshed=0, changed=0, skipped=0, quarantined=0)
+        started_at = time.monotonic()
 
-            self._update_model(page, updated_products)
+        products = list(
+            self._model.objects.filter(self._get_due_filter(), get_stale_filter(self._now)).order_by(
+                '-popularity', F('last_refreshed_at').asc(nulls_first=True), 'id',
+            )[:limit]
+        )
+
+        try:
+            for offset in range(0, len(products), self._batch_size):
+                self._update_page(products[offset:offset + self._batch_size])
+        except NutritionAPIUnavailableException:
+            logger.warning("Nutrition API became unavailable, ProductUpdater slice stopped")
+        finally:
+            log_update_summary(self._stats, time.monotonic() - started_at, label="ProductUpdater slice")
+
+        return self._stats
+
+    def _update_all(self, last_id):
+        while True:
+            products = list(
+                self._model.objects.filter(
+                    self._get_due_filter(), self._id_range, id__gt=last_id,
+                ).order_by('id')[:self._batch_size]
+            )
+            if not products:
+                return
+            last_id = products[-1].id
+
+            self._update_page(products)
+
+            if self._checkpoint is not None:
+                self._checkpoint.save(last_id, self._stats)
+
+    def _update_page(self, products):
+        self._stats["products"] += len(products)
+
+        updates = []
+        failures = []
+        try:
+            for query_products in self._pack_queries(products):
+                self._refresh(query_products, updates, failures)
+        finally:
+            self._save_updates(updates)
+            self._save_failures(failures)
+
+    def _get_due_filter(self):
+        return Q(refresh_after__isnull=True) | Q(refresh_after__lte=self._today)
+
+    def _refresh(self, products, updates, failures):
+        """
+        Refreshes products with one API query. When the API doesn't know some of the products,
+        those are split in halves and retried until each unknown product is queried alone,
+        so one unknown name doesn't cost the rest of the query. Queries failing for any other
+        reason are skipped, so an upstream outage never quarantines products.
+        """
+        self._stats["api_calls"] += 1
+
+        try:
+            updated_products = self._get_actual_calories([product.name for product in products])
+        except NutritionAPIRateLimitException:
+            logger.info("Nutrition API rate limit reached, %s products skipped", len(products))
+            self._stats["skipped"] += len(products)
+            return
+        except NutritionAPIUnavailableException:
+            raise
+        except ProductNotFoundException:
+            unanswered = products
+        except NutritionAPIException as e:
+            logger.info("Nutrition API query failed, %s products skipped: %s", len(products), e)
+            self._stats["skipped"] += len(products)
+            return
+        else:
+            actual_calories = self._match_products(products, updated_products)
+            updates.extend(self._get_updates(products, actual_calories))
+            unanswered = [obj for obj in products if obj.pk not in actual_calories]
+
+        if not unanswered:
+            return
+        if len(products) == 1:
+            failures.append(products[0])
+            return
+
+        if len(unanswered) < len(products):
+            self._refresh(unanswered, updates, failures)
+        else:
+            middle = len(products) // 2
+            self._refresh(products[:middle], updates, failures)
+            self._refresh(products[middle:], updates, failures)
+
+    def _pack_queries(self, products):
+        """
+        Splits products into groups whose names, joined into one API query, fit MAX_QUERY_LENGTH.
+        """
+        group = []
+        length = 0
+
+        for product in products:
+            added_length = len(product.name) + (len(self.QUERY_SEPARATOR) if group else 0)
+
+            if group and length + added_length > self._max_query_length:
+                yield group
+                group, length = [], 0
+                added_length = len(product.name)
+
+            group.append(product)
+            length += added_length
+
+        if group:
+            yield group
 
     def _get_actual_calories(self, product_names):
-        api_client = NutritionAPIClient()
-        updated_products = api_client.get_multiple_products_calories(product_names)
+        updated_products = self._nutrition_api_client.get_multiple_products_calories(product_names)
 
         return updated_products
 
-    def _update_model(self, page, updated_products):
+    def _get_updates(self, products, actual_calories):
+        """
+        Products the API answered for, stamped as refreshed. Those whose calories changed
+        are marked with calories_changed.
+        """
         updates = []
-        for obj in page.object_list:
-            if obj.name in updated_products:
-                if obj.calories != updated_products[obj.name]:
-                    obj.calories = updated_products[obj.name]
-                    updates.append(obj)
+        for obj in products:
+            if obj.pk in actual_calories:
+                self._stats["refreshed"] += 1
+
+                obj.calories_changed = obj.calories != actual_calories[obj.pk]
+                obj.calories = actual_calories[obj.pk]
+                obj.refresh_failures = 0
+                obj.refresh_after = None
+                obj.last_refreshed_at = self._now
+                updates.append(obj)
+        return updates
+
+    def _save_updates(self, updates):
+        if not updates:
+            return
+
+        self._model.objects.bulk_update(
+            updates, ["calories", "refresh_failures", "refresh_after", "last_refreshed_at"],
+        )
+
+        changed = [obj for obj in updates if obj.calories_changed]
+        if changed:
+            product_cache.set_many({obj.normalized_name: obj.calories for obj in changed}, changed=True)
+            product_suggest_index.add_products(changed)
+            fuzzy_product_index.add_products(changed)
+        self._stats["changed"] += len(changed)
+
+    def _save_failures(self, failures):
+        """
+        Puts products the API keeps failing on aside, for QUARANTINE_BASE_DAYS doubled
+        with every further failure, at most QUARANTINE_MAX_DAYS.
+        """
+        if not failures:
+            return
+
+        for obj in failures:
+            obj.refresh_failures += 1
+            days = min(
+                PRODUCT_UPDATER["QUARANTINE_BASE_DAYS"] * 2 ** (obj.refresh_failures - 1),
+                PRODUCT_UPDATER["QUARANTINE_MAX_DAYS"],
+            )
+            obj.refresh_after = self._today + timedelta(days=days)
+
+        self._model.objects.bulk_update(failures, ["refresh_failures", "refresh_after"])
+        self._stats["quarantined"] += len(failures)
+        logger.info("products not found: %s", ", ".join(obj.name for obj in failures))
+
+    def _match_products(self, products, updated_products):
+        """
+        Maps the names the API answered with to product ids: by normalized name, then by alias.
+        A single leftover answer for a single leftover product is its new alias.
+        """
+        unmatched_calories = {
+            normalize_product_name(name): calories for name, calories in updated_products.items()
+        }
+        actual_calories = {}
+
+        for obj in products:
+            if obj.normalized_name in unmatched_calories:
+                actual_calories[obj.pk] = unmatched_calories.pop(obj.normalized_name)
+
+        unmatched_products = [obj for obj in products if obj.pk not in actual_calories]
+        if not unmatched_calories or not unmatched_products:
+            return actual_calories
+
+        aliases = ProductAlias.objects.filter(
+            alias__in=unmatched_calories.keys(),
+            product__in=unmatched_products,
+        ).values_list("alias", "product_id")
+        for alias, product_id in aliases:
+            actual_calories[product_id] = unmatched_calories.pop(alias)
+
+        unmatched_products = [obj for obj in unmatched_products if obj.pk not in actual_calories]
+        if len(unmatched_calories) == 1 and len(unmatched_products) == 1:
+            api_name, calories = unmatched_calories.popitem()
+            unmatched_products[0].add_alias(api_name)
+            actual_calories[unmatched_products[0].pk] = calories
+
+        return actual_calories
+
+
+class ShardCheckpoint:
+    """
+    Remembers the last product id, and the statistics so far, of one shard of an updater run,
+    so a shard redelivered after a worker crash resumes where it stopped.
+    """
+
+    KEY_PREFIX = "product_updater:checkpoint:"
+
+    def __init__(self, run_id, min_id, max_id, ttl=None):
+        self._key = f"{self.KEY_PREFIX}{run_id}:{min_id}:{max_id}"
+        self._ttl = ttl or PRODUCT_UPDATER["CHECKPOINT_TTL"]
+
+    def get(self):
+        try:
+            checkpoint = get_redis().get(self._key)
+        except redis.RedisError as e:
+            logger.warning("ProductUpdater checkpoint unavailable: %s", e)
+            return None, None
+
+        if checkpoint is None:
+            return None, None
+        checkpoint = json.loads(checkpoint)
+        return checkpoint["last_id"], checkpoint["stats"]
+
+    def save(self, last_id, stats):
+        try:
+            get_redis().set(self._key, json.dumps(dict(last_id=last_id, stats=stats)), ex=self._ttl)
+        except redis.RedisError as e:
+            logger.warning("ProductUpdater checkpoint unavailable: %s", e)
+
+
+def get_id_ranges(shard_size):
+    """
+    Splits the product table into (min_id, max_id] ranges of shard_size products each.
+    The last range is open-ended, so products added meanwhile are covered too.
+    """
+    id_ranges = []
+    last_id = 0
+
+    while True:
+        boundary = list(
+            Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[shard_size - 1:shard_size]
+        )
+        if not boundary:
+            break
+        id_ranges.append((last_id, boundary[0]))
+        last_id = boundary[0]
+
+    if not id_ranges or Product.objects.filter(id__gt=last_id).exists():
+        id_ranges.append((last_id, None))
+    return id_ranges
+
+
+def merge_update_stats(*stats):
+    merged = {}
+    for shard_stats in stats:
+        for name, value in (shard_stats or {}).items():
+            merged[name] = merged.get(name, 0) + value
+    return merged
+
+
+def log_update_summary(stats, elapsed, label="ProductUpdater run"):
+    products = stats.get("products", 0)
+    logger.info(
+        "%s: %s products in %.1f s (%.1f products/s), %s API calls, "
+        "%s refreshed, %s rows changed, %s skipped, %s quarantined",
+        label,
+        products,
+        elapsed,
+        products / max(elapsed, 1e-9),
+        stats.get("api_calls", 0),
+        stats.get("refreshed", 0),
+        stats.get("changed", 0),
+        stats.get("skipped", 0),
+        stats.get("quarantined", 0),
+    )
+
+
+def get_stale_filter(now):
+    """
+    Products never refreshed, or refreshed longer ago than their popularity tier allows:
+    HOT_MAX_AGE_DAYS for at least HOT_POPULARITY recent meals, WARM_MAX_AGE_DAYS for any
+    recent meal and COLD_MAX_AGE_DAYS otherwise.
+    """
+    hot_popularity = PRODUCT_REFRESH["HOT_POPULARITY"]
+
+    return (
+        Q(last_refreshed_at__isnull=True)
+        | Q(
+            popularity__gte=hot_popularity,
+            last_refreshed_at__lt=now - timedelta(days=PRODUCT_REFRESH["HOT_MAX_AGE_DAYS"]),
+        )
+        | Q(
+            popularity__gt=0,
+            popularity__lt=hot_popularity,
+            last_refreshed_at__lt=now - timedelta(days=PRODUCT_REFRESH["WARM_MAX_AGE_DAYS"]),
+        )
+        | Q(
+            popularity=0,
+            last_refreshed_at__lt=now - timedelta(days=PRODUCT_REFRESH["COLD_MAX_AGE_DAYS"]),
+        )
+    )
+
+
+def update_product_popularity():
+    """
+    Stores on every product the number of meals eaten with it, under its name or an alias,
+    in the last PRODUCT_INDEX_POPULARITY_WINDOW_DAYS. Returns the number of products changed.
+    """
+    meals_by_name = get_product_popularity()
+    aliases = dict(ProductAlias.objects.values_list('alias', 'product__normalized_name').iterator(chunk_size=5000))
+
+    popularity = {}
+    for name, meals in meals_by_name.items():
+        normalized_name = aliases.get(name, name)
+        popularity[normalized_name] = popularity.get(normalized_name, 0) + meals
+
+    changed = []
+    for id, normalized_name, current in Product.objects.values_list(
+        'id', 'normalized_name', 'popularity',
+    ).iterator(chunk_size=5000):
+        new = popularity.get(normalized_name, 0)
+        if new != current:
+            changed.append(Product(id=id, popularity=new))
 
-        self._model.objects.bulk_update(updates, ["calories"])
+    Product.objects.bulk_update(changed, ['popularity'], batch_size=1000)
+    return len(changed)
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from Calorie_counter.settings import (
+    NUTRITION_API_CIRCUIT_BREAKER,
+    NUTRITION_API_HEDGING,
+    NUTRITION_SECONDARY_PROVIDERS,
+)
+
+from .circuit_breaker import CircuitBreaker
+from .nutrition import NutritionAPIClient, NutritionAPIException, ProductNotFoundException
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_EXCEPTIONS = (NutritionAPIException, ProductNotFoundException)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=NUTRITION_API_HEDGING["MAX_WORKERS"],
+                thread_name_prefix="nutrition-hedge",
+            )
+    return _executor
+
+
+class SecondaryNutritionAPIClient(NutritionAPIClient):
+    """
+    An api-ninjas compatible HTTP source used behind the primary API.
+    It has its own circuit and doesn't spend the primary API's rate-limit budget.
+    """
+
+    def __init__(self, name: str, base_url: str, api_key: str):
+        super().__init__(api_url=f"{base_url.rstrip('/')}/v1/nutrition", api_key=api_key)
+        self._circuit_breaker = CircuitBreaker(
+            f"nutrition_{name}",
+            failure_threshold=NUTRITION_API_CIRCUIT_BREAKER["FAILURE_THRESHOLD"],
+            failure_window=NUTRITION_API_CIRCUIT_BREAKER["FAILURE_WINDOW"],
+            reset_timeout=NUTRITION_API_CIRCUIT_BREAKER["RESET_TIMEOUT"],
+            probe_timeout=NUTRITION_API_CIRCUIT_BREAKER["PROBE_TIMEOUT"],
+        )
+
+    def _get_circuit_breaker(self):
+        return self._circuit_breaker
+
+    def _acquire_rate_limit(self):
+        pass
+
+    def _observe_response(self, response):
+        pass
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent successful call latencies to estimate a percentile.
+    """
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def get_percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+_latency_trackers = {}
+_latency_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(provider) -> LatencyTracker:
+    """
+    Latencies are kept per process and provider endpoint, so short-lived chains share them.
+    """
+    key = (type(provider).__name__, getattr(provider, "_api_url", None))
+
+    with _latency_trackers_lock:
+        if key not in _latency_trackers:
+            _latency_trackers[key] = LatencyTracker()
+        return _latency_trackers[key]
+
+
+class NutritionProviderChain:
+    """
+    Ordered list of nutrition providers with the same interface as NutritionAPIClient.
+
+    Providers are asked in order until one answers. With hedging enabled, the second provider
+    is also asked once the first hasn't answered within its recent latency percentile,
+    and whichever succeeds first wins.
+    """
+
+    def __init__(self, providers: List, hedging: Optional[Dict] = None):
+        self._providers = providers
+        self._hedging = hedging if hedging and hedging["ENABLED"] and len(providers) > 1 else None
+        self._primary_latency = get_latency_tracker(providers[0])
+
+    def get_single_product_calories(self, product_name: str) -> float:
+        return self._call(lambda provider: provider.get_single_product_calories(product_name))
+
+    def get_multiple_products_calories(self, product_names: List[str]) -> Dict[str, float]:
+        return self._call(lambda provider: provider.get_multiple_products_calories(product_names))
+
+    def get_hedge_delay(self) -> float:
+        if len(self._primary_latency) < self._hedging["MIN_SAMPLES"]:
+            return self._hedging["MAX_DELAY"]
+
+        delay = self._primary_latency.get_percentile(self._hedging["PERCENTILE"])
+        return min(self._hedging["MAX_DELAY"], max(self._hedging["MIN_DELAY"], delay))
+
+    def _call(self, operation: Callable):
+        providers = list(self._providers)
+        errors = []
+
+        if self._hedging:
+            result, hedge_errors = self._call_hedged(operation, providers[0], providers[1])
+            if not hedge_errors:
+                return result
+            errors.extend(hedge_errors)
+            providers = providers[2:]
+
+        for index, provider in enumerate(providers):
+            started_at = time.monotonic()
+            try:
+                result = operation(provider)
+            except PROVIDER_EXCEPTIONS as e:
+                errors.append(e)
+                continue
+
+            if index == 0 and not self._hedging:
+                self._primary_latency.add(time.monotonic() - started_at)
+            return result
+
+        raise self._pick_error(errors)
+
+    def _call_hedged(self, operation, primary, secondary):
+        executor = get_executor()
+        started_at = time.monotonic()
+
+        primary_future = executor.submit(operation, primary)
+        primary_future.add_done_callback(partial(self._record_primary_latency, started_at))
+
+        done, _ = wait([primary_future], timeout=self.get_hedge_delay())
+        if done and primary_future.exception() is None:
+            return primary_future.result(), []
+
+        logger.debug("Hedging nutrition lookup to the secondary provider")
+        pending = {primary_future, executor.submit(operation, secondary)}
+        errors = []
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result(), []
+                errors.append(future.exception())
+
+        return None, errors
+
+    def _record_primary_latency(self, started_at, future):
+        if future.exception() is None:
+            self._primary_latency.add(time.monotonic() - started_at)
+
+    @staticmethod
+    def _pick_error(errors):
+        """
+        'Not found' from any provider is more telling than another provider being unreachable.
+        """
+        for error in errors:
+            if isinstance(error, ProductNotFoundException):
+                return error
+        return errors[-1]
+
+
+def get_secondary_providers() -> List[NutritionAPIClient]:
+    return [
+        SecondaryNutritionAPIClient(
+            name=provider["NAME"],
+            base_url=provider["BASE_URL"],
+            api_key=provider["API_KEY"],
+        )
+        for provider in NUTRITION_SECONDARY_PROVIDERS
+    ]
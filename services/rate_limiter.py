@@ -0,0 +1,131 @@
+import logging
+import time
+from typing import Dict, Optional
+
+import redis
+from Calorie_counter.settings import NUTRITION_API_RATE_LIMITS
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Returns 0 when a token was taken, otherwise the milliseconds until one is available.
+TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local paused_until = tonumber(redis.call("GET", KEYS[2]) or "0")
+if paused_until > now then
+    return paused_until - now
+end
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate / 1000)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    Redis token buckets shared by every web and Celery process, one per priority.
+    A pause set from the API's rate-limit headers blocks all buckets until it ends.
+    """
+
+    KEY_PREFIX = "ratelimit:nutrition:"
+    PAUSE_KEY = "ratelimit:nutrition:paused_until"
+
+    def __init__(self, limits: Dict[str, Dict[str, float]]):
+        self._limits = limits
+        self._script = None
+
+    def acquire(self, priority: str, max_wait: Optional[float] = None):
+        limit = self._limits[priority]
+        max_wait = limit["MAX_WAIT"] if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+
+        while True:
+            try:
+                wait_ms = self._take_token(priority, limit)
+            except redis.RedisError as e:
+                logger.warning("Nutrition API rate limiter unavailable: %s", e)
+                return
+
+            if not wait_ms:
+                return
+
+            wait = wait_ms / 1000
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"Nutrition API {priority} rate limit exceeded.")
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Stops every caller for the given time, e.g. after the API answered with 429.
+        """
+        try:
+            client = get_redis()
+            redis_time = client.time()
+            paused_until = int(redis_time[0] * 1000 + redis_time[1] // 1000 + seconds * 1000)
+            current = client.get(self.PAUSE_KEY)
+            if current is None or int(current) < paused_until:
+                client.set(self.PAUSE_KEY, paused_until, px=int(seconds * 1000) + 1)
+        except redis.RedisError as e:
+            logger.warning("Nutrition API rate limiter unavailable: %s", e)
+
+    def observe_response(self, response):
+        """
+        Honors the API's rate-limit headers: Retry-After on 429,
+        or an exhausted X-RateLimit-Remaining with its X-RateLimit-Reset.
+        """
+        headers = response.headers or {}
+
+        if response.status_code == 429:
+            self.pause(self._get_seconds(headers.get("Retry-After"), default=1.0))
+        elif str(headers.get("X-RateLimit-Remaining", "")).strip() == "0":
+            self.pause(self._get_seconds(headers.get("X-RateLimit-Reset"), default=1.0))
+
+    def _take_token(self, priority, limit):
+        client = get_redis()
+        if self._script is None or self._script.registered_client is not client:
+            self._script = client.register_script(TAKE_TOKEN_SCRIPT)
+
+        return self._script(
+            keys=[f"{self.KEY_PREFIX}{priority}", self.PAUSE_KEY],
+            args=[limit["RATE"], limit["CAPACITY"]],
+        )
+
+    @staticmethod
+    def _get_seconds(value, default):
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            return default
+
+        # Some APIs send the reset moment as a Unix timestamp instead of a delay.
+        if seconds > time.time() / 2:
+            seconds -= time.time()
+        return max(seconds, 0.0) or default
+
+
+nutrition_rate_limiter = RateLimiter(NUTRITION_API_RATE_LIMITS)
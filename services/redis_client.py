@@ -0,0 +1,26 @@
+import os
+
+import redis
+from Calorie_counter.settings import REDIS_URL
+
+_client = None
+_client_pid = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Returns the per-process Redis client shared by the caches, locks and limiters in services.
+    Like the HTTP session, the connection pool is recreated after a fork.
+    """
+    global _client, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        _client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+            health_check_interval=30,
+        )
+        _client_pid = os.getpid()
+
+    return _client
@@ -0,0 +1,113 @@
+import json
+import logging
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple, Type
+
+import redis
+from Calorie_counter.settings import PRODUCT_LOOKUP_SINGLE_FLIGHT
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Cross-process request coalescing on top of a short-lived Redis lock.
+
+    The first caller for a key becomes the leader and runs the function; concurrent callers
+    wait for the result it publishes. Exceptions listed in shared_exceptions are published too,
+    any other failure just releases the lock so that one of the waiters takes over.
+    """
+
+    LOCK_PREFIX = "singleflight:lock:"
+    RESULT_PREFIX = "singleflight:result:"
+
+    def __init__(self, lock_ttl: float, result_ttl: float, wait_timeout: float, poll_interval: float):
+        self._lock_ttl_ms = int(lock_ttl * 1000)
+        self._result_ttl_ms = int(result_ttl * 1000)
+        self._wait_timeout = wait_timeout
+        self._poll_interval = poll_interval
+        self._release_lock_script = None
+
+    def do(self, key: str, fn: Callable[[], Any], shared_exceptions: Tuple[Type[Exception], ...] = ()) -> Any:
+        lock_key = f"{self.LOCK_PREFIX}{key}"
+        result_key = f"{self.RESULT_PREFIX}{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self._wait_timeout
+
+        try:
+            client = get_redis()
+            while True:
+                published = self._read_result(client, result_key, shared_exceptions)
+                if published is not None:
+                    return published[0]
+
+                if client.set(lock_key, token, nx=True, px=self._lock_ttl_ms):
+                    break
+
+                if time.monotonic() >= deadline:
+                    logger.warning("Gave up waiting for the in-flight lookup of %s", key)
+                    return fn()
+                time.sleep(self._poll_interval)
+        except redis.RedisError as e:
+            logger.warning("Single-flight coordination unavailable: %s", e)
+            return fn()
+
+        return self._lead(client, lock_key, result_key, token, fn, shared_exceptions)
+
+    def _lead(self, client, lock_key, result_key, token, fn, shared_exceptions):
+        try:
+            result = fn()
+        except shared_exceptions as e:
+            self._publish(client, result_key, {"error": type(e).__name__, "message": str(e)})
+            raise
+        else:
+            self._publish(client, result_key, {"value": result})
+            return result
+        finally:
+            try:
+                self._get_release_lock_script(client)(keys=[lock_key], args=[token])
+            except redis.RedisError as e:
+                logger.warning("Failed to release single-flight lock %s: %s", lock_key, e)
+
+    def _publish(self, client, result_key, payload):
+        try:
+            client.set(result_key, json.dumps(payload), px=self._result_ttl_ms)
+        except redis.RedisError as e:
+            logger.warning("Failed to publish single-flight result %s: %s", result_key, e)
+
+    @staticmethod
+    def _read_result(client, result_key, shared_exceptions) -> Optional[Tuple[Any]]:
+        raw = client.get(result_key)
+        if raw is None:
+            return None
+
+        payload = json.loads(raw)
+        if "error" in payload:
+            for exception_class in shared_exceptions:
+                if exception_class.__name__ == payload["error"]:
+                    raise exception_class(payload["message"])
+            return None
+        return (payload["value"],)
+
+    def _get_release_lock_script(self, client):
+        if self._release_lock_script is None or self._release_lock_script.registered_client is not client:
+            self._release_lock_script = client.register_script(RELEASE_LOCK_SCRIPT)
+        return self._release_lock_script
+
+
+product_lookup_single_flight = SingleFlight(
+    lock_ttl=PRODUCT_LOOKUP_SINGLE_FLIGHT["LOCK_TTL"],
+    result_ttl=PRODUCT_LOOKUP_SINGLE_FLIGHT["RESULT_TTL"],
+    wait_timeout=PRODUCT_LOOKUP_SINGLE_FLIGHT["WAIT_TIMEOUT"],
+    poll_interval=PRODUCT_LOOKUP_SINGLE_FLIGHT["POLL_INTERVAL"],
+)
@@ -3,10 +3,15 @@ import pytest
 from unittest.mock import patch
 from rest_framework.exceptions import ErrorDetail
 from rest_framework import serializers
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from meal.views import ProductNotFoundException
+from services.nutrition import NutritionAPIUnavailableException
 from meal.serializers import MealSerializer, MealUpdateSerializer
+from customer_profile.models import DailySummary
 from meal.models import Meal
+from product.models import Product
 from users.models import Customer
 
 from datetime import datetime, timezone
@@ -390,7 +395,8 @@ def test_meal_retrieve_destroy_view_get_product_details_ok(
         'meal_type': 'DI',
         'product_name': 'watermelon',
         'portion_size': 55,
-        'portion_calories': 30.0
+        'portion_calories': 30.0,
+        'calorie_status': 'resolved'
     }
 
 
@@ -518,7 +524,8 @@ def test_meal_update_view_patch_product_details_ok(
         'meal_type': 'DI',
         'portion_calories': 10.0,
         'portion_size': 333,
-        'product_name': 'watermelon'
+        'product_name': 'watermelon',
+        'calorie_status': 'resolved'
     }
 
 
@@ -553,7 +560,8 @@ def test_meal_update_view_patch_product_details_odd_fields_ok(
         'meal_type': 'LU',
         'portion_calories': 4.0,
         'portion_size': 150,
-        'product_name': 'watermelon'
+        'product_name': 'watermelon',
+        'calorie_status': 'resolved'
     }
 
 
@@ -733,6 +741,36 @@ def test_meal_list_view_get_meals_has_meals_ok(
     }
 
 
+@pytest.mark.django_db
+def test_meal_list_view_get_meals_totals_from_daily_summary(
+        authenticated_client,
+        meal_data,
+        meal_data_2,
+        meal_data_3,
+):
+    """
+    Testing if the view reads the totals from the day's summary and sums nothing over the meals.
+    """
+    Meal.objects.create(**meal_data)
+    Meal.objects.create(**meal_data_2)
+    Meal.objects.create(**meal_data_3)
+    DailySummary.objects.update(breakfast_calories=100)
+
+    with CaptureQueriesContext(connection) as context:
+        response = authenticated_client.get(
+            f"/api/meal/listview/1/",
+            {"date_add": '2023-10-11'},
+            format='json',
+        )
+
+    meal_queries = [query["sql"] for query in context.captured_queries if "meal_meal" in query["sql"]]
+    summary_queries = [query["sql"] for query in context.captured_queries if "dailysummary" in query["sql"]]
+    assert len(meal_queries) == 1
+    assert "SUM" not in meal_queries[0].upper()
+    assert len(summary_queries) == 1
+    assert [response.data[meal_type]["total"] for meal_type in ("breakfast", "lunch", "dinner")] == [100, 0, 30]
+
+
 @pytest.mark.django_db
 def test_meal_list_view_get_meals_no_meals_ok(
         authenticated_client,
@@ -814,3 +852,236 @@ def test_meal_list_view_get_meals_wrong_date_format(
     assert response.data == {
         'error': 'Wrong date format! YYYY-MM-DD is needed.'
     }
+
+
+@patch("services.product_finder.ProductFinder.find")
+@pytest.mark.django_db
+def test_meal_view_nutrition_api_unavailable(
+        mock_find,
+        authenticated_client,
+):
+    """
+    Testing if the view returns 503 while the nutrition API is unavailable.
+    """
+    mock_find.side_effect = NutritionAPIUnavailableException("Nutrition API is temporarily unavailable.")
+
+    product_data = dict(
+        customer=1,
+        date_add="2023-10-11T13:35:10Z",
+        meal_type="LU",
+        product_name="watermelon",
+        portion_size=100,
+    )
+
+    response = authenticated_client.post(
+        f"/api/meal/add/",
+        data=product_data,
+        format='json',
+    )
+
+    assert response.status_code == 503
+    assert response.data == {"error": "Nutrition API is temporarily unavailable."}
+    assert Meal.objects.count() == 0
+
+
+@patch("services.product_finder.NutritionAPIClient")
+@pytest.mark.django_db
+def test_meal_bulk_view_resolves_products_together(
+        mock_nutrition_api_client_class,
+        authenticated_client,
+):
+    """
+    Testing if the bulk view looks the unknown products up in one API call
+    and reports invalid meals without failing the others.
+    """
+    Product.objects.create(name="apple", calories=52)
+    mock_api = mock_nutrition_api_client_class.return_value
+    mock_api.get_multiple_products_calories.return_value = {"banana": 89, "kiwi": 61}
+
+    meal_data = dict(date_add="2023-10-11T13:35:10Z", meal_type="LU")
+    # Like MySQL, which can't return the ids of rows inserted together.
+    with patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False), \
+            CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.post(
+            "/api/meal/add/bulk/",
+            data={
+                "customer": 1,
+                "meals": [
+                    dict(meal_data, product_name="apple", portion_size=200),
+                    dict(meal_data, product_name="banana", portion_size=100),
+                    dict(meal_data, product_name="kiwi", meal_type="SN", portion_size=100),
+                    dict(meal_data, product_name="kiwi", portion_size=50),
+                ],
+            },
+            format='json',
+        )
+
+    assert response.status_code == 201
+    assert [meal["portion_calories"] for meal in response.data["created"]] == [104, 89, 30]
+    assert [meal["id"] for meal in response.data["created"]] == list(Meal.objects.order_by("id").values_list("id", flat=True))
+    assert len([query for query in queries if query["sql"].startswith("INSERT INTO") and "meal_meal" in query["sql"]]) == 1
+    assert [error["index"] for error in response.data["errors"]] == [2]
+    assert "meal_type" in response.data["errors"][0]["errors"]
+    assert sorted(Meal.objects.values_list("product_name", "portion_calories")) == [
+        ("apple", 104), ("banana", 89), ("kiwi", 30),
+    ]
+    mock_api.get_multiple_products_calories.assert_called_once_with(["banana", "kiwi"])
+    mock_api.get_single_product_calories.assert_not_called()
+    summary = DailySummary.objects.get()
+    assert (summary.lunch_calories, summary.meal_count) == (223, 3)
+
+
+@patch("services.product_finder.NutritionAPIClient")
+@pytest.mark.django_db
+def test_meal_bulk_view_reports_unknown_products(
+        mock_nutrition_api_client_class,
+        authenticated_client,
+):
+    """
+    Testing if the bulk view reports the products the API doesn't know by the meal's index.
+    """
+    mock_api = mock_nutrition_api_client_class.return_value
+    mock_api.get_multiple_products_calories.return_value = {"banana": 89}
+    mock_api.get_single_product_calories.side_effect = ProductNotFoundException("No such product.")
+
+    meal_data = dict(date_add="2023-10-11T13:35:10Z", meal_type="LU", portion_size=100)
+    response = authenticated_client.post(
+        "/api/meal/add/bulk/",
+        data={
+            "customer": 1,
+            "meals": [
+                dict(meal_data, product_name="banana"),
+                dict(meal_data, product_name="blorp"),
+            ],
+        },
+        format='json',
+    )
+
+    assert response.status_code == 201
+    assert [meal["product_name"] for meal in response.data["created"]] == ["banana"]
+    assert response.data["errors"] == [{"index": 1, "errors": {"error": "No such product."}}]
+    mock_api.get_single_product_calories.assert_called_once_with("blorp")
+
+
+@pytest.mark.django_db
+def test_meal_bulk_view_nothing_created(
+        authenticated_client,
+):
+    """
+    Testing if the bulk view returns 400 when none of the meals is valid.
+    """
+    response = authenticated_client.post(
+        "/api/meal/add/bulk/",
+        data={"customer": 1, "meals": [{"product_name": "apple"}]},
+        format='json',
+    )
+
+    assert response.status_code == 400
+    assert response.data["created"] == []
+    assert Meal.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_meal_bulk_view_wrong_meals(
+        authenticated_client,
+):
+    """
+    Testing if the bulk view rejects a request without a list of meals.
+    """
+    response = authenticated_client.post(
+        "/api/meal/add/bulk/",
+        data={"customer": 1, "meals": "apple"},
+        format='json',
+    )
+
+    assert response.status_code == 400
+    assert response.data == {"error": "'meals' must be a list of 1 to 50 meals."}
+
+
+@pytest.mark.django_db
+def test_meal_bulk_view_wrong_customer(
+        authenticated_client,
+        another_authenticated_client
+):
+    """
+    Testing if the bulk view returns a proper error while passing a foreign customer id.
+    """
+    response = authenticated_client.post(
+        "/api/meal/add/bulk/",
+        data={"customer": 2, "meals": []},
+        format='json',
+    )
+
+    assert response.status_code == 403
+    assert response.data == {"error": "Action not allowed."}
+
+
+@patch("meal.serializers.schedule_pending_meals_resolution")
+@patch("services.product_finder.NutritionAPIClient")
+@pytest.mark.django_db
+def test_meal_view_respond_async_unknown_product(
+        mock_nutrition_api_client_class,
+        mock_schedule_pending_meals_resolution,
+        authenticated_client,
+        django_capture_on_commit_callbacks,
+):
+    """
+    Testing if the view stores a meal of a product it doesn't know yet as pending
+    without waiting for the nutrition API.
+    """
+    product_data = dict(
+        customer=1,
+        date_add="2023-10-11T13:35:10Z",
+        meal_type="LU",
+        product_name="watermelon",
+        portion_size=100,
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = authenticated_client.post(
+            f"/api/meal/add/",
+            data=product_data,
+            format='json',
+            HTTP_PREFER="respond-async, wait=5",
+        )
+
+    meal_created = Meal.objects.first()
+
+    assert response.status_code == 202
+    assert response["Preference-Applied"] == "respond-async"
+    assert response["Location"] == f"/api/meal/{meal_created.id}/"
+    assert response.data["calorie_status"] == "pending"
+    assert response.data["portion_calories"] is None
+    assert meal_created.calorie_status == Meal.CALORIES_PENDING
+    mock_schedule_pending_meals_resolution.assert_called_once()
+    mock_nutrition_api_client_class.return_value.get_single_product_calories.assert_not_called()
+
+
+@patch("meal.serializers.schedule_pending_meals_resolution")
+@pytest.mark.django_db
+def test_meal_view_respond_async_known_product(
+        mock_schedule_pending_meals_resolution,
+        authenticated_client,
+):
+    """
+    Testing if the view resolves a known product right away even if asked to respond asynchronously.
+    """
+    Product.objects.create(name="watermelon", calories=30)
+
+    response = authenticated_client.post(
+        f"/api/meal/add/",
+        data=dict(
+            customer=1,
+            date_add="2023-10-11T13:35:10Z",
+            meal_type="LU",
+            product_name="watermelon",
+            portion_size=200,
+        ),
+        format='json',
+        HTTP_PREFER="respond-async",
+    )
+
+    assert response.status_code == 201
+    assert response.data["calorie_status"] == "resolved"
+    assert response.data["portion_calories"] == 60
+    mock_schedule_pending_meals_resolution.assert_not_called()
@@ -0,0 +1,47 @@
+import pytest
+
+from product.models import Product
+
+
+@pytest.mark.django_db
+def test_product_suggest_view_ok(authenticated_client):
+    Product.objects.create(name="watermelon", calories=30)
+    Product.objects.create(name="water", calories=0)
+
+    response = authenticated_client.get("/api/products/suggest", {"q": "wat", "limit": 1})
+
+    assert response.status_code == 200
+    assert response.data == {"results": [{"name": "water", "calories": 0}]}
+
+
+@pytest.mark.django_db
+def test_product_suggest_view_requires_query(authenticated_client):
+    response = authenticated_client.get("/api/products/suggest/")
+
+    assert response.status_code == 400
+    assert response.data == {"error": "'q' query parameter is required."}
+
+
+@pytest.mark.django_db
+def test_product_suggest_view_not_authenticated(client):
+    response = client.get("/api/products/suggest", {"q": "wat"})
+
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_product_search_view_ok(authenticated_client):
+    Product.objects.create(name="broccoli", calories=34)
+
+    response = authenticated_client.get("/api/products/search", {"q": "brocoli"})
+
+    assert response.status_code == 200
+    assert response.data == {"results": [{"name": "broccoli", "calories": 34, "distance": 1}]}
+
+
+@pytest.mark.django_db
+def test_product_search_view_invalid_limit(authenticated_client):
+    response = authenticated_client.get("/api/products/search", {"q": "brocoli", "limit": "many"})
+
+    assert response.status_code == 400
+    assert response.data == {"error": "'limit' must be a number."}
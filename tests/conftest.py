@@ -0,0 +1,51 @@
+import os
+
+import fakeredis
+import pytest
+
+from Calorie_counter.settings import PRODUCT_INDEX
+from services import redis_client
+from services.bloom_filter import product_name_filter
+from services.product_cache import product_cache
+from services.product_search import fuzzy_product_index
+from services.product_snapshot import product_snapshot
+from services.product_suggest import product_suggest_index
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    """
+    Every test gets its own in-memory Redis, so services never reach a real server.
+    """
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(redis_client, "_client", client)
+    monkeypatch.setattr(redis_client, "_client_pid", os.getpid())
+
+    product_cache.clear_local()
+    product_suggest_index.clear()
+    fuzzy_product_index.clear()
+    product_name_filter.clear()
+    yield client
+    product_cache.clear_local()
+    product_suggest_index.clear()
+    fuzzy_product_index.clear()
+    product_name_filter.clear()
+
+
+@pytest.fixture(autouse=True)
+def indexes_built_in_place(monkeypatch):
+    """
+    Builds in-memory indexes on the calling thread, so tests see them right away.
+    """
+    monkeypatch.setitem(PRODUCT_INDEX, "BUILD_IN_BACKGROUND", False)
+
+
+@pytest.fixture(autouse=True)
+def no_product_snapshot(tmp_path, monkeypatch):
+    """
+    Keeps a snapshot built on the developer's machine out of the tests.
+    """
+    monkeypatch.setattr(product_snapshot, "_path", str(tmp_path / "product_snapshot.bin"))
+    product_snapshot.reload()
+    yield
+    product_snapshot.reload()
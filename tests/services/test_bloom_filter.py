@@ -0,0 +1,150 @@
+import logging
+import threading
+
+import pytest
+
+from unittest.mock import patch
+
+from Calorie_counter.settings import PRODUCT_INDEX
+from product.models import Product
+from services.bloom_filter import BloomFilter, ProductNameFilter
+from services.nutrition import ProductNotFoundException
+from services.product_cache import product_cache
+from services.product_finder import ProductFinder
+
+
+def get_name_filter(**kwargs):
+    options = dict(error_rate=0.01, min_capacity=100, sync_interval=60, rebuild_interval=3600)
+    options.update(kwargs)
+    return ProductNameFilter(**options)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    names = [f"product {i}" for i in range(1000)]
+    for name in names:
+        bloom_filter.add(name)
+
+    assert all(name in bloom_filter for name in names)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f"product {i}")
+
+    false_positives = sum(f"unknown {i}" in bloom_filter for i in range(10000))
+
+    assert false_positives / 10000 < 0.02
+    assert bloom_filter.get_false_positive_rate() == pytest.approx(0.01, rel=0.1)
+    assert bloom_filter.memory == 1199
+    assert bloom_filter.hash_count == 7
+
+
+@pytest.mark.django_db
+def test_name_filter_knows_products_and_aliases():
+    Product.objects.create(name="apple", calories=52).add_alias("green apple")
+    name_filter = get_name_filter()
+
+    assert name_filter.might_contain("apple")
+    assert name_filter.might_contain("green apple")
+    assert not name_filter.might_contain("banana")
+
+    stats = name_filter.stats()
+    assert stats["checks"] == 3
+    assert stats["absent"] == 1
+    assert stats["items"] == 2
+    assert stats["memory_bytes"] > 0
+
+
+@pytest.mark.django_db
+def test_name_filter_logs_stats_when_rebuilt(caplog):
+    Product.objects.create(name="apple", calories=52)
+    name_filter = get_name_filter()
+
+    with caplog.at_level(logging.INFO, logger="services.bloom_filter"):
+        name_filter.ensure_fresh()
+
+    assert "Product name filter: 1 names, capacity 100" in caplog.text
+    assert "bytes" in caplog.text
+
+
+@pytest.mark.django_db
+def test_name_filter_logs_stats_on_sync_only_after_the_interval(caplog):
+    name_filter = get_name_filter(sync_interval=0)
+    name_filter.ensure_fresh()
+
+    with caplog.at_level(logging.INFO, logger="services.bloom_filter"):
+        name_filter.ensure_fresh()
+    assert "Product name filter" not in caplog.text
+
+    name_filter._stats_log_interval = 0
+    with caplog.at_level(logging.INFO, logger="services.bloom_filter"):
+        name_filter.ensure_fresh()
+    assert "Product name filter: 0 names" in caplog.text
+
+
+@pytest.mark.django_db
+def test_name_filter_syncs_new_products():
+    name_filter = get_name_filter(sync_interval=0)
+    assert not name_filter.might_contain("banana")
+
+    Product.objects.create(name="banana", calories=89)
+
+    assert name_filter.might_contain("banana")
+
+
+@pytest.mark.django_db
+def test_name_filter_rebuilds_after_generation_change():
+    product = Product.objects.create(name="banana", calories=89)
+    name_filter = get_name_filter(sync_interval=0)
+    assert not name_filter.might_contain("plantain")
+
+    product.name = "plantain"
+    product.save()
+    product_cache.invalidate(["banana"])
+
+    assert name_filter.might_contain("plantain")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_name_filter_is_built_in_background(monkeypatch):
+    monkeypatch.setitem(PRODUCT_INDEX, "BUILD_IN_BACKGROUND", True)
+    Product.objects.create(name="banana", calories=89)
+    name_filter = get_name_filter()
+    build_allowed = threading.Event()
+    add_names = name_filter._add_names
+
+    def add_names_when_allowed(*args):
+        build_allowed.wait(5)
+        return add_names(*args)
+
+    monkeypatch.setattr(name_filter, "_add_names", add_names_when_allowed)
+
+    assert name_filter.might_contain("kiwi")
+    build_allowed.set()
+    name_filter._refresh_thread.join()
+
+    assert name_filter.might_contain("banana")
+    assert not name_filter.might_contain("kiwi")
+
+
+@pytest.mark.django_db
+def test_product_finder_skips_database_for_unknown_names(django_assert_num_queries):
+    finder = ProductFinder()
+    finder.search_in_database("apple")
+
+    with django_assert_num_queries(0):
+        assert finder.search_in_database("banana") is None
+
+
+@pytest.mark.django_db
+@patch("services.product_finder.ProductFinder.search_similar_in_database", return_value=None)
+@patch("services.product_finder.ProductFinder.search_in_nutrition_api")
+def test_product_finder_rechecks_database_before_product_not_found(mock_search_in_nutrition_api, _):
+    finder = ProductFinder()
+    finder.search_in_database("apple")
+    Product.objects.create(name="apple", calories=52)
+    mock_search_in_nutrition_api.side_effect = ProductNotFoundException()
+
+    assert finder.find("apple") == 52
@@ -0,0 +1,105 @@
+import pytest
+
+from unittest.mock import Mock, patch
+
+from product.models import Product
+from services.circuit_breaker import CircuitBreaker, CircuitOpenException, CLOSED, OPEN, HALF_OPEN
+from services.nutrition import NutritionAPIClient, NutritionAPIRateLimitException, NutritionAPIUnavailableException
+from services.product_updater import ProductUpdater
+from services.rate_limiter import RateLimitExceeded
+
+
+def make_circuit_breaker():
+    return CircuitBreaker("test", failure_threshold=2, failure_window=60, reset_timeout=30, probe_timeout=10)
+
+
+def test_circuit_breaker_opens_after_failure_threshold():
+    circuit_breaker = make_circuit_breaker()
+
+    circuit_breaker.record_failure()
+    circuit_breaker.before_call()
+    circuit_breaker.record_failure()
+
+    assert circuit_breaker.get_state() == OPEN
+    with pytest.raises(CircuitOpenException):
+        circuit_breaker.before_call()
+
+
+def test_circuit_breaker_lets_single_probe_through_when_half_open(fake_redis):
+    circuit_breaker = make_circuit_breaker()
+    circuit_breaker.record_failure()
+    circuit_breaker.record_failure()
+    fake_redis.delete("circuit:test:open")
+
+    assert circuit_breaker.get_state() == HALF_OPEN
+    circuit_breaker.before_call()
+    with pytest.raises(CircuitOpenException):
+        circuit_breaker.before_call()
+
+    circuit_breaker.record_success()
+
+    assert circuit_breaker.get_state() == CLOSED
+    circuit_breaker.before_call()
+
+
+def test_circuit_breaker_failed_probe_reopens_circuit(fake_redis):
+    circuit_breaker = make_circuit_breaker()
+    circuit_breaker.record_failure()
+    circuit_breaker.record_failure()
+    fake_redis.delete("circuit:test:open")
+
+    circuit_breaker.before_call()
+    circuit_breaker.record_failure()
+
+    assert circuit_breaker.get_state() == OPEN
+
+
+@patch("services.nutrition.time.sleep")
+@patch("services.nutrition.requests.Session.get")
+def test_nutrition_api_client_fails_fast_while_circuit_is_open(mock_get, mock_sleep):
+    mock_get.return_value = Mock(status_code=503, headers={})
+    client = NutritionAPIClient()
+
+    with patch("services.nutrition.nutrition_circuit_breaker", make_circuit_breaker()):
+        for _ in range(2):
+            with pytest.raises(Exception):
+                client.get_single_product_calories("fried potato")
+        calls = mock_get.call_count
+
+        with pytest.raises(NutritionAPIUnavailableException):
+            client.get_single_product_calories("fried potato")
+
+    assert mock_get.call_count == calls
+
+
+@patch("services.nutrition.requests.Session.get")
+def test_nutrition_api_client_releases_probe_when_rate_limited(mock_get, fake_redis):
+    circuit_breaker = make_circuit_breaker()
+    circuit_breaker.record_failure()
+    circuit_breaker.record_failure()
+    fake_redis.delete("circuit:test:open")
+    client = NutritionAPIClient()
+
+    with patch("services.nutrition.nutrition_circuit_breaker", circuit_breaker), patch.object(
+        client, "_acquire_rate_limit", side_effect=RateLimitExceeded("Rate limit exceeded.")
+    ):
+        with pytest.raises(NutritionAPIRateLimitException):
+            client.get_single_product_calories("fried potato")
+
+    mock_get.assert_not_called()
+    assert circuit_breaker.get_state() == HALF_OPEN
+    assert circuit_breaker.before_call() is True
+
+
+@pytest.mark.django_db
+@patch("services.product_updater.NutritionAPIClient")
+def test_product_updater_skips_run_while_circuit_is_open(mock_nutrition_api_client_class):
+    Product.objects.create(name="apple", calories=10)
+    circuit_breaker = make_circuit_breaker()
+    circuit_breaker.record_failure()
+    circuit_breaker.record_failure()
+
+    with patch("services.product_updater.nutrition_circuit_breaker", circuit_breaker):
+        ProductUpdater(batch_size=2).update()
+
+    mock_nutrition_api_client_class.return_value.get_multiple_products_calories.assert_not_called()
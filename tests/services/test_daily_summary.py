@@ -0,0 +1,131 @@
+import pytest
+
+from datetime import date
+
+from django.core.management import call_command
+
+from activity.models import CustomerActivity
+from customer_profile.models import DailySummary
+from meal.models import Meal
+from services.daily_summary import add_meals, get_daily_summary
+from users.models import Customer
+
+
+@pytest.fixture
+def customer():
+    return Customer.objects.create_user(
+        first_name="Misha", last_name="Ivanov", email="mishaivanov@email.com", password="123ABC321",
+    )
+
+
+def create_meal(customer, meal_type="BR", portion_calories=50, date_add="2023-10-11T13:35:10Z"):
+    return Meal.objects.create(
+        user=customer,
+        date_add=date_add,
+        meal_type=meal_type,
+        product_name="apple",
+        portion_size=100,
+        portion_calories=portion_calories,
+    )
+
+
+def get_totals(customer, day=date(2023, 10, 11)):
+    summary = DailySummary.objects.get(customer=customer, date=day)
+    return (
+        summary.breakfast_calories, summary.lunch_calories, summary.dinner_calories,
+        summary.meal_count, summary.activity_calories, summary.activity_count,
+    )
+
+
+@pytest.mark.django_db
+def test_daily_summary_follows_meals(customer):
+    breakfast = create_meal(customer)
+    create_meal(customer, meal_type="DI", portion_calories=200)
+
+    assert get_totals(customer) == (50, 0, 200, 2, 0, 0)
+
+    breakfast.meal_type = "LU"
+    breakfast.portion_calories = 70
+    breakfast.save()
+
+    assert get_totals(customer) == (0, 70, 200, 2, 0, 0)
+
+    breakfast.date_add = "2023-10-12T08:00:00Z"
+    breakfast.save()
+
+    assert get_totals(customer) == (0, 0, 200, 1, 0, 0)
+    assert get_totals(customer, date(2023, 10, 12)) == (0, 70, 0, 1, 0, 0)
+
+    breakfast.delete()
+
+    assert get_totals(customer, date(2023, 10, 12)) == (0, 0, 0, 0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_daily_summary_follows_activities(customer):
+    activity = CustomerActivity.objects.create(customer=customer, date_add="2023-10-11T18:00:00Z", spent_calories=300)
+    CustomerActivity.objects.create(customer=customer, date_add="2023-10-11T19:00:00Z", spent_calories=100)
+
+    assert get_totals(customer) == (0, 0, 0, 0, 400, 2)
+
+    activity.spent_calories = 250
+    activity.save()
+    CustomerActivity.objects.filter(pk=activity.pk).first().delete()
+
+    assert get_totals(customer) == (0, 0, 0, 0, 100, 1)
+
+
+@pytest.mark.django_db
+def test_daily_summary_computes_missing_summary(customer):
+    create_meal(customer)
+    create_meal(customer, portion_calories=30)
+    DailySummary.objects.all().delete()
+
+    create_meal(customer, meal_type="LU", portion_calories=100)
+
+    assert get_totals(customer) == (80, 100, 0, 3, 0, 0)
+
+
+@pytest.mark.django_db
+def test_daily_summary_counts_bulk_created_meals(customer):
+    meals = Meal.objects.bulk_create([
+        Meal(user=customer, date_add="2023-10-11T08:00:00Z", meal_type="BR", product_name="apple",
+             portion_size=100, portion_calories=portion_calories)
+        for portion_calories in (10, 20)
+    ])
+    add_meals(meals)
+
+    assert get_totals(customer) == (30, 0, 0, 2, 0, 0)
+
+
+@pytest.mark.django_db
+def test_daily_summary_is_deleted_with_customer(customer):
+    create_meal(customer)
+    CustomerActivity.objects.create(customer=customer, date_add="2023-10-11T18:00:00Z", spent_calories=300)
+
+    customer.delete()
+
+    assert not DailySummary.objects.exists()
+
+
+@pytest.mark.django_db
+def test_get_daily_summary_without_meals(customer):
+    summary = get_daily_summary(customer.pk, date(2023, 10, 11))
+
+    assert (summary.pk, summary.total_calories, summary.activity_calories) == (None, 0, 0)
+    assert not DailySummary.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_daily_summaries_command(customer):
+    create_meal(customer)
+    create_meal(customer, date_add="2023-10-12T08:00:00Z")
+    CustomerActivity.objects.create(customer=customer, date_add="2023-10-13T18:00:00Z", spent_calories=300)
+    DailySummary.objects.filter(date=date(2023, 10, 11)).update(breakfast_calories=999)
+    DailySummary.objects.filter(date=date(2023, 10, 12)).delete()
+
+    call_command("rebuild_daily_summaries")
+
+    assert get_totals(customer) == (50, 0, 0, 1, 0, 0)
+    assert get_totals(customer, date(2023, 10, 12)) == (50, 0, 0, 1, 0, 0)
+    assert get_totals(customer, date(2023, 10, 13)) == (0, 0, 0, 0, 300, 1)
@@ -0,0 +1,40 @@
+import pytest
+
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from meal.models import Meal
+from services.dates import get_day_range
+from users.models import Customer
+
+
+def test_get_day_range_uses_current_time_zone():
+    with timezone.override("Europe/Kyiv"):
+        start, end = get_day_range(date(2023, 10, 11))
+
+    assert start == datetime(2023, 10, 10, 21, tzinfo=dt_timezone.utc)
+    assert end == datetime(2023, 10, 11, 21, tzinfo=dt_timezone.utc)
+    assert get_day_range(datetime(2023, 10, 11, 13, 35)) == get_day_range(date(2023, 10, 11))
+
+
+@pytest.mark.django_db
+def test_get_day_range_matches_date_lookup():
+    customer = Customer.objects.create_user(
+        first_name="Misha", last_name="Ivanov", email="mishaivanov@email.com", password="123ABC321",
+    )
+    for date_add in ["2023-10-10T23:59:59Z", "2023-10-11T00:00:00Z", "2023-10-11T23:59:59Z", "2023-10-12T00:00:00Z"]:
+        Meal.objects.create(
+            user=customer,
+            date_add=date_add,
+            meal_type="BR",
+            product_name="apple",
+            portion_size=100,
+            portion_calories=52,
+        )
+
+    day_start, day_end = get_day_range(date(2023, 10, 11))
+    meals = Meal.objects.filter(user=customer, date_add__gte=day_start, date_add__lt=day_end)
+
+    assert set(meals) == set(Meal.objects.filter(user=customer, date_add__date=date(2023, 10, 11)))
+    assert meals.count() == 2
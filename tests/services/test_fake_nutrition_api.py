@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from unittest.mock import patch
+
+from loadtest.fake_nutrition_api import build_server, FakeNutritionAPIConfig
+from services.nutrition import NutritionAPIClient, NutritionAPIException, ProductNotFoundException
+
+
+@pytest.fixture
+def fake_nutrition_api():
+    servers = []
+
+    def start(**config):
+        server = build_server(port=0, config=FakeNutritionAPIConfig(seed=1, **config))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1/nutrition", server.state
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fake_nutrition_api_single_product(fake_nutrition_api):
+    client = NutritionAPIClient(api_url=fake_nutrition_api()[0])
+
+    assert client.get_single_product_calories("Fried potato") == 307.3
+
+
+def test_fake_nutrition_api_multiple_products(fake_nutrition_api):
+    client = NutritionAPIClient(api_url=fake_nutrition_api()[0])
+
+    response = client.get_multiple_products_calories(["fried potato", "unknown", "onion"])
+
+    assert response == {"fried potato": 307.3, "onion": 44.7}
+
+
+def test_fake_nutrition_api_unknown_product(fake_nutrition_api):
+    client = NutritionAPIClient(api_url=fake_nutrition_api()[0])
+
+    with pytest.raises(ProductNotFoundException):
+        client.get_single_product_calories("abracadabra")
+
+
+@patch("services.nutrition.time.sleep")
+def test_fake_nutrition_api_injected_errors(mock_sleep, fake_nutrition_api):
+    api_url, state = fake_nutrition_api(error_rate=1.0)
+    client = NutritionAPIClient(api_url=api_url)
+
+    with pytest.raises(NutritionAPIException):
+        client.get_single_product_calories("onion")
+    assert state.counters["errors"] == client._max_retries + 1
@@ -0,0 +1,78 @@
+import gzip
+import json
+
+import pytest
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from product.models import Product
+from product.management.commands.import_products import iter_json_array
+from services.negative_cache import negative_product_cache
+
+
+def test_iter_json_array_streams_items_across_chunks():
+    items = [{"name": f"product {index}", "calories": index} for index in range(50)]
+
+    streamed = list(iter_json_array(StringIO(json.dumps(items)), chunk_size=7))
+
+    assert streamed == items
+
+
+def test_iter_json_array_reads_past_leading_whitespace():
+    items = [{"name": "apple", "calories": 52}]
+
+    assert list(iter_json_array(StringIO(" " * 20 + json.dumps(items)), chunk_size=7)) == items
+
+
+@pytest.mark.parametrize("content", ["", "\n", " " * 20 + "\n"])
+def test_iter_json_array_rejects_files_without_an_array(content):
+    with pytest.raises(ValueError):
+        list(iter_json_array(StringIO(content), chunk_size=7))
+
+
+@pytest.mark.django_db
+def test_import_products_csv_upserts_normalized_names(tmp_path):
+    Product.objects.create(name="apple", calories=10)
+    dataset = tmp_path / "products.csv"
+    dataset.write_text("name,calories\nApple ,52\nFried  Potato,307.3\n,10\nonion,not a number\n")
+
+    out = StringIO()
+    call_command("import_products", str(dataset), batch_size=1, stdout=out)
+
+    assert dict(Product.objects.values_list("normalized_name", "calories")) == {"apple": 52.0, "fried potato": 307.3}
+    assert Product.objects.get(normalized_name="fried potato").name == "Fried Potato"
+    assert not Product.objects.filter(last_refreshed_at__isnull=True).exists()
+    assert "Imported 2 products, skipped 2 rows." in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_products_keep_existing(tmp_path):
+    Product.objects.create(name="apple", calories=10)
+    dataset = tmp_path / "products.jsonl.gz"
+    with gzip.open(dataset, "wt") as dataset_file:
+        dataset_file.write('{"name": "apple", "calories": 52}\n{"name": "onion", "calories": 44.7}\n')
+
+    call_command("import_products", str(dataset), keep_existing=True, stdout=StringIO())
+
+    assert dict(Product.objects.values_list("name", "calories")) == {"apple": 10.0, "onion": 44.7}
+    assert Product.objects.get(name="onion").last_refreshed_at is not None
+
+
+@pytest.mark.django_db
+def test_import_products_forgets_negative_cache_entries(tmp_path):
+    negative_product_cache.add("brocoli")
+    dataset = tmp_path / "products.json"
+    dataset.write_text(json.dumps([{"food": "brocoli", "kcal": 34}]))
+
+    call_command(
+        "import_products",
+        str(dataset),
+        name_column="food",
+        calories_column="kcal",
+        stdout=StringIO(),
+    )
+
+    assert Product.objects.get(name="brocoli").calories == 34.0
+    assert not negative_product_cache.contains("brocoli")
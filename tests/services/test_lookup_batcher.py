@@ -0,0 +1,85 @@
+import logging
+import threading
+
+from unittest.mock import Mock
+
+from services.lookup_batcher import ProductLookupBatcher
+from services.nutrition import ProductNotFoundException
+
+
+def run_concurrently(batcher, client, product_names):
+    results = {}
+
+    def lookup(product_name):
+        try:
+            results[product_name] = batcher.lookup(product_name, client)
+        except Exception as e:
+            results[product_name] = e
+
+    threads = [threading.Thread(target=lookup, args=(product_name,)) for product_name in product_names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_lookup_batcher_merges_concurrent_lookups():
+    batcher = ProductLookupBatcher(window=0.2, max_batch_size=10)
+    client = Mock()
+    client.get_multiple_products_calories.return_value = {"fried potato": 307.3, "onion": 44.7}
+
+    results = run_concurrently(batcher, client, ["fried potato", "Onion"])
+
+    assert results == {"fried potato": 307.3, "Onion": 44.7}
+    assert client.get_multiple_products_calories.call_count == 1
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["max_batch_size"] == 2
+
+
+def test_lookup_batcher_falls_back_to_single_lookup_for_unmatched_names():
+    batcher = ProductLookupBatcher(window=0.2, max_batch_size=10)
+    client = Mock()
+    client.get_multiple_products_calories.return_value = {"fried potato": 307.3}
+    client.get_single_product_calories.return_value = 52.0
+
+    results = run_concurrently(batcher, client, ["fried potato", "apples"])
+
+    assert results == {"fried potato": 307.3, "apples": 52.0}
+    client.get_single_product_calories.assert_called_once_with("apples")
+
+
+def test_lookup_batcher_shares_errors_with_the_whole_batch():
+    batcher = ProductLookupBatcher(window=0.2, max_batch_size=10)
+    client = Mock()
+    client.get_multiple_products_calories.side_effect = ProductNotFoundException("not found")
+
+    results = run_concurrently(batcher, client, ["abracadabra", "brocoli"])
+
+    assert all(isinstance(result, ProductNotFoundException) for result in results.values())
+
+
+def test_lookup_batcher_disabled_window_calls_api_directly():
+    batcher = ProductLookupBatcher(window=0, max_batch_size=10)
+    client = Mock()
+    client.get_single_product_calories.return_value = 52.0
+
+    assert batcher.lookup("apple", client) == 52.0
+    assert batcher.stats()["batches"] == 0
+
+
+def test_lookup_batcher_logs_and_resets_stats_after_the_interval(caplog):
+    client = Mock()
+    client.get_single_product_calories.return_value = 52.0
+    batcher = ProductLookupBatcher(window=0.01, max_batch_size=10, stats_log_interval=3600)
+
+    with caplog.at_level(logging.INFO, logger="services.lookup_batcher"):
+        batcher.lookup("apple", client)
+    assert "Product lookup batching" not in caplog.text
+    assert batcher.stats()["lookups"] == 1
+
+    batcher._stats_log_interval = 0
+    with caplog.at_level(logging.INFO, logger="services.lookup_batcher"):
+        batcher.lookup("banana", client)
+    assert "Product lookup batching: 2 lookups in 2 batches, mean batch size 1.00" in caplog.text
+    assert batcher.stats()["lookups"] == 0
@@ -0,0 +1,63 @@
+import pytest
+
+from unittest.mock import patch
+from django.core.management import call_command
+
+from services.negative_cache import NegativeProductCache, negative_product_cache
+from services.nutrition import ProductNotFoundException
+from services.product_finder import ProductFinder
+
+
+def test_negative_cache_normalizes_names():
+    negative_product_cache.add("Abracadabra ")
+
+    assert negative_product_cache.contains("abracadabra")
+    assert not negative_product_cache.contains("apple")
+
+
+def test_negative_cache_expires_entries():
+    cache = NegativeProductCache(ttl=60, max_size=10)
+
+    with patch("services.negative_cache.time.time", return_value=1000):
+        cache.add("abracadabra")
+    with patch("services.negative_cache.time.time", return_value=1061):
+        assert not cache.contains("abracadabra")
+
+
+def test_negative_cache_keeps_size_cap():
+    cache = NegativeProductCache(ttl=60, max_size=2)
+
+    for second, product_name in enumerate(["first", "second", "third"]):
+        with patch("services.negative_cache.time.time", return_value=1000 + second):
+            cache.add(product_name)
+
+    with patch("services.negative_cache.time.time", return_value=1003):
+        assert [product_name for product_name, _ in cache.entries()] == ["second", "third"]
+
+
+@pytest.mark.django_db
+@patch("services.product_finder.NutritionAPIClient")
+def test_product_finder_remembers_unknown_products(mock_nutrition_api_client_class):
+    mock_client = mock_nutrition_api_client_class.return_value
+    mock_client.get_single_product_calories.side_effect = ProductNotFoundException("not found")
+
+    product_finder = ProductFinder()
+
+    with pytest.raises(ProductNotFoundException):
+        product_finder.find("abracadabra")
+    with pytest.raises(ProductNotFoundException):
+        product_finder.find("Abracadabra")
+
+    assert mock_client.get_single_product_calories.call_count == 1
+
+
+def test_purge_negative_cache_command():
+    negative_product_cache.add("abracadabra")
+    negative_product_cache.add("brocoli")
+
+    call_command("purge_negative_cache", "brocoli")
+    assert not negative_product_cache.contains("brocoli")
+    assert negative_product_cache.contains("abracadabra")
+
+    call_command("purge_negative_cache", "--all")
+    assert not negative_product_cache.contains("abracadabra")
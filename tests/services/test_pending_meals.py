@@ -0,0 +1,133 @@
+import pytest
+
+from datetime import date
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from customer_profile.models import DailySummary
+from meal.models import Meal
+from meal.tasks import resolve_pending_meals_task, schedule_pending_meals_resolution
+from services.nutrition import NutritionAPIUnavailableException, ProductNotFoundException
+from users.models import Customer
+
+
+@pytest.fixture
+def customer():
+    return Customer.objects.create_user(
+        first_name="Misha", last_name="Ivanov", email="mishaivanov@email.com", password="123ABC321",
+    )
+
+
+@pytest.fixture
+def mock_api():
+    with patch("services.product_finder.NutritionAPIClient") as mock_nutrition_api_client_class:
+        yield mock_nutrition_api_client_class.return_value
+
+
+def create_pending_meal(customer, product_name, portion_size=100):
+    return Meal.objects.create(
+        user=customer,
+        date_add="2023-10-11T13:35:10Z",
+        meal_type="LU",
+        product_name=product_name,
+        portion_size=portion_size,
+        calorie_status=Meal.CALORIES_PENDING,
+    )
+
+
+@pytest.mark.django_db
+def test_resolve_pending_meals_task(customer, mock_api):
+    create_pending_meal(customer, "banana", portion_size=200)
+    create_pending_meal(customer, "kiwi")
+    create_pending_meal(customer, "blorp")
+    mock_api.get_multiple_products_calories.return_value = {"banana": 89, "kiwi": 61}
+    mock_api.get_single_product_calories.side_effect = ProductNotFoundException("No such product.")
+
+    resolve_pending_meals_task()
+
+    assert list(Meal.objects.order_by("id").values_list("product_name", "portion_calories", "calorie_status")) == [
+        ("banana", 178, Meal.CALORIES_RESOLVED),
+        ("kiwi", 61, Meal.CALORIES_RESOLVED),
+        ("blorp", None, Meal.CALORIES_FAILED),
+    ]
+    mock_api.get_multiple_products_calories.assert_called_once()
+
+    summary = DailySummary.objects.get(customer=customer, date=date(2023, 10, 11))
+    assert (summary.lunch_calories, summary.meal_count) == (239, 3)
+
+
+@pytest.mark.django_db
+def test_resolve_pending_meals_task_skips_meals_changed_during_the_lookup(customer, mock_api):
+    meal = create_pending_meal(customer, "banana")
+
+    def change_meal(product_name):
+        Meal.objects.filter(pk=meal.pk).update(meal_type="DI")
+        return 89
+
+    mock_api.get_single_product_calories.side_effect = change_meal
+
+    resolve_pending_meals_task()
+
+    meal.refresh_from_db()
+    assert (meal.meal_type, meal.portion_calories, meal.calorie_status) == ("DI", None, Meal.CALORIES_PENDING)
+
+    resolve_pending_meals_task()
+
+    meal.refresh_from_db()
+    assert (meal.portion_calories, meal.calorie_status) == (89, Meal.CALORIES_RESOLVED)
+    summary = DailySummary.objects.get(customer=customer, date=date(2023, 10, 11))
+    assert (summary.lunch_calories, summary.dinner_calories) == (0, 89)
+
+
+@pytest.mark.django_db
+def test_resolve_pending_meals_task_keeps_meals_pending_while_api_unavailable(customer, mock_api):
+    create_pending_meal(customer, "banana")
+    mock_api.get_single_product_calories.side_effect = NutritionAPIUnavailableException()
+
+    resolve_pending_meals_task()
+
+    assert Meal.objects.get().calorie_status == Meal.CALORIES_PENDING
+
+
+@pytest.mark.django_db
+def test_resolve_pending_meals_task_backs_off_meals_left_pending(customer, mock_api):
+    create_pending_meal(customer, "banana")
+    mock_api.get_single_product_calories.side_effect = NutritionAPIUnavailableException()
+
+    resolve_pending_meals_task()
+    resolve_pending_meals_task()
+
+    meal = Meal.objects.get()
+    assert meal.calorie_attempts == 1
+    assert meal.calorie_retry_after > timezone.now()
+    mock_api.get_single_product_calories.assert_called_once()
+
+    Meal.objects.update(calorie_retry_after=timezone.now())
+
+    resolve_pending_meals_task()
+
+    assert Meal.objects.get().calorie_attempts == 2
+
+
+@pytest.mark.django_db
+def test_resolve_pending_meals_task_fails_invalid_products_alone(customer, mock_api):
+    create_pending_meal(customer, "banana")
+    create_pending_meal(customer, "kiwi")
+    mock_api.get_multiple_products_calories.return_value = {"banana": "many", "kiwi": 61}
+
+    resolve_pending_meals_task()
+
+    assert list(Meal.objects.order_by("id").values_list("product_name", "calorie_status")) == [
+        ("banana", Meal.CALORIES_FAILED),
+        ("kiwi", Meal.CALORIES_RESOLVED),
+    ]
+
+
+@pytest.mark.django_db
+def test_schedule_pending_meals_resolution_once_per_window():
+    with patch.object(resolve_pending_meals_task, "apply_async") as mock_apply_async:
+        schedule_pending_meals_resolution()
+        schedule_pending_meals_resolution()
+
+    mock_apply_async.assert_called_once()
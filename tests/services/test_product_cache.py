@@ -0,0 +1,115 @@
+import pytest
+
+from unittest.mock import patch
+
+from product.models import Product
+from services.product_cache import LRUCache, ProductCache, product_cache
+from services.bloom_filter import product_name_filter
+from services.product_finder import ProductFinder
+from services.product_updater import ProductUpdater
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("apple", 52.0)
+    cache.set("banana", 89.0)
+    cache.get("apple")
+    cache.set("onion", 40.0)
+
+    assert cache.get("banana") is None
+    assert cache.get("apple") == 52.0
+    assert cache.get("onion") == 40.0
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=60)
+
+    with patch("services.product_cache.time.monotonic", return_value=0):
+        cache.set("apple", 52.0)
+    with patch("services.product_cache.time.monotonic", return_value=61):
+        assert cache.get("apple") is None
+
+
+def test_product_cache_reads_through_redis_tier():
+    writer = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+    reader = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+
+    writer.set("apple", 52.0)
+
+    assert reader.get("apple") == 52.0
+    assert reader.get("apple") == 52.0
+    assert reader.get("banana") is None
+    assert reader.stats()["redis_hits"] == 1
+    assert reader.stats()["local_hits"] == 1
+    assert reader.stats()["misses"] == 1
+
+
+def test_product_cache_changed_values_drop_other_local_tiers():
+    writer = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+    reader = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+
+    writer.set("apple", 52.0)
+    assert reader.get("apple") == 52.0
+
+    writer.set_many({"apple": 50.0}, changed=True)
+
+    assert reader.get("apple") == 50.0
+
+
+def test_product_cache_changed_values_keep_other_names_local():
+    writer = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+    reader = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+    writer.set_many({"apple": 52.0, "banana": 89.0})
+    reader.get("apple")
+    reader.get("banana")
+    change_sequence = writer.get_change_sequence()
+
+    writer.set_many({"apple": 50.0}, changed=True)
+
+    assert reader.get("apple") == 50.0
+    assert reader.get("banana") == 89.0
+    assert reader.stats()["local_hits"] == 1
+    assert reader.is_changed_since("apple", change_sequence)
+    assert not reader.is_changed_since("banana", change_sequence)
+    assert writer.get_generation() is None
+
+
+@patch.object(ProductCache, "MAX_CHANGE_SEQUENCES", 2)
+def test_product_cache_drops_local_tier_after_missing_logged_changes():
+    writer = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+    reader = ProductCache(local_maxsize=10, local_ttl=60, redis_ttl=60, generation_check_interval=0)
+    writer.set("banana", 89.0)
+    reader.get("banana")
+    change_sequence = writer.get_change_sequence()
+
+    for calories in (1.0, 2.0, 3.0):
+        writer.set_many({"apple": calories}, changed=True)
+    writer.set("banana", 90.0)
+
+    assert reader.get("banana") == 90.0
+    assert reader.is_changed_since("banana", change_sequence)
+
+
+@pytest.mark.django_db
+def test_product_finder_skips_database_on_cache_hit(django_assert_num_queries):
+    Product.objects.create(name="test_product", calories=20.5)
+    product_finder = ProductFinder()
+    product_name_filter.ensure_fresh()
+
+    with django_assert_num_queries(1):
+        assert product_finder.find("test_product") == 20.5
+
+    with django_assert_num_queries(0):
+        assert product_finder.find("test_product") == 20.5
+
+
+@pytest.mark.django_db
+@patch("services.product_updater.NutritionAPIClient")
+def test_product_updater_writes_through_cache(mock_nutrition_api_client_class):
+    Product.objects.create(name="apple", calories=10)
+    product_cache.set("apple", 10)
+    mock_nutrition_api_client_class.return_value.get_multiple_products_calories.return_value = {"apple": 52.0}
+
+    ProductUpdater(batch_size=2).update()
+
+    assert product_cache.get("apple") == 52.0
@@ -4,6 +4,8 @@ from unittest.mock import Mock, patch
 from rest_framework.exceptions import ErrorDetail
 
 from product.models import Product
+from services.bloom_filter import product_name_filter
+from services.nutrition import ProductNotFoundException
 from services.product_finder import ProductFinder, InvalidProductException
 
 
@@ -72,3 +74,56 @@ def test_product_finder_find_in_api_client_not_found(
     mock_nutrition_api_client_instance.get_single_product_calories.assert_called_with("test_product")
     assert str(expected_response.value) == str(InvalidProductException('Invalid given product.'))
     assert created_product is None
+
+
+@pytest.mark.django_db
+def test_product_finder_write_many_to_product_database(django_assert_num_queries):
+    Product.objects.create(name="banana", calories=89.0)
+    product_finder = ProductFinder()
+
+    with django_assert_num_queries(1):
+        result = product_finder.write_many_to_product_database({"apples": 52.0, "Banana": 90.0, "apple": 53.0})
+
+    assert result == {"apples": 53.0, "Banana": 90.0, "apple": 53.0}
+    assert sorted(Product.objects.values_list("normalized_name", "calories")) == [("apple", 53.0), ("banana", 90.0)]
+    assert not Product.objects.filter(last_refreshed_at__isnull=True).exists()
+    assert product_finder.search_in_database("apple") == 53.0
+
+
+@pytest.mark.django_db
+def test_product_finder_write_many_to_product_database_invalid_product():
+    Product.objects.create(name="banana", calories=89.0)
+    product_finder = ProductFinder()
+
+    assert product_finder.write_many_to_product_database({"banana": "many", "apple": 52.0}) == {
+        "banana": 89.0,
+        "apple": 52.0,
+    }
+
+    with pytest.raises(InvalidProductException):
+        product_finder.write_many_to_product_database({"x" * 51: 52.0})
+
+
+@pytest.mark.django_db
+@patch("services.product_finder.NutritionAPIClient")
+def test_product_finder_find_many(mock_nutrition_api_client_class, django_assert_max_num_queries):
+    Product.objects.create(name="apple", calories=52.0).add_alias("green apple")
+    Product.objects.create(name="banana", calories=89.0)
+    mock_api = mock_nutrition_api_client_class.return_value
+    mock_api.get_multiple_products_calories.return_value = {"kiwi": 61.0}
+    mock_api.get_single_product_calories.side_effect = ProductNotFoundException("No such product.")
+    product_finder = ProductFinder()
+    product_name_filter.ensure_fresh()
+
+    with django_assert_max_num_queries(1):
+        calories, errors = product_finder.find_many(["Green apple", "banana", "Bananas"])
+
+    assert calories == {"Green apple": 52.0, "banana": 89.0, "Bananas": 89.0}
+    assert errors == {}
+
+    calories, errors = product_finder.find_many(["apple", "kiwi", "blorp"])
+
+    assert calories == {"apple": 52.0, "kiwi": 61.0}
+    assert list(errors) == ["blorp"]
+    mock_api.get_multiple_products_calories.assert_called_once_with(["kiwi", "blorp"])
+    assert Product.objects.get(name="kiwi").calories == 61.0
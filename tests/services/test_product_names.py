@@ -0,0 +1,81 @@
+import pytest
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from product.models import Product, ProductAlias
+from services.product_finder import ProductFinder
+from services.product_names import normalize_product_name
+from services.product_updater import ProductUpdater
+
+
+@pytest.mark.parametrize("product_name, normalized_name", [
+    ("Apples ", "apple"),
+    ("fried  POTATOES", "fried potato"),
+    ("Berries", "berry"),
+    ("peaches", "peach"),
+    ("hummus", "hummus"),
+    ("chicken-breasts!", "chicken breast"),
+    ("cookies", "cookie"),
+    ("pies", "pie"),
+    ("Brownies", "brownie"),
+    ("smoothies", "smoothie"),
+    ("veggies", "veggie"),
+    ("quiches", "quiche"),
+    ("apple pie", "apple pie"),
+])
+def test_normalize_product_name(product_name, normalized_name):
+    assert normalize_product_name(product_name) == normalized_name
+
+
+@pytest.mark.django_db
+def test_product_manager_get_by_name_uses_normalized_names_and_aliases():
+    product = Product.objects.create(name="Apple", calories=52)
+    product.add_alias("Granny Smith")
+
+    assert Product.objects.get_by_name("apples") == product
+    assert Product.objects.get_by_name("granny smiths") == product
+    assert Product.objects.get_by_name("banana") is None
+
+
+@pytest.mark.django_db
+@patch("services.product_finder.NutritionAPIClient")
+def test_product_finder_finds_spelling_variants_without_api(mock_nutrition_api_client_class):
+    Product.objects.create(name="apple", calories=52)
+
+    assert ProductFinder().find("Apples ") == 52
+
+    mock_nutrition_api_client_class.return_value.get_single_product_calories.assert_not_called()
+    assert Product.objects.count() == 1
+
+
+@pytest.mark.django_db
+@patch("services.product_updater.NutritionAPIClient")
+def test_product_updater_matches_api_names(mock_nutrition_api_client_class):
+    potato = Product.objects.create(name="potatoes", calories=10)
+    fries = Product.objects.create(name="french fries", calories=10)
+    mock_client = mock_nutrition_api_client_class.return_value
+    mock_client.get_multiple_products_calories.side_effect = [{"potato": 77.0}, {"fried potato": 307.3}]
+
+    ProductUpdater(batch_size=1).update()
+
+    potato.refresh_from_db()
+    fries.refresh_from_db()
+    assert potato.calories == 77.0
+    assert fries.calories == 307.3
+    assert ProductAlias.objects.get(alias="fried potato").product == fries
+
+
+@pytest.mark.django_db
+def test_normalize_products_merges_duplicates():
+    apple = Product.objects.create(name="apple", calories=52)
+    duplicate = Product.objects.create(name="granny smith apple", calories=50)
+    Product.objects.filter(pk=duplicate.pk).update(name="Apples", normalized_name="")
+    duplicate.add_alias("granny smith")
+
+    call_command("normalize_products", stdout=StringIO())
+
+    assert list(Product.objects.values_list("name", flat=True)) == ["apple"]
+    assert ProductAlias.objects.get(alias="granny smith").product == apple
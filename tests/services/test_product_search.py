@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from unittest.mock import patch
+
+from Calorie_counter.settings import PRODUCT_INDEX
+from product.models import Product, ProductAlias
+from services.product_finder import ProductFinder
+from services.product_search import FuzzyProductIndex, fuzzy_product_index, get_edit_distance, get_trigrams
+
+
+@pytest.fixture
+def products():
+    for name, calories in [("broccoli", 34), ("yogurt", 59), ("pear", 57), ("peach", 39), ("beach plum", 40)]:
+        Product.objects.create(name=name, calories=calories)
+
+
+def test_get_trigrams_pads_the_name():
+    assert get_trigrams("pea") == {"  p", " pe", "pea", "ea "}
+
+
+@pytest.mark.parametrize("a, b, max_distance, expected", [
+    ("brocoli", "broccoli", 1, 1),
+    ("yoghurt", "yogurt", 1, 1),
+    ("paech", "peach", 1, 1),
+    ("banana", "bandana", 2, 1),
+    ("apple", "maple", 1, None),
+    ("apple", "apple", 0, 0),
+    ("tea", "teapot", 2, None),
+])
+def test_get_edit_distance(a, b, max_distance, expected):
+    assert get_edit_distance(a, b, max_distance) == expected
+
+
+@pytest.mark.django_db
+def test_search_finds_misspelled_products(products):
+    index = FuzzyProductIndex()
+
+    assert [(p.name, d) for p, d in index.search("Brocoli")] == [("broccoli", 1)]
+    assert [(p.name, d) for p, d in index.search("yoghurts")] == [("yogurt", 1)]
+    assert [(p.name, d) for p, d in index.search("beach plums")] == [("beach plum", 0)]
+    assert index.search("pea") == []
+
+
+@pytest.mark.django_db
+def test_search_reads_posting_lists_up_to_the_cap(products):
+    for i in range(20):
+        Product.objects.create(name=f"brown bread {i}", calories=250)
+    index = FuzzyProductIndex()
+
+    with patch.object(FuzzyProductIndex, "MAX_SCANNED_POSTINGS", 2):
+        assert [(p.name, d) for p, d in index.search("Brocoli")] == [("broccoli", 1)]
+
+    with patch.object(FuzzyProductIndex, "MAX_SCANNED_POSTINGS", 0):
+        assert index.search("Brocoli") == []
+
+
+@pytest.mark.django_db
+def test_match_rejects_ambiguous_and_short_names(products):
+    Product.objects.create(name="melon", calories=34)
+    Product.objects.create(name="mellow", calories=0)
+    index = FuzzyProductIndex()
+
+    assert index.match("brocoli").name == "broccoli"
+    assert index.match("mellon") is None
+    assert index.match("peac") is None
+
+
+@pytest.mark.django_db
+def test_match_rejects_replaced_letters():
+    Product.objects.create(name="butter", calories=717)
+    index = FuzzyProductIndex()
+
+    assert index.match("batter") is None
+    assert index.match("buttter").name == "butter"
+    assert index.match("buttre").name == "butter"
+
+
+@pytest.mark.django_db
+@patch("services.product_finder.ProductFinder.search_in_nutrition_api")
+def test_product_finder_falls_back_to_similar_product(mock_search_in_nutrition_api, products):
+    assert ProductFinder().find("brocoli") == 34
+
+    mock_search_in_nutrition_api.assert_not_called()
+    assert not ProductAlias.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@patch("services.product_finder.ProductFinder.search_in_nutrition_api")
+def test_product_finder_skips_similar_products_until_index_is_built(
+    mock_search_in_nutrition_api, products, monkeypatch,
+):
+    monkeypatch.setitem(PRODUCT_INDEX, "BUILD_IN_BACKGROUND", True)
+    mock_search_in_nutrition_api.return_value = 35
+    build_allowed = threading.Event()
+    load_products = fuzzy_product_index._load_products
+
+    def load_products_when_allowed(queryset):
+        build_allowed.wait(5)
+        return load_products(queryset)
+
+    monkeypatch.setattr(fuzzy_product_index, "_load_products", load_products_when_allowed)
+
+    assert ProductFinder().find("brocoli") == 35
+    build_allowed.set()
+    fuzzy_product_index._refresh_thread.join()
+
+    assert ProductFinder().search_similar_in_database("broccolli") == 34
+
+
+@pytest.mark.django_db
+@patch("services.product_finder.PRODUCT_FUZZY_MATCH", {"ENABLED": False, "MIN_LENGTH": 5, "MAX_DISTANCE": 1})
+@patch("services.product_finder.ProductFinder.search_in_nutrition_api")
+def test_product_finder_fuzzy_match_disabled(mock_search_in_nutrition_api, products):
+    mock_search_in_nutrition_api.return_value = 35
+
+    assert ProductFinder().find("brocoli") == 35
+    mock_search_in_nutrition_api.assert_called_once_with("brocoli")
@@ -0,0 +1,124 @@
+import os
+
+import pytest
+
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from product.models import Product
+from services.product_cache import product_cache
+from services.product_finder import ProductFinder
+from services.product_snapshot import ProductSnapshot, build_snapshot
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "product_snapshot.bin")
+
+
+@pytest.fixture
+def products():
+    apple = Product.objects.create(name="apple", calories=52.1)
+    apple.add_alias("green apple")
+    Product.objects.create(name="crème brûlée", calories=330)
+    Product.objects.create(name="tomatoes", calories=18)
+
+
+@pytest.mark.django_db
+def test_snapshot_finds_products_and_aliases(products, snapshot_path):
+    assert build_snapshot(snapshot_path) == 4
+    snapshot = ProductSnapshot(snapshot_path, check_interval=60)
+
+    assert snapshot.get("apple") == 52.1
+    assert snapshot.get("green apple") == 52.1
+    assert snapshot.get("crème brûlée") == 330
+    assert snapshot.get("tomato") == 18
+    assert snapshot.get("banana") is None
+    assert snapshot.stats()["size"] == 4
+
+
+@pytest.mark.django_db
+def test_snapshot_is_empty_without_products(snapshot_path):
+    build_snapshot(snapshot_path)
+
+    assert ProductSnapshot(snapshot_path, check_interval=60).get("apple") is None
+
+
+def test_snapshot_without_file(snapshot_path):
+    assert ProductSnapshot(snapshot_path, check_interval=60).get("apple") is None
+
+
+def test_snapshot_ignores_invalid_file(snapshot_path):
+    with open(snapshot_path, "wb") as file:
+        file.write(b"not a snapshot" * 10)
+
+    assert ProductSnapshot(snapshot_path, check_interval=60).get("apple") is None
+
+
+@pytest.mark.django_db
+def test_snapshot_is_not_used_after_values_changed(products, snapshot_path):
+    build_snapshot(snapshot_path)
+    snapshot = ProductSnapshot(snapshot_path, check_interval=60)
+    product_cache.clear_local()
+
+    product_cache.invalidate(["apple"])
+    product_cache.clear_local()
+
+    assert snapshot.get("apple") is None
+    assert snapshot.stats()["stale"] == 1
+
+    build_snapshot(snapshot_path)
+    snapshot.reload()
+
+    assert snapshot.get("apple") == 52.1
+
+
+@pytest.mark.django_db
+def test_snapshot_skips_names_changed_since_the_build(products, snapshot_path):
+    build_snapshot(snapshot_path)
+    snapshot = ProductSnapshot(snapshot_path, check_interval=60)
+
+    Product.objects.filter(name="apple").update(calories=50)
+    product_cache.set_many({"apple": 50.0}, changed=True)
+    product_cache.clear_local()
+
+    assert snapshot.get("apple") is None
+    assert snapshot.get("tomato") == 18
+    with patch("services.product_finder.product_snapshot", snapshot):
+        assert ProductFinder().search_in_database("apple") == 50.0
+
+    build_snapshot(snapshot_path)
+    snapshot.reload()
+
+    assert snapshot.get("apple") == 50.0
+
+
+@pytest.mark.django_db
+def test_snapshot_is_remapped_when_replaced(products, snapshot_path):
+    build_snapshot(snapshot_path)
+    snapshot = ProductSnapshot(snapshot_path, check_interval=0)
+    assert snapshot.get("banana") is None
+
+    Product.objects.create(name="banana", calories=89)
+    build_snapshot(snapshot_path)
+
+    assert snapshot.get("banana") == 89
+    assert not [name for name in os.listdir(os.path.dirname(snapshot_path)) if name.startswith(".")]
+
+
+@pytest.mark.django_db
+def test_product_finder_reads_snapshot_first(products, snapshot_path):
+    build_snapshot(snapshot_path)
+    Product.objects.all().delete()
+
+    with patch("services.product_finder.product_snapshot", ProductSnapshot(snapshot_path, check_interval=60)):
+        assert ProductFinder().search_in_database("Apples") == 52.1
+
+
+@pytest.mark.django_db
+def test_build_product_snapshot_command(products, snapshot_path, capsys):
+    call_command("build_product_snapshot", "--path", snapshot_path)
+
+    assert "Wrote 4 product names" in capsys.readouterr().out
+    assert ProductSnapshot(snapshot_path, check_interval=60).get("apple") == 52.1
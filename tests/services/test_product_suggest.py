@@ -0,0 +1,109 @@
+import pytest
+
+from unittest.mock import patch
+
+from Calorie_counter.settings import PRODUCT_INDEX
+from meal.models import Meal
+from product.models import Product
+from services.product_cache import product_cache
+from services.product_suggest import ProductSuggestIndex, normalize_prefix
+from services.product_updater import update_product_popularity
+from users.models import Customer
+
+
+@pytest.fixture
+def products():
+    for name, calories in [("apple", 52), ("apple pie", 237), ("apricot", 48), ("banana", 89), ("tomatoes", 18)]:
+        Product.objects.create(name=name, calories=calories)
+
+
+@pytest.fixture
+def apple_pie_eaten():
+    customer = Customer.objects.create_user(
+        first_name="Misha", last_name="Ivanov", email="mishaivanov@email.com", password="123ABC321",
+    )
+    for _ in range(3):
+        Meal.objects.create(
+            user=customer,
+            date_add="2099-01-01T10:00:00Z",
+            meal_type="BR",
+            product_name="Apple pie",
+            portion_size=100,
+            portion_calories=237,
+        )
+    update_product_popularity()
+
+
+def test_normalize_prefix_keeps_unfinished_words():
+    assert normalize_prefix("  Tomatoe") == "tomatoe"
+    assert normalize_prefix("Apple-p") == "apple p"
+
+
+@pytest.mark.django_db
+def test_suggest_returns_products_by_prefix(products):
+    index = ProductSuggestIndex()
+
+    assert [p.name for p in index.suggest("apr")] == ["apricot"]
+    assert {p.name for p in index.suggest("ap")} == {"apple", "apple pie", "apricot"}
+    assert index.suggest("kiwi") == []
+
+
+@pytest.mark.django_db
+def test_suggest_matches_plural_query(products):
+    index = ProductSuggestIndex()
+
+    assert [p.name for p in index.suggest("Tomatoes")] == ["tomatoes"]
+
+
+@pytest.mark.django_db
+def test_suggest_ranks_by_popularity(products, apple_pie_eaten):
+    index = ProductSuggestIndex()
+
+    assert [p.name for p in index.suggest("a", limit=2)] == ["apple pie", "apple"]
+    assert [p.name for p in index.suggest("apple", limit=2)] == ["apple pie", "apple"]
+
+
+@pytest.mark.django_db
+def test_suggest_picks_up_new_products_on_sync(products):
+    index = ProductSuggestIndex(sync_interval=0)
+    index.suggest("a")
+
+    Product.objects.create(name="avocado", calories=160)
+
+    assert [p.name for p in index.suggest("avo")] == ["avocado"]
+
+
+@pytest.mark.django_db
+def test_add_products_updates_existing_entries(products):
+    index = ProductSuggestIndex()
+    index.suggest("a")
+
+    apple = Product.objects.get(name="apple")
+    apple.calories = 60
+    index.add_products([apple])
+
+    assert index.suggest("apple")[0].calories == 60
+
+
+@pytest.mark.django_db
+def test_index_rebuilds_after_generation_change(products):
+    index = ProductSuggestIndex(sync_interval=0)
+    index.suggest("b")
+
+    Product.objects.filter(name="banana").delete()
+    product_cache.invalidate(["banana"])
+
+    assert index.suggest("b") == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_index_is_built_in_background(products, monkeypatch):
+    monkeypatch.setitem(PRODUCT_INDEX, "BUILD_IN_BACKGROUND", True)
+    index = ProductSuggestIndex()
+
+    with patch("services.product_index.get_product_popularity") as mock_get_product_popularity:
+        assert index.suggest("apr") == []
+        index._refresh_thread.join()
+
+        assert [p.name for p in index.suggest("apr")] == ["apricot"]
+    mock_get_product_popularity.assert_not_called()
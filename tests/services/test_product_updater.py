@@ -0,0 +1,273 @@
+import pytest
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from Calorie_counter import celery_app
+from meal.models import Meal
+from product.models import Product
+from product.tasks import product_refresh_slice_task, product_updater_scheduled_task
+from services.nutrition import NutritionAPIException, NutritionAPIUnavailableException, ProductNotFoundException
+from services.product_cache import product_cache
+from services.product_updater import ProductUpdater, ShardCheckpoint, get_id_ranges, update_product_popularity
+from users.models import Customer
+
+
+@pytest.fixture
+def mock_api():
+    with patch("services.product_updater.NutritionAPIClient") as mock_nutrition_api_client_class:
+        yield mock_nutrition_api_client_class.return_value.get_multiple_products_calories
+
+
+@pytest.mark.django_db
+def test_product_updater_packs_names_into_queries(mock_api):
+    names = ["apple", "banana", "cherry", "date", "elderberry"]
+    for name in names:
+        Product.objects.create(name=name, calories=1)
+    mock_api.side_effect = lambda product_names: {name: len(name) for name in product_names}
+
+    ProductUpdater(batch_size=4, max_query_length=len("apple and banana")).update()
+
+    assert [call.args[0] for call in mock_api.call_args_list] == [
+        ["apple", "banana"], ["cherry", "date"], ["elderberry"],
+    ]
+    assert dict(Product.objects.values_list("name", "calories")) == {name: len(name) for name in names}
+
+
+@pytest.mark.django_db
+def test_product_updater_walks_table_by_id(mock_api, django_assert_num_queries):
+    for i in range(5):
+        Product.objects.create(name=f"product {i}", calories=1)
+    mock_api.side_effect = lambda product_names: {name: 1 for name in product_names}
+
+    with django_assert_num_queries(8):
+        ProductUpdater(batch_size=2).update()
+
+    assert mock_api.call_count == 3
+
+
+@pytest.mark.django_db
+def test_product_updater_skips_failed_queries(mock_api):
+    Product.objects.create(name="apple", calories=1)
+    Product.objects.create(name="banana", calories=1)
+    mock_api.side_effect = [NutritionAPIException(), {"banana": 89}]
+
+    with patch("services.product_updater.logger") as mock_logger:
+        ProductUpdater(batch_size=10, max_query_length=6).update()
+
+    assert dict(Product.objects.values_list("name", "calories")) == {"apple": 1, "banana": 89}
+    products, _, _, api_calls, refreshed, changed, skipped, quarantined = mock_logger.info.call_args.args[2:]
+    assert (products, api_calls, refreshed, changed, skipped, quarantined) == (2, 2, 1, 1, 1, 0)
+    assert Product.objects.get(name="apple").refresh_failures == 0
+
+
+@pytest.mark.django_db
+def test_product_updater_saves_page_before_stopping(mock_api):
+    Product.objects.create(name="apple", calories=1)
+    Product.objects.create(name="banana", calories=1)
+    mock_api.side_effect = [{"apple": 52}, NutritionAPIUnavailableException()]
+
+    ProductUpdater(batch_size=10, max_query_length=6).update()
+
+    assert dict(Product.objects.values_list("name", "calories")) == {"apple": 52, "banana": 1}
+
+
+@pytest.mark.django_db
+def test_product_updater_isolates_failing_names(mock_api):
+    names = ["apple", "banana", "cherry", "date"]
+    for name in names:
+        Product.objects.create(name=name, calories=1)
+
+    def get_calories(product_names):
+        if "cherry" in product_names:
+            raise ProductNotFoundException()
+        return {name: len(name) for name in product_names}
+
+    mock_api.side_effect = get_calories
+
+    stats = ProductUpdater(batch_size=10).update()
+
+    assert [call.args[0] for call in mock_api.call_args_list] == [
+        ["apple", "banana", "cherry", "date"], ["apple", "banana"], ["cherry", "date"], ["cherry"], ["date"],
+    ]
+    assert dict(Product.objects.values_list("name", "calories")) == {"apple": 5, "banana": 6, "cherry": 1, "date": 4}
+    assert (stats["refreshed"], stats["skipped"], stats["quarantined"]) == (3, 0, 1)
+
+    cherry = Product.objects.get(name="cherry")
+    assert cherry.refresh_failures == 1
+    assert cherry.refresh_after == timezone.localdate() + timedelta(days=1)
+
+
+@pytest.mark.django_db
+def test_product_updater_requeries_unanswered_names(mock_api):
+    for name in ["apple", "blorp", "cherry"]:
+        Product.objects.create(name=name, calories=1)
+    mock_api.side_effect = lambda product_names: {name: len(name) for name in product_names if name != "blorp"}
+
+    stats = ProductUpdater(batch_size=10).update()
+
+    assert [call.args[0] for call in mock_api.call_args_list] == [["apple", "blorp", "cherry"], ["blorp"]]
+    assert (stats["refreshed"], stats["quarantined"]) == (2, 1)
+
+
+@pytest.mark.django_db
+def test_product_updater_skips_quarantined_products(mock_api):
+    Product.objects.create(name="apple", calories=1)
+    blorp = Product.objects.create(name="blorp", calories=1)
+    Product.objects.filter(pk=blorp.pk).update(refresh_failures=2, refresh_after=timezone.localdate() + timedelta(days=1))
+    mock_api.side_effect = lambda product_names: {name: 5 for name in product_names}
+
+    stats = ProductUpdater(batch_size=10).update()
+
+    assert [call.args[0] for call in mock_api.call_args_list] == [["apple"]]
+    assert (stats["refreshed"], stats["skipped"], stats["quarantined"]) == (1, 1, 0)
+
+
+@pytest.mark.django_db
+def test_product_updater_backs_off_and_recovers(mock_api):
+    blorp = Product.objects.create(name="blorp", calories=1)
+    Product.objects.filter(pk=blorp.pk).update(refresh_failures=2, refresh_after=timezone.localdate())
+    mock_api.side_effect = ProductNotFoundException()
+
+    ProductUpdater(batch_size=10).update()
+
+    blorp.refresh_from_db()
+    assert blorp.refresh_failures == 3
+    assert blorp.refresh_after == timezone.localdate() + timedelta(days=4)
+
+    Product.objects.filter(pk=blorp.pk).update(refresh_after=timezone.localdate())
+    mock_api.side_effect = lambda product_names: {"blorp": 1}
+
+    ProductUpdater(batch_size=10).update()
+
+    blorp.refresh_from_db()
+    assert (blorp.refresh_failures, blorp.refresh_after) == (0, None)
+
+
+@pytest.mark.django_db
+def test_get_id_ranges():
+    ids = [Product.objects.create(name=f"product {i}", calories=1).id for i in range(5)]
+
+    assert get_id_ranges(2) == [(0, ids[1]), (ids[1], ids[3]), (ids[3], None)]
+    assert get_id_ranges(5) == [(0, ids[4])]
+
+
+@pytest.mark.django_db
+def test_get_id_ranges_empty_table():
+    assert get_id_ranges(2) == [(0, None)]
+
+
+@pytest.mark.django_db
+def test_product_updater_resumes_from_checkpoint(mock_api):
+    for name in ["apple", "banana", "cherry"]:
+        Product.objects.create(name=name, calories=1)
+    mock_api.side_effect = [{"apple": 52}, RuntimeError("worker lost")]
+    checkpoint = ShardCheckpoint("run", 0, None)
+
+    with pytest.raises(RuntimeError):
+        ProductUpdater(batch_size=1).update(checkpoint=checkpoint)
+
+    mock_api.side_effect = lambda product_names: {name: len(name) for name in product_names}
+    stats = ProductUpdater(batch_size=1).update(checkpoint=checkpoint)
+
+    assert [call.args[0] for call in mock_api.call_args_list] == [["apple"], ["banana"], ["banana"], ["cherry"]]
+    assert (stats["products"], stats["refreshed"]) == (3, 3)
+    assert dict(Product.objects.values_list("name", "calories")) == {"apple": 52, "banana": 6, "cherry": 6}
+
+
+@pytest.mark.django_db(transaction=True)
+@patch("product.tasks.build_snapshot", return_value=0)
+@patch.dict("product.tasks.PRODUCT_UPDATER", {"SHARD_SIZE": 2, "MAX_PARALLEL_SHARDS": 2})
+def test_product_updater_scheduled_task_refreshes_all_shards(mock_build_snapshot, mock_api, monkeypatch):
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    names = [f"product {i}" for i in range(5)]
+    for name in names:
+        Product.objects.create(name=name, calories=1)
+    mock_api.side_effect = lambda product_names: {name: 2 for name in product_names}
+
+    with patch("product.tasks.log_update_summary") as mock_log_update_summary:
+        product_updater_scheduled_task()
+
+    assert sorted(name for call in mock_api.call_args_list for name in call.args[0]) == names
+    assert set(Product.objects.values_list("calories", flat=True)) == {2}
+    stats = mock_log_update_summary.call_args.args[0]
+    assert (stats["products"], stats["refreshed"], stats["changed"]) == (5, 5, 5)
+    mock_build_snapshot.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_product_updater_refreshes_stale_products_by_priority(mock_api):
+    now = timezone.now()
+    for name, popularity, refreshed_days_ago in [
+        ("fresh hot", 20, 0.5),
+        ("stale hot", 20, 2),
+        ("fresh warm", 3, 5),
+        ("stale warm", 3, 8),
+        ("fresh cold", 0, 20),
+        ("stale cold", 0, 40),
+        ("new", 0, None),
+    ]:
+        product = Product.objects.create(name=name, calories=1)
+        Product.objects.filter(pk=product.pk).update(
+            popularity=popularity,
+            last_refreshed_at=now - timedelta(days=refreshed_days_ago) if refreshed_days_ago else None,
+        )
+    mock_api.side_effect = lambda product_names: {name: 2 for name in product_names}
+
+    stats = ProductUpdater().update_stale(3)
+
+    assert mock_api.call_args.args[0] == ["stale hot", "stale warm", "new"]
+    assert stats["refreshed"] == 3
+    assert Product.objects.get(name="new").last_refreshed_at >= now
+
+    mock_api.reset_mock()
+    ProductUpdater().update_stale(3)
+
+    assert mock_api.call_args.args[0] == ["stale cold"]
+
+
+@pytest.mark.django_db
+@patch("product.tasks.product_snapshot_scheduled_task")
+def test_product_refresh_slice_task_rebuilds_snapshot_after_changes(mock_snapshot_task, mock_api):
+    Product.objects.create(name="apple", calories=1)
+    generation = product_cache.get_generation()
+    mock_api.side_effect = lambda product_names: {name: 1 for name in product_names}
+
+    product_refresh_slice_task()
+
+    mock_snapshot_task.delay.assert_not_called()
+
+    Product.objects.update(last_refreshed_at=None)
+    mock_api.side_effect = lambda product_names: {name: 2 for name in product_names}
+
+    product_refresh_slice_task()
+
+    mock_snapshot_task.delay.assert_called_once()
+    assert product_cache.get("apple") == 2
+    assert product_cache.get_generation() == generation
+
+
+@pytest.mark.django_db
+def test_update_product_popularity():
+    customer = Customer.objects.create_user(
+        first_name="Misha", last_name="Ivanov", email="mishaivanov@email.com", password="123ABC321",
+    )
+    apple = Product.objects.create(name="apple", calories=52)
+    apple.add_alias("green apple")
+    banana = Product.objects.create(name="banana", calories=89)
+    Product.objects.filter(pk=banana.pk).update(popularity=5)
+
+    for product_name in ["Apples", "green apple", "kiwi"]:
+        Meal.objects.create(
+            user=customer,
+            date_add=timezone.now(),
+            meal_type="BR",
+            product_name=product_name,
+            portion_size=100,
+            portion_calories=50,
+        )
+
+    assert update_product_popularity() == 2
+    assert dict(Product.objects.values_list("name", "popularity")) == {"apple": 2, "banana": 0}
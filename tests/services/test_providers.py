@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from unittest.mock import Mock
+
+from services.nutrition import NutritionAPIException, ProductNotFoundException
+from services.product_finder import ProductFinder
+from services.providers import NutritionProviderChain, LatencyTracker
+
+HEDGING = dict(ENABLED=True, PERCENTILE=95, MIN_DELAY=0.01, MAX_DELAY=0.05, MIN_SAMPLES=20, MAX_WORKERS=4)
+
+
+def make_provider(calories=None, error=None, delay=0):
+    def get_single_product_calories(product_name):
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return calories
+
+    provider = Mock()
+    provider.get_single_product_calories.side_effect = get_single_product_calories
+    return provider
+
+
+def test_provider_chain_falls_back_to_next_provider():
+    primary = make_provider(error=NutritionAPIException("down"))
+    secondary = make_provider(calories=52.0)
+
+    chain = NutritionProviderChain([primary, secondary])
+
+    assert chain.get_single_product_calories("apple") == 52.0
+
+
+def test_provider_chain_prefers_not_found_over_connection_errors():
+    primary = make_provider(error=ProductNotFoundException("not found"))
+    secondary = make_provider(error=NutritionAPIException("down"))
+
+    chain = NutritionProviderChain([primary, secondary])
+
+    with pytest.raises(ProductNotFoundException):
+        chain.get_single_product_calories("abracadabra")
+
+
+def test_provider_chain_hedges_slow_primary():
+    primary = make_provider(calories=50.0, delay=0.5)
+    secondary = make_provider(calories=52.0)
+
+    chain = NutritionProviderChain([primary, secondary], hedging=HEDGING)
+
+    started_at = time.monotonic()
+    assert chain.get_single_product_calories("apple") == 52.0
+    assert time.monotonic() - started_at < 0.4
+
+
+def test_provider_chain_does_not_hedge_fast_primary():
+    primary = make_provider(calories=50.0)
+    secondary = make_provider(calories=52.0)
+
+    chain = NutritionProviderChain([primary, secondary], hedging=HEDGING)
+
+    assert chain.get_single_product_calories("apple") == 50.0
+    secondary.get_single_product_calories.assert_not_called()
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker()
+    for latency in range(1, 101):
+        tracker.add(latency / 1000)
+
+    assert tracker.get_percentile(95) == 0.096
+
+
+@pytest.mark.django_db
+def test_product_finder_uses_given_providers():
+    product_finder = ProductFinder(providers=[
+        make_provider(error=NutritionAPIException("down")),
+        make_provider(calories=52.0),
+    ])
+
+    assert product_finder.find("apple") == 52.0
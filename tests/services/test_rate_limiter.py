@@ -0,0 +1,68 @@
+import pytest
+
+from unittest.mock import Mock, patch
+
+from services.nutrition import NutritionAPIClient, NutritionAPIRateLimitException
+from services.rate_limiter import RateLimiter, RateLimitExceeded, INTERACTIVE, BACKGROUND
+
+
+def make_rate_limiter():
+    return RateLimiter({
+        INTERACTIVE: {"RATE": 1, "CAPACITY": 2, "MAX_WAIT": 0},
+        BACKGROUND: {"RATE": 1, "CAPACITY": 1, "MAX_WAIT": 0},
+    })
+
+
+def test_rate_limiter_allows_burst_up_to_capacity():
+    rate_limiter = make_rate_limiter()
+
+    rate_limiter.acquire(INTERACTIVE)
+    rate_limiter.acquire(INTERACTIVE)
+
+    with pytest.raises(RateLimitExceeded):
+        rate_limiter.acquire(INTERACTIVE)
+
+
+def test_rate_limiter_keeps_separate_budgets_per_priority():
+    rate_limiter = make_rate_limiter()
+
+    rate_limiter.acquire(BACKGROUND)
+    with pytest.raises(RateLimitExceeded):
+        rate_limiter.acquire(BACKGROUND)
+
+    rate_limiter.acquire(INTERACTIVE)
+
+
+@patch("services.rate_limiter.time.sleep")
+def test_rate_limiter_blocks_until_token_is_available(mock_sleep):
+    rate_limiter = make_rate_limiter()
+    rate_limiter.acquire(BACKGROUND)
+
+    with patch.object(rate_limiter, "_take_token", side_effect=[500, 0]):
+        rate_limiter.acquire(BACKGROUND, max_wait=1)
+
+    mock_sleep.assert_called_once_with(0.5)
+
+
+def test_rate_limiter_honors_retry_after_of_throttled_response():
+    rate_limiter = make_rate_limiter()
+    response = Mock(status_code=429, headers={"Retry-After": "30"})
+
+    rate_limiter.observe_response(response)
+
+    with pytest.raises(RateLimitExceeded):
+        rate_limiter.acquire(INTERACTIVE)
+
+
+@patch("services.nutrition.nutrition_rate_limiter", make_rate_limiter())
+@patch("services.nutrition.requests.Session.get")
+def test_nutrition_api_client_fails_fast_when_throttled(mock_get, single_product_sample):
+    mock_get.return_value = Mock(status_code=200, headers={}, json=Mock(return_value=single_product_sample))
+    client = NutritionAPIClient()
+
+    client.get_single_product_calories("fried potato")
+    client.get_single_product_calories("fried potato")
+
+    with pytest.raises(NutritionAPIRateLimitException):
+        client.get_single_product_calories("fried potato")
+    assert mock_get.call_count == 2
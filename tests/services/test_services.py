@@ -1,10 +1,11 @@
 import pytest
+import requests
 
 from unittest.mock import Mock, patch
 from services.nutrition import NutritionAPIClient, ProductNotFoundException, NutritionAPIException
 
 
-@patch("services.nutrition.requests.get")
+@patch("services.nutrition.requests.Session.get")
 def test_nutrition_api_client_get_single_product_ok(mock_get, single_product_sample):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -19,7 +20,7 @@ def test_nutrition_api_client_get_single_product_ok(mock_get, single_product_sam
     assert response == 307.3
 
 
-@patch("services.nutrition.requests.get")
+@patch("services.nutrition.requests.Session.get")
 def test_nutrition_api_client_get_single_product_not_found_exception(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -34,7 +35,7 @@ def test_nutrition_api_client_get_single_product_not_found_exception(mock_get):
     assert str(expected_response.value) == "No such product in the database or invalid product's name."
 
 
-@patch("services.nutrition.requests.get")
+@patch("services.nutrition.requests.Session.get")
 def test_nutrition_api_client_get_single_product_api_exception(mock_get):
     mock_response = Mock()
     mock_response.status_code = 400
@@ -48,7 +49,7 @@ def test_nutrition_api_client_get_single_product_api_exception(mock_get):
     assert str(expected_response.value) == "There's a problem with connection to API."
 
 
-@patch("services.nutrition.requests.get")
+@patch("services.nutrition.requests.Session.get")
 def test_nutrition_api_client_get_multiple_products_calories_ok(mock_get, multiple_products_sample):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -63,7 +64,7 @@ def test_nutrition_api_client_get_multiple_products_calories_ok(mock_get, multip
     assert response == {"fried potato": 307.3, "onion": 44.7}
 
 
-@patch("services.nutrition.requests.get")
+@patch("services.nutrition.requests.Session.get")
 def test_nutrition_api_client_get_multiple_products_not_found_exception(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -78,7 +79,7 @@ def test_nutrition_api_client_get_multiple_products_not_found_exception(mock_get
     assert str(expected_response.value) == "No such product in the database or invalid product's name."
 
 
-@patch("services.nutrition.requests.get")
+@patch("services.nutrition.requests.Session.get")
 def test_nutrition_api_client_get_multiple_products_calories_including_unknown_ok(mock_get, multiple_products_sample):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -93,7 +94,7 @@ def test_nutrition_api_client_get_multiple_products_calories_including_unknown_o
     assert response == {"fried potato": 307.3, "onion": 44.7}
 
 
-@patch("services.nutrition.requests.get")
+@patch("services.nutrition.requests.Session.get")
 def test_nutrition_api_client_get_multiple_products_calories_api_exception(mock_get):
     mock_response = Mock()
     mock_response.status_code = 400
@@ -105,3 +106,52 @@ def test_nutrition_api_client_get_multiple_products_calories_api_exception(mock_
     with pytest.raises(NutritionAPIException) as expected_response:
         client.get_multiple_products_calories(product_names)
     assert str(expected_response.value) == "There's a problem with connection to API."
+
+
+@patch("services.nutrition.time.sleep")
+@patch("services.nutrition.requests.Session.get")
+def test_nutrition_api_client_retries_server_errors(mock_get, mock_sleep, single_product_sample):
+    failed_response = Mock()
+    failed_response.status_code = 503
+    failed_response.headers = {}
+    ok_response = Mock()
+    ok_response.status_code = 200
+    ok_response.json.return_value = single_product_sample
+    mock_get.side_effect = [failed_response, ok_response]
+
+    client = NutritionAPIClient()
+
+    response = client.get_single_product_calories('fried potato')
+
+    assert response == 307.3
+    assert mock_get.call_count == 2
+    assert mock_sleep.call_count == 1
+
+
+@patch("services.nutrition.time.sleep")
+@patch("services.nutrition.requests.Session.get")
+def test_nutrition_api_client_gives_up_after_max_retries(mock_get, mock_sleep):
+    mock_get.side_effect = requests.Timeout()
+
+    client = NutritionAPIClient()
+
+    with pytest.raises(NutritionAPIException) as expected_response:
+        client.get_single_product_calories('fried potato')
+
+    assert mock_get.call_count == client._max_retries + 1
+    assert str(expected_response.value) == "There's a problem with connection to API."
+
+
+@patch("services.nutrition.requests.Session.get")
+def test_nutrition_api_client_uses_timeouts_and_shared_session(mock_get, single_product_sample):
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = single_product_sample
+    mock_get.return_value = mock_response
+
+    client = NutritionAPIClient()
+    client.get_single_product_calories('fried potato')
+
+    assert client._session is NutritionAPIClient()._session
+    assert mock_get.call_args.kwargs["timeout"] == client._timeout
+    assert mock_get.call_args.kwargs["params"] == {"query": "fried potato"}
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from unittest.mock import Mock, patch
+
+from product.models import Product
+from services.nutrition import ProductNotFoundException
+from services.product_finder import ProductFinder
+from services.single_flight import SingleFlight
+
+
+def make_single_flight():
+    return SingleFlight(lock_ttl=5, result_ttl=5, wait_timeout=5, poll_interval=0.01)
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    single_flight = make_single_flight()
+    calls = []
+
+    def lookup():
+        calls.append(1)
+        time.sleep(0.2)
+        return 42.0
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(single_flight.do("banana", lookup)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42.0] * 5
+    assert len(calls) == 1
+
+
+def test_single_flight_shares_listed_exceptions():
+    single_flight = make_single_flight()
+    lookup = Mock(side_effect=ProductNotFoundException("not found"))
+
+    for _ in range(2):
+        with pytest.raises(ProductNotFoundException):
+            single_flight.do("abracadabra", lookup, shared_exceptions=(ProductNotFoundException,))
+
+    assert lookup.call_count == 1
+
+
+def test_single_flight_releases_lock_on_unexpected_errors():
+    single_flight = make_single_flight()
+
+    with pytest.raises(ValueError):
+        single_flight.do("banana", Mock(side_effect=ValueError))
+
+    assert single_flight.do("banana", lambda: 42.0) == 42.0
+
+
+@pytest.mark.django_db
+@patch("services.product_finder.NutritionAPIClient")
+def test_product_finder_insert_race_loser_updates_existing_product(mock_nutrition_api_client_class):
+    Product.objects.create(name="banana", calories=89.0)
+
+    product_finder = ProductFinder()
+
+    assert product_finder.write_to_product_database("Bananas", 90.0) == 90.0
+    assert list(Product.objects.values_list("name", "calories")) == [("banana", 90.0)]
+
+
+@pytest.mark.django_db
+def test_product_finder_returns_zero_calorie_products_from_database():
+    Product.objects.create(name="water", calories=0)
+
+    with patch("services.product_finder.NutritionAPIClient") as mock_nutrition_api_client_class:
+        assert ProductFinder().find("water") == 0
+        mock_nutrition_api_client_class.return_value.get_single_product_calories.assert_not_called()